@@ -1,14 +1,245 @@
 import os
 import re
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import chain, islice
 
-def search_files(base_directory, sub_path, search_term, recursive=True):
+try:
+    from re import _parser as sre_parse
+except ImportError:  # Python < 3.11
+    import sre_parse
+
+# Search engine defaults
+SEARCH_CHUNK_SIZE = 1024 * 1024  # Bytes read from a file per chunk
+SEARCH_WORKERS = os.cpu_count() or 1
+SEARCH_MAX_BUFFERED_MATCHES = 1000  # Matches a worker hands back per file; the rest are streamed
+SEARCH_MAX_LINE_BYTES = 4 * 1024 * 1024  # Longer lines are searched piece by piece instead of kept whole
+SEARCH_LONG_LINE_CONTEXT = 256  # Bytes shown around a match in such a line, and kept between its pieces
+
+def _required_literals(items):
+    """
+    Collects the literal runs that every match of a parsed regex must contain.
+    """
+    runs = []
+    current = []
+    for op, av in items:
+        if op is sre_parse.LITERAL:
+            current.append(chr(av))
+            continue
+        runs.append("".join(current))
+        current = []
+        if op is sre_parse.SUBPATTERN and not av[1] & re.IGNORECASE:
+            runs.extend(_required_literals(av[-1]))
+        elif op in (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT) and av[0] >= 1:
+            runs.extend(_required_literals(av[2]))
+    runs.append("".join(current))
+    return runs
+
+def longest_literal(search_term):
+    """
+    Returns the longest literal string that every match of the regex must contain,
+    or an empty string when the pattern has no usable literal (e.g. case-insensitive).
+    """
+    try:
+        parsed = sre_parse.parse(search_term)
+    except re.error:
+        return ""
+    if parsed.state.flags & re.IGNORECASE:
+        return ""
+    return max(_required_literals(list(parsed)), key=len)
+
+def _long_line_match(pattern, needle, data):
+    """
+    Checks part of a line too long to keep whole (see SEARCH_MAX_LINE_BYTES). With a literal,
+    only the SEARCH_LONG_LINE_CONTEXT bytes around each of its hits are matched against the
+    pattern. Returns the matching text with that much context, or None.
+    """
+    if needle:
+        pos = data.find(needle)
+        while pos != -1:
+            window = data[max(0, pos - SEARCH_LONG_LINE_CONTEXT):pos + len(needle) + SEARCH_LONG_LINE_CONTEXT]
+            text = window.decode("utf-8", "replace")
+            if pattern.search(text):
+                return text.strip()
+            pos = data.find(needle, pos + 1)
+        return None
+    text = data.decode("utf-8", "replace")
+    match = pattern.search(text)
+    if match is None:
+        return None
+    return text[max(0, match.start() - SEARCH_LONG_LINE_CONTEXT):match.end() + SEARCH_LONG_LINE_CONTEXT].strip()
+
+def iter_file_matches(file_path, search_term, literal="", chunk_size=SEARCH_CHUNK_SIZE):
+    """
+    Searches a single file for the pattern and yields (file_path, line_no, line) matches.
+
+    The file is read as large binary chunks. When a literal is given, chunks that do not
+    contain it are skipped after counting their newlines, and only the lines around literal
+    hits are decoded and checked against the regex. Lines longer than SEARCH_MAX_LINE_BYTES
+    are searched piece by piece and reported once, with context around the match only.
+    """
+    pattern = re.compile(search_term)
+    needle = literal.encode("utf-8")
+    line_no = 1  # Line number of the first line in the current block
+    carry = bytearray()  # Start of a line continued in the next chunk
+    in_long_line = long_line_matched = False  # Whether carry is the overlap of an overlong line
+
+    try:
+        with open(file_path, "rb") as f:
+            while True:
+                chunk = f.read(chunk_size)
+                if chunk:
+                    # Only handle complete lines; the tail is carried into the next chunk
+                    cut = chunk.rfind(b"\n") + 1
+                    if cut == 0:
+                        carry += chunk  # In place, so a line without newlines is not copied again
+                        if len(carry) > SEARCH_MAX_LINE_BYTES:
+                            # Too long to keep: check what there is and keep only the overlap
+                            if not long_line_matched:
+                                text = _long_line_match(pattern, needle, carry)
+                                if text is not None:
+                                    long_line_matched = True
+                                    yield file_path, line_no, text
+                            del carry[:-SEARCH_LONG_LINE_CONTEXT]
+                            in_long_line = True
+                        continue
+                    block, carry = carry + chunk[:cut], bytearray(chunk[cut:])
+                else:
+                    block, carry = carry, bytearray()
+
+                if in_long_line:
+                    # The block starts with the rest of the long line
+                    end = block.find(b"\n")
+                    end = len(block) if end == -1 else end
+                    if not long_line_matched:
+                        text = _long_line_match(pattern, needle, block[:end])
+                        if text is not None:
+                            yield file_path, line_no, text
+                    if end < len(block):
+                        line_no += 1
+                    block = block[end + 1:]
+                    in_long_line = long_line_matched = False
+
+                counted = 0  # Position up to which newlines have been added to line_no
+                pos = block.find(needle) if needle else 0
+                while pos != -1 and pos < len(block):
+                    start = block.rfind(b"\n", 0, pos) + 1
+                    end = block.find(b"\n", pos)
+                    end = len(block) if end == -1 else end
+                    line_no += block.count(b"\n", counted, start)
+                    counted = start
+
+                    text = block[start:end].rstrip(b"\r").decode("utf-8")
+                    if pattern.search(text):
+                        yield file_path, line_no, text.strip()
+
+                    pos = block.find(needle, end + 1) if needle else end + 1
+                line_no += block.count(b"\n", counted)
+
+                if not chunk:
+                    break
+    except (UnicodeDecodeError, PermissionError):
+        # Skip the rest of files that cannot be read
+        pass
+
+def search_file(file_path, search_term, literal="", chunk_size=SEARCH_CHUNK_SIZE, max_count=None):
+    """
+    Returns the matches of the pattern in a single file as a list, stopping after max_count.
+    """
+    return list(islice(iter_file_matches(file_path, search_term, literal, chunk_size), max_count))
+
+def _search_file_task(task):
+    """
+    Unpacks a search task for the worker pool. Returns up to SEARCH_MAX_BUFFERED_MATCHES
+    matches and whether those are all of them.
+    """
+    *arguments, max_count = task
+    buffered = SEARCH_MAX_BUFFERED_MATCHES + 1  # One more tells whether the file has further matches
+    if max_count is not None:
+        buffered = min(buffered, max_count)
+    matches = search_file(*arguments, buffered)
+    return matches[:SEARCH_MAX_BUFFERED_MATCHES], len(matches) <= SEARCH_MAX_BUFFERED_MATCHES
+
+def iter_files(directory, recursive=True):
+    """
+    Yields the paths of the files under a directory in walk order.
+    """
+    for root, dirs, files in os.walk(directory):
+        for file in files:
+            yield os.path.join(root, file)
+
+        if not recursive:
+            break
+
+def iter_search_matches(directory, search_term, recursive=True, workers=SEARCH_WORKERS,
+                        chunk_size=SEARCH_CHUNK_SIZE, mode="auto", max_count=None, max_per_file=None):
+    """
+    Searches the files under a directory on a worker pool and yields matches in walk order
+    as soon as the files before them are done.
+
+    :param mode: 'thread', 'process', or 'auto' (threads when a literal prefilter is
+                 available and the work is mostly I/O, processes for regex-heavy patterns).
+    :param max_count: Stop after this many matches in total.
+    :param max_per_file: Stop reading a file after this many matches in it.
+    """
+    if max_count is not None and max_count <= 0:
+        return
+    literal = longest_literal(search_term)
+    if mode == "auto":
+        mode = "thread" if literal else "process"
+    executor_class = ProcessPoolExecutor if mode == "process" else ThreadPoolExecutor
+    file_limit = min((limit for limit in (max_count, max_per_file) if limit is not None), default=None)
+    remaining = max_count
+    workers = max(1, workers)
+
+    executor = executor_class(max_workers=workers)
+    try:
+        # Keep a bounded window of pending files so results come back in a stable order
+        # and memory stays flat however many files and matches there are
+        pending = deque()
+        files = iter_files(directory, recursive)
+        while True:
+            if len(pending) < workers * 4:
+                file_path = next(files, None)
+                if file_path is not None:
+                    task = (file_path, search_term, literal, chunk_size, file_limit)
+                    pending.append(executor.submit(_search_file_task, task))
+                    # Hand out finished results before walking further
+                    if not pending[0].done():
+                        continue
+            if not pending:
+                break
+
+            matches, complete = pending.popleft().result()
+            if not complete:
+                # Too many matches to hand back at once: stream the rest of the file from here
+                rest = iter_file_matches(matches[0][0], search_term, literal, chunk_size)
+                matches = chain(matches, islice(rest, len(matches), file_limit))
+            for match in matches:
+                yield match
+                if remaining is not None:
+                    remaining -= 1
+                    if remaining <= 0:
+                        return
+    finally:
+        # Stops the walk early on max_count or when the consumer closes the generator
+        executor.shutdown(wait=mode == "process", cancel_futures=True)
+
+def search_files(base_directory, sub_path, search_term, recursive=True, workers=SEARCH_WORKERS,
+                 chunk_size=SEARCH_CHUNK_SIZE, mode="auto", max_count=None, max_per_file=None):
     """
     Search for a term in files within a dynamically constructed directory.
+    Matches are printed as they are found.
 
     :param base_directory: Base directory to start from.
     :param sub_path: Additional path to navigate dynamically.
     :param search_term: The term or regex pattern to search for.
     :param recursive: Whether to search in subdirectories.
+    :param workers: Number of worker threads or processes.
+    :param chunk_size: Number of bytes read from a file at a time.
+    :param mode: 'thread', 'process' or 'auto'.
+    :param max_count: Stop after this many matches in total.
+    :param max_per_file: Report at most this many matches per file.
     """
     # Construct the full path
     directory = os.path.join(base_directory, sub_path)
@@ -17,37 +248,39 @@ def search_files(base_directory, sub_path, search_term, recursive=True):
         print(f"The directory '{directory}' does not exist.")
         return
 
-    print(f"Searching in: {directory}")
-    pattern = re.compile(search_term)
-    matches = []
-
-    for root, dirs, files in os.walk(directory):
-        for file in files:
-            file_path = os.path.join(root, file)
-            try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    for line_no, line in enumerate(f, 1):
-                        if pattern.search(line):
-                            matches.append((file_path, line_no, line.strip()))
-            except (UnicodeDecodeError, PermissionError):
-                # Skip files that cannot be read
-                pass
+    try:
+        re.compile(search_term)
+    except re.error as e:
+        print(f"Invalid search pattern: {e}")
+        return
 
-        if not recursive:
-            break
+    print(f"Searching in: {directory}")
+    count = 0
+    matches = iter_search_matches(directory, search_term, recursive, workers, chunk_size, mode,
+                                  max_count, max_per_file)
+    try:
+        for file_path, line_no, content in matches:
+            print(f"File: {file_path}, Line: {line_no}, Content: {content}")
+            count += 1
+    except KeyboardInterrupt:
+        print("Search interrupted.")
+    finally:
+        matches.close()
 
-    # Print matches
-    if matches:
-        print(f"Found {len(matches)} matches:")
-        for match in matches:
-            print(f"File: {match[0]}, Line: {match[1]}, Content: {match[2]}")
+    # Print summary
+    if count:
+        limited = " (limit reached)" if max_count is not None and count >= max_count else ""
+        print(f"Found {count} matches{limited}.")
     else:
         print("No matches found.")
 
 
-base_directory = input("Enter base directory path: ")
-sub_directory = input("Enter subdirectory path (relative to base directory): ")
-term_to_search = input("Enter search term or regex pattern: ")
-is_recursive = input("Search recursively? (yes/no): ").strip().lower() == 'yes'
+if __name__ == "__main__":
+    base_directory = input("Enter base directory path: ")
+    sub_directory = input("Enter subdirectory path (relative to base directory): ")
+    term_to_search = input("Enter search term or regex pattern: ")
+    is_recursive = input("Search recursively? (yes/no): ").strip().lower() == 'yes'
+    limit = input("Stop after how many matches? (blank for all): ").strip()
 
-search_files(base_directory, sub_directory, term_to_search, is_recursive)
+    search_files(base_directory, sub_directory, term_to_search, is_recursive,
+                 max_count=int(limit) if limit.isdigit() else None)
@@ -1,39 +1,666 @@
+import errno
+import glob
+import hashlib
+import importlib.util
 import os
+import re
 import shutil
+import sqlite3
+import threading
+import time
+import uuid
+import zlib
+from collections import defaultdict
 from pathlib import Path
 
+COPY_BUFFER_SIZE = 1024 * 1024
+
+def _format_bytes(size):
+    """Formats a byte count for progress and summary lines."""
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024:
+            return f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} TB"
+
 # Define paths
 RECYCLE_BIN_PATH = Path.home() / ".recycle_bin"
 RECYCLE_BIN_PATH.mkdir(exist_ok=True)  # Create recycle bin if not exist
+RECYCLE_BIN_FILES = RECYCLE_BIN_PATH / "files"  # Deleted files, stored under their entry id
+RECYCLE_BIN_INDEX = RECYCLE_BIN_PATH / "index.sqlite"  # Metadata journal of the entries
+
+def hash_file(file_path, block_size=1024 * 1024):
+    """Returns the BLAKE2b hex digest of a file's contents."""
+    file_hash = hashlib.blake2b(digest_size=32)
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            file_hash.update(block)
+    return file_hash.hexdigest()
+
+RECYCLE_BIN_NAME = ".recycle_bin"  # Name of the per-filesystem bins created at mount roots
+RECYCLE_BIN_MAX_AGE_DAYS = 30  # Purge policy: entries older than this are removed
+RECYCLE_BIN_MAX_SIZE = 10 * 1024 ** 3  # Purge policy: size quota per bin, oldest entries go first
+RECYCLE_BIN_PURGE_INTERVAL = 3600  # Seconds between automatic background purges
+RECYCLE_BIN_DEDUP = True  # Background purges pack deleted files once per hash into '<bin>/objects'
+RECYCLE_BIN_COMPRESSION = "none"  # 'none', 'zlib' or 'zstd' (needs the zstandard package)
+RECYCLE_BIN_COMPRESSION_LEVEL = 3
+RECYCLE_BIN_SCHEMA_VERSION = 1  # PRAGMA user_version of an index with every column below
+_last_purge = 0.0
+_purge_thread = None
+
+def _import_legacy_entries(conn):
+    """
+    Moves files left directly in the recycle bin by older versions under an entry id.
+    Their original location is unknown, so they recover into the current directory as before.
+    """
+    for entry in os.scandir(RECYCLE_BIN_PATH):
+        if entry.name in (RECYCLE_BIN_FILES.name, "objects") or \
+                entry.name.startswith(RECYCLE_BIN_INDEX.name):
+            continue
+        entry_id = uuid.uuid4().hex
+        is_dir = entry.is_dir(follow_symlinks=False)
+        stat = entry.stat(follow_symlinks=False)
+        conn.execute("INSERT INTO entries (id, original_path, name, size, deleted_at, is_dir) "
+                     "VALUES (?, ?, ?, ?, ?, ?)",
+                     (entry_id, str(Path.cwd() / entry.name), entry.name,
+                      0 if is_dir else stat.st_size, stat.st_mtime, int(is_dir)))
+        os.rename(entry.path, RECYCLE_BIN_PATH / RECYCLE_BIN_FILES.name / entry_id)
+
+def open_recycle_bin(bin_path=None):
+    """
+    Opens the index of a recycle bin (the home bin by default), creating the bin on first use.
+    Directories and non-deduplicated files live in '<bin>/files' under their entry id, file
+    contents in '<bin>/objects' under their hash, and the index in '<bin>/index.sqlite'.
+    """
+    bin_path = Path(bin_path or RECYCLE_BIN_PATH)
+    (bin_path / RECYCLE_BIN_FILES.name).mkdir(parents=True, exist_ok=True)
+    index_path = bin_path / RECYCLE_BIN_INDEX.name
+    created = not index_path.exists()
+    conn = sqlite3.connect(index_path, timeout=30)
+    conn.executescript("""
+        CREATE TABLE IF NOT EXISTS entries (id TEXT PRIMARY KEY, original_path TEXT,
+                                            name TEXT, size INTEGER, deleted_at REAL,
+                                            hash TEXT, is_dir INTEGER, object TEXT,
+                                            mtime REAL, mode INTEGER);
+        CREATE INDEX IF NOT EXISTS entries_original_path ON entries (original_path);
+        CREATE INDEX IF NOT EXISTS entries_name ON entries (name);
+        CREATE INDEX IF NOT EXISTS entries_deleted_at ON entries (deleted_at);
+        CREATE TABLE IF NOT EXISTS bins (path TEXT PRIMARY KEY);
+        CREATE TABLE IF NOT EXISTS objects (hash TEXT PRIMARY KEY, size INTEGER,
+                                            stored_size INTEGER, compression TEXT,
+                                            refs INTEGER);
+    """)
+    if conn.execute("PRAGMA user_version").fetchone()[0] < RECYCLE_BIN_SCHEMA_VERSION:
+        _migrate_recycle_bin(conn, created and bin_path == RECYCLE_BIN_PATH)
+    return conn
+
+def _migrate_recycle_bin(conn, import_legacy):
+    """
+    Adds the columns that older indexes lack and, for a new home bin, imports the files
+    older versions left in it. The purge thread may open the same index at the same time,
+    so this runs under the write lock and re-checks the version once it holds it.
+    """
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        if conn.execute("PRAGMA user_version").fetchone()[0] < RECYCLE_BIN_SCHEMA_VERSION:
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(entries)")}
+            for column, kind in (("object", "TEXT"), ("mtime", "REAL"), ("mode", "INTEGER")):
+                if column in columns:
+                    continue
+                try:
+                    conn.execute(f"ALTER TABLE entries ADD COLUMN {column} {kind}")
+                except sqlite3.OperationalError as e:
+                    # The column is already there, so this part of the index is migrated
+                    if "duplicate column" not in str(e):
+                        raise
+            if import_legacy:
+                _import_legacy_entries(conn)
+            conn.execute(f"PRAGMA user_version = {RECYCLE_BIN_SCHEMA_VERSION}")
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+
+def find_mount_root(path):
+    """Returns the root directory of the filesystem that holds a path."""
+    path = os.path.abspath(path)
+    device = os.lstat(path).st_dev
+    while True:
+        parent = os.path.dirname(path)
+        if parent == path or os.stat(parent).st_dev != device:
+            return path
+        path = parent
+
+def recycle_bin_for(file_path, bins=None):
+    """
+    Returns the recycle bin to use for a file: the home bin if the file is on the same
+    filesystem, otherwise a '.recycle_bin' at the root of the file's filesystem, so that
+    deleting is a rename and never a copy. Falls back to the home bin when the mount root
+    is not writable.
+
+    :param bins: Dict of device -> bin path kept across the calls of one bulk operation,
+                 so each filesystem's bin is set up and registered only once.
+    """
+    device = os.lstat(file_path).st_dev
+    if bins is not None and device in bins:
+        return bins[device]
+    bin_path = _recycle_bin_for_device(file_path, device)
+    if bins is not None:
+        bins[device] = bin_path
+    return bin_path
+
+def _recycle_bin_for_device(file_path, device):
+    """Sets up and registers the bin for the filesystem of a file; see recycle_bin_for."""
+    if device == os.stat(RECYCLE_BIN_PATH).st_dev:
+        return RECYCLE_BIN_PATH
+
+    bin_path = Path(find_mount_root(file_path)) / RECYCLE_BIN_NAME
+    try:
+        open_recycle_bin(bin_path).close()
+    except (OSError, sqlite3.Error):
+        return RECYCLE_BIN_PATH
+
+    # Register the bin so listing and recovery can find it
+    conn = open_recycle_bin()
+    try:
+        with conn:
+            conn.execute("INSERT OR IGNORE INTO bins VALUES (?)", (str(bin_path),))
+    finally:
+        conn.close()
+    return bin_path
+
+def known_recycle_bins():
+    """Returns the home recycle bin followed by every per-filesystem bin still present."""
+    conn = open_recycle_bin()
+    try:
+        bins = [Path(row[0]) for row in conn.execute("SELECT path FROM bins")]
+    finally:
+        conn.close()
+    return [RECYCLE_BIN_PATH] + [bin_path for bin_path in bins if bin_path.exists()]
+
+def _glob_range(pattern):
+    """
+    Returns (low, high) bounds of the strings a GLOB pattern can match, from its literal
+    prefix, so SQLite can answer it with an index range instead of scanning every row.
+    """
+    prefix = re.split(r"[*?\[]", pattern, maxsplit=1)[0]
+    return prefix, prefix + "\U0010ffff"
+
+def find_recycled(conn, pattern=None, limit=None):
+    """
+    Returns (id, original_path, name, size, deleted_at, hash, is_dir) rows, newest first.
+
+    :param pattern: Entry id, original path, file name, or a glob matched against the
+                    original path or the name. None matches every entry.
+    :param limit: Maximum number of rows to return.
+    """
+    query = "SELECT id, original_path, name, size, deleted_at, hash, is_dir FROM entries"
+    params = []
+    if pattern:
+        if glob.has_magic(pattern) and _glob_range(pattern)[0]:
+            # The ranges narrow each side to an index range; GLOB then checks the candidates
+            query += (" WHERE original_path >= ? AND original_path < ? AND original_path GLOB ?"
+                      " OR name >= ? AND name < ? AND name GLOB ?")
+            params = [*_glob_range(pattern), pattern] * 2
+        elif glob.has_magic(pattern):
+            # Without a literal prefix no index helps, and one scan beats two full index walks
+            query += " WHERE original_path GLOB ? OR name GLOB ?"
+            params = [pattern, pattern]
+        else:
+            query += " WHERE id = ? OR original_path = ? OR name = ?"
+            params = [pattern, os.path.abspath(pattern), pattern]
+    query += " ORDER BY deleted_at DESC LIMIT ?"
+    params.append(-1 if limit is None else limit)
+    return conn.execute(query, params).fetchall()
+
+def _object_path(bin_path, file_hash):
+    """Returns where the contents with a given hash are stored in a bin."""
+    return os.path.join(bin_path, "objects", file_hash[:2], file_hash)
+
+def _resolve_compression(compression):
+    """Falls back to zlib when zstd is requested but the zstandard package is missing."""
+    if compression == "zstd" and importlib.util.find_spec("zstandard") is None:
+        print("zstd compression needs the 'zstandard' package. Using zlib instead.")
+        return "zlib"
+    return compression
+
+def _write_object(source_path, destination, compression, level):
+    """Streams a file into a new object file, compressing it. Returns the stored size."""
+    with open(source_path, "rb") as src, open(destination, "wb") as dst:
+        if compression == "zstd":
+            import zstandard
+            zstandard.ZstdCompressor(level=level).copy_stream(src, dst)
+        else:
+            compressor = zlib.compressobj(level)
+            for block in iter(lambda: src.read(COPY_BUFFER_SIZE), b""):
+                dst.write(compressor.compress(block))
+            dst.write(compressor.flush())
+    return os.path.getsize(destination)
+
+def _read_object(object_path, destination, compression):
+    """Streams an object back into a regular file, decompressing it on the fly."""
+    with open(object_path, "rb") as src, open(destination, "wb") as dst:
+        if compression == "zstd":
+            import zstandard
+            zstandard.ZstdDecompressor().copy_stream(src, dst)
+        elif compression == "zlib":
+            decompressor = zlib.decompressobj()
+            for block in iter(lambda: src.read(COPY_BUFFER_SIZE), b""):
+                dst.write(decompressor.decompress(block))
+            dst.write(decompressor.flush())
+        else:
+            shutil.copyfileobj(src, dst, COPY_BUFFER_SIZE)
+
+def _pack_entry(conn, bin_path, entry_id, compression, level):
+    """
+    Moves a regular file from '<bin>/files' into the content-addressed object store, where
+    identical contents are stored once. Hashing and compressing happen before the index is
+    locked, so deletes and recoveries are not held up. Returns True if the file was packed.
+    """
+    path = os.path.join(bin_path, RECYCLE_BIN_FILES.name, entry_id)
+    if os.path.islink(path) or not os.path.isfile(path):
+        return False  # Symlinks and special files stay as they are
+    size = os.path.getsize(path)
+    file_hash = hash_file(path)
+    object_path = _object_path(bin_path, file_hash)
+    os.makedirs(os.path.dirname(object_path), exist_ok=True)
+    temp_path = None
+    if compression != "none" and \
+            conn.execute("SELECT 1 FROM objects WHERE hash = ?", (file_hash,)).fetchone() is None:
+        temp_path = f"{object_path}.{entry_id}.tmp"
+        stored_size = _write_object(path, temp_path, compression, level)
+    try:
+        with conn:
+            # The entry may have been recovered or purged while it was being hashed
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("SELECT object FROM entries WHERE id = ?", (entry_id,)).fetchone()
+            if row is None or row[0] is not None:
+                return False
+            conn.execute("UPDATE entries SET hash = ?, object = ? WHERE id = ?", (file_hash, file_hash, entry_id))
+            if conn.execute("SELECT 1 FROM objects WHERE hash = ?", (file_hash,)).fetchone() is not None:
+                conn.execute("UPDATE objects SET refs = refs + 1 WHERE hash = ?", (file_hash,))
+            elif temp_path is not None:
+                conn.execute("INSERT INTO objects VALUES (?, ?, ?, ?, 1)",
+                             (file_hash, size, stored_size, compression))
+                os.replace(temp_path, object_path)
+                temp_path = None
+            else:
+                conn.execute("INSERT INTO objects VALUES (?, ?, ?, 'none', 1)", (file_hash, size, size))
+                os.rename(path, object_path)
+                return True
+            os.remove(path)
+        return True
+    finally:
+        if temp_path is not None and os.path.exists(temp_path):
+            os.remove(temp_path)
+
+def pack_recycle_bin(conn, bin_path, compression=None, level=None, entry_ids=None):
+    """
+    Packs the deleted files of a bin that are not in its object store yet, deduplicating
+    and compressing them. Returns the number of files packed.
+
+    :param compression: 'none', 'zlib' or 'zstd'; defaults to RECYCLE_BIN_COMPRESSION.
+    :param level: Compression level; defaults to RECYCLE_BIN_COMPRESSION_LEVEL.
+    :param entry_ids: Only pack these entries; by default every unpacked file is.
+    """
+    compression = _resolve_compression(compression or RECYCLE_BIN_COMPRESSION)
+    level = RECYCLE_BIN_COMPRESSION_LEVEL if level is None else level
+    if entry_ids is None:
+        entry_ids = [row[0] for row in conn.execute("SELECT id FROM entries WHERE object IS NULL AND is_dir = 0")]
+    packed = 0
+    for entry_id in entry_ids:
+        try:
+            packed += _pack_entry(conn, bin_path, entry_id, compression, level)
+        except OSError:
+            continue  # Recovered while it was being read; the index tells the rest
+    return packed
+
+def _release_object(conn, bin_path, file_hash):
+    """Drops one reference to an object and deletes it once unused. Returns the bytes freed."""
+    row = conn.execute("SELECT refs, stored_size FROM objects WHERE hash = ?", (file_hash,)).fetchone()
+    if row is None:
+        return 0  # Already released
+    refs, stored_size = row
+    if refs > 1:
+        conn.execute("UPDATE objects SET refs = refs - 1 WHERE hash = ?", (file_hash,))
+        return 0
+    conn.execute("DELETE FROM objects WHERE hash = ?", (file_hash,))
+    try:
+        os.remove(_object_path(bin_path, file_hash))
+    except FileNotFoundError:
+        pass
+    return stored_size
+
+def _move_to_recycle_bin(conn, bin_path, file_path):
+    """
+    Records a file in a bin's index and renames it into '<bin>/files' in one transaction.
+    Nothing is read: with RECYCLE_BIN_DEDUP the background purge packs regular files into
+    the object store later (see pack_recycle_bin). Returns the new entry id.
+    """
+    original_path = os.path.abspath(file_path)
+    # lstat, so a symlink is recorded and moved as the link, never as the file it points to
+    stat = os.lstat(file_path)
+    is_dir = not os.path.islink(file_path) and os.path.isdir(file_path)
+    if is_dir:
+        size = sum(os.path.getsize(os.path.join(root, file))
+                   for root, dirs, files in os.walk(file_path) for file in files)
+    else:
+        size = stat.st_size
+
+    entry_id = uuid.uuid4().hex
+    with conn:
+        conn.execute("INSERT INTO entries (id, original_path, name, size, deleted_at, is_dir, mtime, mode) "
+                     "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                     (entry_id, original_path, os.path.basename(original_path), size, time.time(),
+                      int(is_dir), stat.st_mtime, stat.st_mode))
+        destination = os.path.join(bin_path, RECYCLE_BIN_FILES.name, entry_id)
+        try:
+            os.rename(file_path, destination)
+        except OSError as e:
+            if e.errno != errno.EXDEV:
+                raise
+            shutil.move(file_path, destination)  # Only when no bin on this filesystem was usable
+    return entry_id
+
+def _restore_entry(conn, bin_path, entry_id, destination):
+    """
+    Moves or decompresses an entry back to a destination and removes it from the index.
+    Returns False if the entry is gone, e.g. purged in the background since it was listed.
+    """
+    with conn:
+        # Look the entry up under the write lock, so a purge cannot remove it halfway
+        conn.execute("BEGIN IMMEDIATE")
+        row = conn.execute("SELECT object, mtime, mode FROM entries WHERE id = ?", (entry_id,)).fetchone()
+        if row is None:
+            return False
+        object_hash, mtime, mode = row
+        if object_hash is None:
+            conn.execute("DELETE FROM entries WHERE id = ?", (entry_id,))
+            shutil.move(os.path.join(bin_path, RECYCLE_BIN_FILES.name, entry_id), destination)
+            return True
+
+        row = conn.execute("SELECT refs, compression FROM objects WHERE hash = ?", (object_hash,)).fetchone()
+        if row is None:
+            return False
+        refs, compression = row
+        conn.execute("DELETE FROM entries WHERE id = ?", (entry_id,))
+        object_path = _object_path(bin_path, object_hash)
+        if refs == 1 and compression == "none":
+            # Last reference to a plain object: hand the file itself back
+            conn.execute("DELETE FROM objects WHERE hash = ?", (object_hash,))
+            shutil.move(object_path, destination)
+        else:
+            _read_object(object_path, destination, compression)
+            _release_object(conn, bin_path, object_hash)
+    if os.path.islink(destination):
+        return True  # chmod and utime would change the file the link points to
+    if mode is not None:
+        os.chmod(destination, mode & 0o7777)
+    if mtime is not None:
+        os.utime(destination, (mtime, mtime))
+    return True
+
+def _purge_entry(conn, bin_path, entry_id):
+    """
+    Permanently removes an entry and any data only it uses. Returns the bytes freed, or
+    None if the entry is already gone (recovered or purged since it was listed).
+    """
+    # Drop the index entry first so the file is never listed without its data
+    with conn:
+        conn.execute("BEGIN IMMEDIATE")
+        row = conn.execute("SELECT size, is_dir, object FROM entries WHERE id = ?", (entry_id,)).fetchone()
+        if row is None:
+            return None
+        size, is_dir, object_hash = row
+        conn.execute("DELETE FROM entries WHERE id = ?", (entry_id,))
+        if object_hash is not None:
+            return _release_object(conn, bin_path, object_hash)
+    path = os.path.join(bin_path, RECYCLE_BIN_FILES.name, entry_id)
+    try:
+        if is_dir:
+            shutil.rmtree(path)
+        else:
+            os.remove(path)
+    except FileNotFoundError:
+        pass
+    return size
+
+def _stored_size(conn):
+    """Returns the bytes a bin uses on disk according to its index."""
+    objects = conn.execute("SELECT COALESCE(SUM(stored_size), 0) FROM objects").fetchone()[0]
+    others = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries WHERE object IS NULL").fetchone()[0]
+    return objects + others
 
 def delete_file_safely(file_path):
     """Move a file to a custom recycle bin."""
     file_path = Path(file_path)
-    if not file_path.exists():
+    if not os.path.lexists(file_path):
         print("File not found!")
         return
 
     try:
-        # Move file to recycle bin
-        destination = RECYCLE_BIN_PATH / file_path.name
-        shutil.move(str(file_path), str(destination))
-        print(f"File moved to recycle bin: {destination}")
+        bin_path = recycle_bin_for(file_path)
+        conn = open_recycle_bin(bin_path)
+        try:
+            entry_id = _move_to_recycle_bin(conn, bin_path, str(file_path))
+        finally:
+            conn.close()
+        print(f"File moved to recycle bin: {os.path.abspath(file_path)} (id {entry_id})")
     except Exception as e:
         print(f"Error moving file to recycle bin: {e}")
+    start_background_purge()
+
+def bulk_delete(patterns, compression=None, level=None):
+    """
+    Moves every file or directory matching the given paths or globs to the recycle bin of
+    its filesystem, each with a single rename and without reading it. The background purge
+    deduplicates and compresses the files later.
+
+    :param compression: 'none', 'zlib' or 'zstd' to pack the deleted files into the object
+                        store right away, deduplicated and compressed, instead of later.
+    :param level: Compression level; defaults to RECYCLE_BIN_COMPRESSION_LEVEL.
+    """
+    paths = []
+    for pattern in patterns:
+        paths.extend(glob.glob(pattern, recursive=True) if glob.has_magic(pattern) else [pattern])
 
-def recover_file(file_name):
-    """Recover a file from the recycle bin."""
-    file_in_bin = RECYCLE_BIN_PATH / file_name
-    if not file_in_bin.exists():
+    started = time.perf_counter()
+    connections = {}
+    bins = {}  # device -> bin path
+    deleted = defaultdict(list)  # bin path -> ids of the entries moved into it
+    try:
+        for path in paths:
+            if not os.path.lexists(path):
+                print(f"File not found: {path}")
+                continue
+            try:
+                bin_path = recycle_bin_for(path, bins)
+                if bin_path not in connections:
+                    connections[bin_path] = open_recycle_bin(bin_path)
+                deleted[bin_path].append(_move_to_recycle_bin(connections[bin_path], bin_path, path))
+            except Exception as e:
+                print(f"Error moving '{path}' to recycle bin: {e}")
+        print(f"Moved {sum(map(len, deleted.values()))} items to the recycle bin "
+              f"in {time.perf_counter() - started:.2f}s.")
+        if compression is not None:
+            for bin_path, entry_ids in deleted.items():
+                pack_recycle_bin(connections[bin_path], bin_path, compression, level, entry_ids)
+    finally:
+        for conn in connections.values():
+            conn.close()
+    start_background_purge()
+
+def recover_file(file_name, destination_dir=None):
+    """
+    Recover files from the recycle bins to their original locations.
+
+    :param file_name: Entry id, original path, file name or glob of the files to recover.
+                      When a path was deleted several times, its latest version is recovered.
+    :param destination_dir: Recover into this directory instead of the original locations.
+    :return: Number of files recovered.
+    """
+    recovered = set()
+    found = False
+    try:
+        for bin_path in known_recycle_bins():
+            conn = open_recycle_bin(bin_path)
+            try:
+                entries = find_recycled(conn, file_name)
+                found = found or bool(entries)
+                for entry_id, original_path, name, *_ in entries:
+                    if original_path in recovered:
+                        continue  # An older deletion of a path that was just recovered
+                    if destination_dir:
+                        destination = os.path.join(os.path.abspath(destination_dir), name)
+                    else:
+                        destination = original_path
+                    if os.path.lexists(destination):
+                        print(f"Cannot recover to '{destination}': the file already exists.")
+                        continue
+                    os.makedirs(os.path.dirname(destination), exist_ok=True)
+                    if not _restore_entry(conn, bin_path, entry_id, destination):
+                        print(f"Cannot recover '{original_path}': it was purged from the recycle bin.")
+                        continue
+                    recovered.add(original_path)
+                    print(f"File recovered to: {destination}")
+            finally:
+                conn.close()
+    except Exception as e:
+        print(f"Error recovering file: {e}")
+    if not found:
         print("File not found in recycle bin!")
+    return len(recovered)
+
+def bulk_recover(patterns, destination_dir=None):
+    """
+    Recovers every recycle bin entry matching any of the given ids, paths, names or globs.
+    """
+    started = time.perf_counter()
+    recovered = sum(recover_file(pattern, destination_dir) for pattern in patterns)
+    print(f"Recovered {recovered} items in {time.perf_counter() - started:.2f}s.")
+
+def list_recycle_bin(pattern=None, limit=50):
+    """
+    Prints the newest recycle bin entries, optionally filtered by an id, path, name or glob.
+    """
+    entries = []
+    total = 0
+    try:
+        for bin_path in known_recycle_bins():
+            conn = open_recycle_bin(bin_path)
+            try:
+                entries.extend(find_recycled(conn, pattern, limit))
+                total += conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+            finally:
+                conn.close()
+    except Exception as e:
+        print(f"Error reading recycle bin: {e}")
+        return
+
+    entries = sorted(entries, key=lambda entry: entry[4], reverse=True)[:limit]
+    if not entries:
+        print("The recycle bin has no matching entries.")
         return
+    print(f"{'Deleted at':19}  {'Size':>10}  {'Id':32}  Original path")
+    for entry_id, original_path, name, size, deleted_at, file_hash, is_dir in entries:
+        deleted = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(deleted_at))
+        print(f"{deleted}  {'<DIR>' if is_dir else size:>10}  {entry_id}  {original_path}")
+    print(f"Showing {len(entries)} of {total} entries.")
 
+def purge_recycle_bin(max_age_days=RECYCLE_BIN_MAX_AGE_DAYS, max_size=RECYCLE_BIN_MAX_SIZE):
+    """
+    Permanently removes entries older than max_age_days, packs the remaining files into the
+    object store (with RECYCLE_BIN_DEDUP), then removes the oldest entries of any bin whose
+    stored size is still above max_size. Returns (entries removed, bytes freed).
+    """
+    removed = 0
+    freed = 0
+    cutoff = time.time() - max_age_days * 86400
+    for bin_path in known_recycle_bins():
+        conn = open_recycle_bin(bin_path)
+        try:
+            for (entry_id,) in conn.execute("SELECT id FROM entries WHERE deleted_at < ?",
+                                            (cutoff,)).fetchall():
+                entry_freed = _purge_entry(conn, bin_path, entry_id)
+                if entry_freed is not None:
+                    freed += entry_freed
+                    removed += 1
+            if RECYCLE_BIN_DEDUP:
+                pack_recycle_bin(conn, bin_path)
+
+            # Deduplicated objects are only freed with their last entry, so re-check as we go
+            total = _stored_size(conn)
+            if total > max_size:
+                for (entry_id,) in conn.execute("SELECT id FROM entries ORDER BY deleted_at").fetchall():
+                    if total <= max_size:
+                        break
+                    entry_freed = _purge_entry(conn, bin_path, entry_id)
+                    if entry_freed is None:
+                        continue
+                    total -= entry_freed
+                    freed += entry_freed
+                    removed += 1
+        finally:
+            conn.close()
+    return removed, freed
+
+def recycle_bin_stats():
+    """
+    Prints how much data the recycle bins hold and how much deduplication and compression save.
+    """
+    logical = unique = stored = entries = other = 0
     try:
-        destination = Path.cwd() / file_name
-        shutil.move(str(file_in_bin), str(destination))
-        print(f"File recovered to: {destination}")
+        for bin_path in known_recycle_bins():
+            conn = open_recycle_bin(bin_path)
+            try:
+                entries += conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+                logical += conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries "
+                                        "WHERE object IS NOT NULL").fetchone()[0]
+                other += conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries "
+                                      "WHERE object IS NULL").fetchone()[0]
+                bin_unique, bin_stored = conn.execute(
+                    "SELECT COALESCE(SUM(size), 0), COALESCE(SUM(stored_size), 0) FROM objects").fetchone()
+                unique += bin_unique
+                stored += bin_stored
+            finally:
+                conn.close()
     except Exception as e:
-        print(f"Error recovering file: {e}")
+        print(f"Error reading recycle bin: {e}")
+        return
+
+    print(f"Entries:            {entries}")
+    print(f"Deleted file data:  {_format_bytes(logical)}")
+    print(f"Unique content:     {_format_bytes(unique)} (dedup ratio {logical / unique if unique else 1:.2f}x)")
+    print(f"Stored content:     {_format_bytes(stored)} (compression ratio {unique / stored if stored else 1:.2f}x)")
+    print(f"Stored as-is:       {_format_bytes(other)} (directories, special and unpacked files)")
+    print(f"Total on disk:      {_format_bytes(stored + other)}")
+
+def start_background_purge(max_age_days=RECYCLE_BIN_MAX_AGE_DAYS, max_size=RECYCLE_BIN_MAX_SIZE,
+                           force=False):
+    """
+    Runs purge_recycle_bin on a background thread so the prompt is never blocked.
+    Unless force is True, it runs at most once per RECYCLE_BIN_PURGE_INTERVAL.
+    Returns False if no purge was started.
+    """
+    global _last_purge, _purge_thread
+    if _purge_thread is not None and _purge_thread.is_alive():
+        return False
+    if not force and time.time() - _last_purge < RECYCLE_BIN_PURGE_INTERVAL:
+        return False
+    _last_purge = time.time()
+
+    def purge():
+        try:
+            removed, freed = purge_recycle_bin(max_age_days, max_size)
+            if removed or force:
+                print(f"\n[purge] Removed {removed} entries from the recycle bin, "
+                      f"freed {freed / 1024 ** 2:.1f} MB.")
+        except Exception as e:
+            print(f"\n[purge] Error purging recycle bin: {e}")
+
+    _purge_thread = threading.Thread(target=purge, name="recycle-bin-purge", daemon=True)
+    _purge_thread.start()
+    return True
 
 # Example usage
 if __name__ == "__main__":
@@ -41,18 +668,25 @@ if __name__ == "__main__":
         print("\nFile Management System")
         print("1. Delete a file")
         print("2. Recover a file")
-        print("3. Exit")
+        print("3. List the recycle bin")
+        print("4. Show recycle bin statistics")
+        print("5. Exit")
 
-        choice = input("Enter your choice (1/2/3): ").strip()
+        choice = input("Enter your choice (1/2/3/4/5): ").strip()
 
         if choice == "1":
             file_to_delete = input("Enter the full path of the file to delete: ").strip()
             delete_file_safely(file_to_delete)
         elif choice == "2":
-            file_to_recover = input("Enter the name of the file to recover: ").strip()
+            file_to_recover = input("Enter the original path, name, id or glob of the file to recover: ").strip()
             recover_file(file_to_recover)
         elif choice == "3":
+            pattern = input("Enter a path, name or glob to filter by (leave empty for all): ").strip()
+            list_recycle_bin(pattern or None)
+        elif choice == "4":
+            recycle_bin_stats()
+        elif choice == "5":
             print("Exiting the File Management System.")
             break
         else:
-            print("Invalid choice. Please enter 1, 2, or 3.")
+            print("Invalid choice. Please enter 1, 2, 3, 4 or 5.")
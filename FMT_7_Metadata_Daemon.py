@@ -0,0 +1,316 @@
+import ctypes
+import ctypes.util
+import json
+import os
+import socket
+import socketserver
+import struct
+import sys
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from pathlib import Path
+
+# Define paths
+CACHE_PATH = Path.home() / ".fmt_cache"
+METADATA_SOCKET_PATH = CACHE_PATH / "metadata.sock"  # Where command_prompt sessions connect
+
+# Cache settings
+METADATA_CACHE_TTL = 30  # Seconds an entry is trusted; bounds staleness where inotify sees nothing (e.g. NFS)
+METADATA_CACHE_MAX_DIRS = 10000  # Cached directory listings before the least recently used are dropped
+METADATA_CACHE_MAX_STATS = 100000  # Cached stat results before the least recently used are dropped
+METADATA_MAX_LISTING = 100000  # Larger directories are not cached; clients stream them directly
+
+# inotify event masks (see inotify(7))
+IN_MODIFY = 0x2
+IN_ATTRIB = 0x4
+IN_CLOSE_WRITE = 0x8
+IN_MOVED_FROM = 0x40
+IN_MOVED_TO = 0x80
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+IN_DELETE_SELF = 0x400
+IN_MOVE_SELF = 0x800
+IN_Q_OVERFLOW = 0x4000
+IN_IGNORED = 0x8000
+IN_ONLYDIR = 0x1000000
+WATCH_MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE |
+              IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR)
+
+PENDING = (float("-inf"), None)  # Cache slot of an entry being read; never fresh
+
+_lock = threading.Lock()
+_listings = OrderedDict()  # directory -> (cached_at, entries)
+_stats = OrderedDict()  # path -> (cached_at, result)
+_watches = {}  # watch descriptor -> directory
+_watched = {}  # directory -> watch descriptor
+_children = defaultdict(set)  # directory -> paths in it with a cached stat
+_counters = {"hits": 0, "misses": 0, "invalidations": 0}
+_inotify_fd = None
+_libc = None
+
+
+def start_inotify():
+    """
+    Starts watching for changes with inotify. Returns False where inotify is unavailable,
+    in which case entries simply expire after METADATA_CACHE_TTL.
+    """
+    global _inotify_fd, _libc
+    if not sys.platform.startswith("linux"):
+        return False
+    try:
+        _libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        fd = _libc.inotify_init1(os.O_CLOEXEC)
+    except (OSError, AttributeError):
+        return False
+    if fd < 0:
+        return False
+    _inotify_fd = fd
+    threading.Thread(target=_read_events, daemon=True).start()
+    return True
+
+
+def _watch(directory):
+    """Adds an inotify watch on a directory. Must be called with _lock held."""
+    if _inotify_fd is None or directory in _watched:
+        return
+    wd = _libc.inotify_add_watch(_inotify_fd, os.fsencode(directory), WATCH_MASK)
+    if wd >= 0:  # Fails e.g. when max_user_watches is reached; the TTL still applies
+        _watches[wd] = directory
+        _watched[directory] = wd
+
+
+def _unwatch(directory):
+    """
+    Removes the inotify watch of a directory, together with the cached stats of its entries,
+    which nothing would invalidate any more. Must be called with _lock held.
+    """
+    wd = _watched.pop(directory, None)
+    if wd is not None:
+        _watches.pop(wd, None)
+        _libc.inotify_rm_watch(_inotify_fd, wd)
+    for path in _children.pop(directory, ()):
+        _stats.pop(path, None)
+
+
+def _invalidate(directory, name=None):
+    """
+    Drops cached data affected by a change in a directory: its listing, its own stat and,
+    when known, the stat of the changed entry. Must be called with _lock held.
+    """
+    _counters["invalidations"] += 1
+    _listings.pop(directory, None)
+    _stats.pop(directory, None)
+    if name is not None:
+        path = os.path.join(directory, name)
+        _stats.pop(path, None)
+        _listings.pop(path, None)
+
+
+def _read_events():
+    """Reads inotify events forever and invalidates the cache entries they affect."""
+    while True:
+        try:
+            data = os.read(_inotify_fd, 64 * 1024)
+        except OSError:
+            return
+        offset = 0
+        with _lock:
+            while offset < len(data):
+                wd, mask, _, length = struct.unpack_from("iIII", data, offset)
+                name = data[offset + 16:offset + 16 + length].rstrip(b"\0")
+                offset += 16 + length
+
+                if mask & IN_Q_OVERFLOW:
+                    # Events were lost, so nothing cached can be trusted
+                    _listings.clear()
+                    _stats.clear()
+                    continue
+                directory = _watches.get(wd)
+                if directory is None:
+                    continue
+                _invalidate(directory, os.fsdecode(name) if name else None)
+                if mask & (IN_DELETE_SELF | IN_MOVE_SELF | IN_IGNORED):
+                    _invalidate(os.path.dirname(directory), os.path.basename(directory))
+                    if mask & IN_IGNORED:
+                        _watches.pop(wd, None)
+                        _watched.pop(directory, None)
+
+
+def _fresh(entry):
+    """Tells whether a cached (cached_at, value) pair is still within METADATA_CACHE_TTL."""
+    return entry is not None and time.monotonic() - entry[0] < METADATA_CACHE_TTL
+
+
+def read_listing(directory):
+    """
+    Returns the entries of a directory as [name, is_dir, size, mtime, is_link] lists; the
+    first four have the same meaning as the listing items of 'dir'.
+    Returns None for directories that are too large.
+    """
+    entries = []
+    with os.scandir(directory) as scanned:
+        for entry in scanned:
+            try:
+                is_dir = entry.is_dir()
+            except OSError:
+                is_dir = False
+            try:
+                stat = entry.stat()
+            except OSError:
+                try:
+                    stat = entry.stat(follow_symlinks=False)
+                except OSError:
+                    stat = None
+            size = 0 if is_dir or stat is None else stat.st_size
+            entries.append([entry.name, is_dir, size, stat.st_mtime if stat else 0, entry.is_symlink()])
+            if len(entries) > METADATA_MAX_LISTING:
+                return None
+    return entries
+
+
+def read_stat(path):
+    """Returns what clients need to know about a path, following symlinks."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return {"exists": False}
+    return {"exists": True, "is_dir": os.path.isdir(path), "size": stat.st_size, "mtime": stat.st_mtime}
+
+
+def cached_listing(directory):
+    """Returns the listing of a directory, reading and caching it on a miss."""
+    with _lock:
+        entry = _listings.get(directory)
+        if _fresh(entry):
+            _listings.move_to_end(directory)
+            _counters["hits"] += 1
+            return entry[1]
+        _counters["misses"] += 1
+        # Watch and leave a placeholder before reading: an event arriving while the directory
+        # is read removes the placeholder, and the possibly stale result is then not cached
+        _watch(directory)
+        _listings[directory] = PENDING
+
+    try:
+        entries = read_listing(directory)
+    except OSError:
+        with _lock:
+            if _listings.get(directory) is PENDING:
+                del _listings[directory]
+        raise
+    with _lock:
+        if _listings.get(directory) is PENDING:
+            # Directories too large to cache are remembered as None so they are not read again
+            _listings[directory] = (time.monotonic(), entries)
+            while len(_listings) > METADATA_CACHE_MAX_DIRS:
+                evicted, _ = _listings.popitem(last=False)
+                _unwatch(evicted)
+    return entries
+
+
+def cached_stat(path):
+    """Returns the stat summary of a path, reading and caching it on a miss."""
+    with _lock:
+        entry = _stats.get(path)
+        if _fresh(entry):
+            _stats.move_to_end(path)
+            _counters["hits"] += 1
+            return entry[1]
+        _counters["misses"] += 1
+        parent = os.path.dirname(path)
+        if os.path.isdir(parent):
+            _watch(parent)  # Changes to a path are reported on its parent directory
+        _children[parent].add(path)
+        _stats[path] = PENDING
+
+    result = read_stat(path)
+    with _lock:
+        if _stats.get(path) is PENDING:
+            _stats[path] = (time.monotonic(), result)
+            while len(_stats) > METADATA_CACHE_MAX_STATS:
+                evicted, _ = _stats.popitem(last=False)
+                _children[os.path.dirname(evicted)].discard(evicted)
+    return result
+
+
+def handle_request(request):
+    """Answers one decoded client request."""
+    op = request.get("op")
+    path = os.path.abspath(request.get("path", "."))
+    if op == "ping":
+        return {"ok": True}
+    if op == "stat":
+        return {"ok": True, **cached_stat(path)}
+    if op == "list":
+        try:
+            entries = cached_listing(path)
+        except OSError as e:
+            return {"ok": False, "error": str(e)}
+        if entries is None:
+            return {"ok": False, "error": "too many entries to cache"}
+        return {"ok": True, "entries": entries}
+    if op == "stats":
+        with _lock:
+            return {"ok": True, "listings": len(_listings), "stats": len(_stats), "watches": len(_watched),
+                    "inotify": _inotify_fd is not None, **_counters}
+    return {"ok": False, "error": f"unknown operation: {op}"}
+
+
+class RequestHandler(socketserver.StreamRequestHandler):
+    """Serves newline-delimited JSON requests from one client connection."""
+
+    def handle(self):
+        for line in self.rfile:
+            try:
+                request = json.loads(line)
+            except ValueError:
+                response = {"ok": False, "error": "invalid request"}
+            else:
+                if request.get("op") == "shutdown":
+                    self.wfile.write(b'{"ok": true}\n')
+                    threading.Thread(target=self.server.shutdown, daemon=True).start()
+                    return
+                response = handle_request(request)
+            self.wfile.write(json.dumps(response).encode("utf-8") + b"\n")
+
+
+def serve(socket_path=METADATA_SOCKET_PATH):
+    """
+    Runs the metadata cache daemon until it is asked to shut down.
+    """
+    if not hasattr(socket, "AF_UNIX"):
+        print("The metadata daemon needs Unix domain sockets, which this platform does not have.")
+        return
+    socket_path = Path(socket_path)
+    socket_path.parent.mkdir(parents=True, exist_ok=True)
+
+    # Refuse to start twice, but clean up after a daemon that died
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(str(socket_path))
+        print(f"A metadata daemon is already listening on {socket_path}.")
+        return
+    except OSError:
+        socket_path.unlink(missing_ok=True)
+    finally:
+        probe.close()
+
+    inotify = start_inotify()
+    server = socketserver.ThreadingUnixStreamServer(str(socket_path), RequestHandler)
+    server.daemon_threads = True
+    os.chmod(socket_path, 0o600)  # Only the owner's sessions may use the cache
+    print(f"Metadata daemon listening on {socket_path} "
+          f"({'inotify' if inotify else f'{METADATA_CACHE_TTL}s expiry only'}).")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        socket_path.unlink(missing_ok=True)
+
+
+# Example usage
+if __name__ == "__main__":
+    serve(sys.argv[1] if len(sys.argv) > 1 else METADATA_SOCKET_PATH)
@@ -2,24 +2,327 @@ import os
 import shutil
 import string
 import re
-from sys import argv
-from pygments import highlight
-from pygments.lexers import guess_lexer_for_filename
-from pygments.formatters import TerminalFormatter
-from docx import Document
+import bisect
+import errno
+import fnmatch
+import functools
+import glob
+import hashlib
+import heapq
+import importlib.util
+import io
+import json
+import mmap
+import socket
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+import zlib
+from array import array
+from collections import OrderedDict, defaultdict, deque
+from itertools import chain, islice
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+try:
+    from re import _parser as sre_parse
+except ImportError:  # Python < 3.11
+    import sre_parse
+
+# Instrumentation settings
+STATS_LATENCY_BUCKETS = (0.001, 0.01, 0.1, 1.0, 10.0)  # Upper bounds in seconds; a last bucket takes the rest
+STATS_COUNTERS = ("bytes_read", "bytes_written", "files", "cache_hits", "cache_misses")
+
+_stats = {}  # operation -> calls, errors, latency totals and histogram, and STATS_COUNTERS
+_stats_lock = threading.Lock()
+_stats_local = threading.local()  # Instrumented operation running on each thread
+
+def _operation_stats(operation):
+    """Returns the statistics entry of an operation, creating it on first use. Needs _stats_lock."""
+    stats = _stats.get(operation)
+    if stats is None:
+        stats = _stats[operation] = {"calls": 0, "errors": 0, "seconds": 0.0, "max_seconds": 0.0,
+                                     "histogram": [0] * (len(STATS_LATENCY_BUCKETS) + 1)}
+        stats.update(dict.fromkeys(STATS_COUNTERS, 0))
+    return stats
+
+def record(operation=None, **counts):
+    """
+    Adds to the counters of an operation, e.g. record(files=1, bytes_read=size).
+    Without an operation name the counts go to the instrumented operation running on this
+    thread, or to 'other' outside of one.
+    """
+    operation = operation or getattr(_stats_local, "operation", None) or "other"
+    with _stats_lock:
+        stats = _operation_stats(operation)
+        for name, value in counts.items():
+            stats[name] += value
+
+def instrumented(operation):
+    """
+    Decorator that records the calls, exceptions and latency of an operation, and makes it the
+    target of record() calls on the same thread while it runs.
+    """
+    def decorate(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            outer = getattr(_stats_local, "operation", None)
+            _stats_local.operation = operation
+            started = time.perf_counter()
+            failed = True
+            try:
+                result = function(*args, **kwargs)
+                failed = False
+                return result
+            finally:
+                elapsed = time.perf_counter() - started
+                _stats_local.operation = outer
+                with _stats_lock:
+                    stats = _operation_stats(operation)
+                    stats["calls"] += 1
+                    stats["errors"] += failed
+                    stats["seconds"] += elapsed
+                    stats["max_seconds"] = max(stats["max_seconds"], elapsed)
+                    stats["histogram"][bisect.bisect_right(STATS_LATENCY_BUCKETS, elapsed)] += 1
+        return wrapper
+    return decorate
+
+def stats_snapshot():
+    """Returns a copy of the statistics of every operation, for reports and JSON dumps."""
+    with _stats_lock:
+        return {operation: dict(stats, histogram=list(stats["histogram"]),
+                                buckets=list(STATS_LATENCY_BUCKETS))
+                for operation, stats in sorted(_stats.items())}
+
+def reset_stats():
+    """Forgets all recorded statistics."""
+    with _stats_lock:
+        _stats.clear()
+
+def print_stats():
+    """Prints a table of the recorded operations with their latency histograms."""
+    snapshot = stats_snapshot()
+    if not snapshot:
+        print("No operations recorded yet.")
+        return
+    labels = [f"<{bound * 1000:g}ms" if bound < 1 else f"<{bound:g}s" for bound in STATS_LATENCY_BUCKETS]
+    labels.append(f">={STATS_LATENCY_BUCKETS[-1]:g}s")
+    print(f"\n{'operation':16} {'calls':>7} {'errors':>6} {'avg':>9} {'max':>9} {'read':>10} "
+          f"{'written':>10} {'files':>8} {'hits':>7} {'misses':>7}")
+    for operation, stats in snapshot.items():
+        average = stats["seconds"] / stats["calls"] if stats["calls"] else 0.0
+        print(f"{operation:16} {stats['calls']:>7} {stats['errors']:>6} {average * 1000:>7.1f}ms "
+              f"{stats['max_seconds'] * 1000:>7.1f}ms {_format_bytes(stats['bytes_read']):>10} "
+              f"{_format_bytes(stats['bytes_written']):>10} {stats['files']:>8} "
+              f"{stats['cache_hits']:>7} {stats['cache_misses']:>7}")
+        if stats["calls"]:
+            print(" " * 17 + "  ".join(f"{label} {count}" for label, count in zip(labels, stats["histogram"])))
+
 def list_drives():
     """
     List all available drives on the computer (Windows only).
     """
     drives = []
     for drive in string.ascii_uppercase:
-        if os.path.exists(f"{drive}:\\"):
+        if path_exists(f"{drive}:\\"):
             drives.append(f"{drive}:\\")
     return drives
 
-def copy_file_dynamic(source_file, destination_file):
+# Directory listing settings
+DIR_WORKERS = min(32, (os.cpu_count() or 1) * 4)  # Threads computing subtree totals for 'dir --du'
+
+DIR_SORT_KEYS = {
+    "name": lambda item: item[0].lower(),
+    "size": lambda item: item[2],
+    "time": lambda item: item[3],
+}
+
+def iter_dir_entries(directory, kind=None, pattern=None, min_size=None, max_size=None, need_stat=True):
+    """
+    Yields (name, is_dir, size, mtime) for the entries of a directory in the order the file
+    system returns them, so huge directories start listing immediately.
+
+    The entry type comes from the data os.scandir already has; stat is only called when
+    need_stat is set. Directories have size 0. When the metadata daemon runs, its cached
+    listing is used instead.
+
+    :param kind: 'files' or 'dirs' to list only one kind of entry.
+    :param pattern: Glob that entry names must match.
+    :param min_size: Smallest file size to list (directories are not size-filtered).
+    :param max_size: Largest file size to list.
+    """
+    listing = cached_listing(directory)
+    if listing is not None:
+        # Served by the metadata daemon, with sizes and times already known
+        for name, is_dir, size, mtime, _ in listing:
+            if pattern and not fnmatch.fnmatch(name, pattern):
+                continue
+            if (kind == "files" and is_dir) or (kind == "dirs" and not is_dir):
+                continue
+            if not is_dir and ((min_size is not None and size < min_size) or
+                               (max_size is not None and size > max_size)):
+                continue
+            yield name, is_dir, size, mtime
+        return
+
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if pattern and not fnmatch.fnmatch(entry.name, pattern):
+                continue
+            try:
+                is_dir = entry.is_dir()
+            except OSError:
+                is_dir = False
+            if (kind == "files" and is_dir) or (kind == "dirs" and not is_dir):
+                continue
+
+            size = mtime = 0
+            if need_stat:
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    try:
+                        stat = entry.stat(follow_symlinks=False)  # Broken symlink
+                    except OSError:
+                        stat = None
+                if stat is not None:
+                    size = 0 if is_dir else stat.st_size
+                    mtime = stat.st_mtime
+            if not is_dir and ((min_size is not None and size < min_size) or
+                               (max_size is not None and size > max_size)):
+                continue
+            yield entry.name, is_dir, size, mtime
+
+def directory_size(directory):
+    """
+    Returns the total size in bytes of the files under a directory, without following
+    symlinks and counting hard-linked files once.
+    """
+    total = 0
+    seen = set()
+    stack = [directory]
+    while stack:
+        try:
+            with os.scandir(stack.pop()) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+                            continue
+                        stat = entry.stat(follow_symlinks=False)
+                    except OSError:
+                        continue
+                    if stat.st_nlink > 1:
+                        if (stat.st_dev, stat.st_ino) in seen:
+                            continue
+                        seen.add((stat.st_dev, stat.st_ino))
+                    total += stat.st_size
+        except OSError:
+            continue
+    return total
+
+def with_subtree_totals(items, directory, workers=DIR_WORKERS):
+    """
+    Replaces the size of each directory in a stream of listing items with the total size
+    of its subtree. Subtrees are measured in parallel and items keep their order.
+    """
+    executor = ThreadPoolExecutor(max_workers=max(1, workers))
+    try:
+        pending = deque()
+        for item in items:
+            name, is_dir = item[0], item[1]
+            if is_dir:
+                future = executor.submit(directory_size, os.path.join(directory, name))
+            else:
+                future = None
+            pending.append((item, future))
+            # Keep a bounded window so the listing streams instead of waiting for every subtree
+            while pending and (len(pending) > workers * 4 or pending[0][1] is None or pending[0][1].done()):
+                item, future = pending.popleft()
+                yield item if future is None else item[:2] + (future.result(),) + item[3:]
+        for item, future in pending:
+            yield item if future is None else item[:2] + (future.result(),) + item[3:]
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+def format_dir_entry(item, bare=False):
+    """Formats one listing item like a line of the Windows 'dir' command."""
+    name, is_dir, size, mtime = item
+    if bare:
+        return name
+    stamp = time.strftime("%Y-%m-%d  %H:%M", time.localtime(mtime))
+    if is_dir and not size:
+        return f"{stamp}    <DIR>          {name}"
+    label = "<DIR>" if is_dir else ""
+    return f"{stamp}    {label:5} {size:>14,} {name}"
+
+def dir_entry_json(item, directory):
+    """Formats one listing item as a JSON line for scripts."""
+    name, is_dir, size, mtime = item
+    return json.dumps({"path": os.path.join(directory, name), "name": name, "is_dir": is_dir,
+                       "size": size, "mtime": mtime})
+
+@instrumented("dir")
+def list_directory(directory, sort=None, reverse=False, kind=None, pattern=None, min_size=None,
+                   max_size=None, du=False, bare=False, page_size=None, limit=None, json_output=False):
+    """
+    Prints the entries of a directory with sizes and modification times.
+
+    Without sort, entries are printed as they are read, so the first page of a directory with
+    millions of entries shows up at once and memory stays flat. Sorting has to see every
+    entry; with a limit only the top entries are kept (heapq), otherwise all are sorted.
+
+    :param sort: 'name', 'size' or 'time'.
+    :param du: Show the recursive total size of each subdirectory, computed in parallel.
+    :param bare: Print names only, which avoids a stat call per entry.
+    :param page_size: Pause after this many lines.
+    :param limit: Print at most this many entries.
+    :param json_output: Print one JSON object per entry and no header or summary.
+    """
+    need_stat = not bare or sort in ("size", "time") or min_size is not None or max_size is not None or du
+    items = iter_dir_entries(directory, kind, pattern, min_size, max_size, need_stat)
+    if du:
+        items = with_subtree_totals(items, directory)
+    if sort:
+        key = DIR_SORT_KEYS[sort]
+        if limit is not None:
+            items = (heapq.nlargest if reverse else heapq.nsmallest)(limit, items, key=key)
+        else:
+            items = sorted(items, key=key, reverse=reverse)
+    elif limit is not None:
+        items = islice(items, limit)
+
+    if not (bare or json_output):
+        print("\n Directory of", directory)
+        print()
+    file_count = dir_count = total = 0
+    shown = 0
+    try:
+        for item in items:
+            print(dir_entry_json(item, directory) if json_output else format_dir_entry(item, bare))
+            if item[1]:
+                dir_count += 1
+            else:
+                file_count += 1
+            total += item[2]
+            shown += 1
+            if page_size and shown % page_size == 0:
+                if input("-- More -- [Enter] next page, q quit: ").strip().lower() == "q":
+                    break
+    except KeyboardInterrupt:
+        print("Listing interrupted.")
+    finally:
+        if hasattr(items, "close"):
+            items.close()
+
+    record(files=shown)
+    if not (bare or json_output):
+        print(f"{file_count:>16,} File(s) {dir_count:>10,} Dir(s) {total:>16,} bytes")
+
+@instrumented("copy")
+def copy_file_dynamic(source_file, destination_file, resumable=False, sync=False, checksum=False):
     """
     Copies a file from the source location to the destination file path.
     Paths are dynamically constructed for compatibility across operating systems.
@@ -27,6 +330,10 @@ def copy_file_dynamic(source_file, destination_file):
     Parameters:
     - source_file: Full path to the file to be copied.
     - destination_file: Full path to the destination file (including the file name).
+    - resumable: Whether to use the checkpointed, hash-verified copy (see copy_file_resumable).
+    - sync: Whether to skip the copy when the destination is unchanged and rewrite only the
+      changed blocks otherwise (see sync_file).
+    - checksum: With sync, compare contents instead of trusting size and modification time.
     """
     try:
         # Validate source file
@@ -41,29 +348,569 @@ def copy_file_dynamic(source_file, destination_file):
             os.makedirs(destination_dir)
 
         # Perform the file copy
+        if sync:
+            status, written = sync_file(source_file, destination_file, checksum)
+            record(files=1, bytes_written=written)
+            print(f"File '{destination_file}' {status} ({_format_bytes(written)} written).")
+            return
+        if resumable:
+            copy_file_resumable(source_file, destination_file)
+            return
         shutil.copy(source_file, destination_file)
+        size = os.path.getsize(destination_file)
+        record(files=1, bytes_read=size, bytes_written=size)
         print(f"File '{source_file}' successfully copied to '{destination_file}'.")
     except Exception as e:
         print(f"An error occurred: {e}")
 
+# Bulk copy settings
+COPY_LARGE_FILE_SIZE = 8 * 1024 * 1024  # Files at least this big use kernel copy
+COPY_BUFFER_SIZE = 1024 * 1024
+COPY_WORKERS = min(32, (os.cpu_count() or 1) * 4)
+
+def _kernel_copy(source_fd, destination_fd, size):
+    """
+    Copies size bytes between two file descriptors inside the kernel, using
+    os.copy_file_range or os.sendfile. Returns False if neither is supported for these
+    files and nothing was copied, so the caller can fall back to a buffered copy.
+    """
+    for method in ("copy_file_range", "sendfile"):
+        if not hasattr(os, method):
+            continue
+        offset = 0
+        try:
+            while offset < size:
+                if method == "copy_file_range":
+                    sent = os.copy_file_range(source_fd, destination_fd, size - offset)
+                else:
+                    sent = os.sendfile(destination_fd, source_fd, offset, size - offset)
+                if sent == 0:
+                    break  # The source got shorter while copying
+                offset += sent
+            return True
+        except OSError as e:
+            if offset or e.errno not in (errno.EXDEV, errno.ENOSYS, errno.EINVAL,
+                                         errno.EOPNOTSUPP, errno.EBADF, errno.ENOTSUP):
+                raise
+    return False
+
+def copy_file_data(source_file, destination_file, size=None, preserve=False):
+    """
+    Copies one file, using zero-copy kernel transfer for large files and a buffered copy
+    otherwise. Metadata (times and permissions) is copied when preserve is True.
+    """
+    if size is None:
+        size = os.path.getsize(source_file)
+    with open(source_file, "rb") as fsrc, open(destination_file, "wb") as fdst:
+        if size < COPY_BUFFER_SIZE:
+            # Small files are copied with a single read and write
+            fdst.write(fsrc.read())
+        elif size < COPY_LARGE_FILE_SIZE or not _kernel_copy(fsrc.fileno(), fdst.fileno(), size):
+            shutil.copyfileobj(fsrc, fdst, COPY_BUFFER_SIZE)
+    if preserve:
+        shutil.copystat(source_file, destination_file)
+    else:
+        shutil.copymode(source_file, destination_file)
+
+def _glob_base(pattern):
+    """Returns the directory part of a glob before its first component with a wildcard."""
+    while glob.has_magic(pattern):
+        pattern = os.path.dirname(pattern)
+    return pattern or os.curdir
+
+def collect_copy_tasks(sources, destination):
+    """
+    Expands globs and directories into a list of (source, destination, size) copy tasks.
+    Directories are copied as a whole into the destination, like 'cp -r'. Glob matches keep
+    their path below the glob's wildcard-free base, so 'src/**/*.txt' copies 'src/a/x.txt'
+    to 'a/x.txt'. Returns None, after printing the conflicts, if two different files would
+    be copied to the same place.
+    """
+    tasks = []
+    sources_by_target = {}
+    conflicts = []
+
+    def add(file_path, target):
+        target = os.path.normpath(target)
+        known = sources_by_target.get(target)
+        if known == file_path:
+            return  # Already added, e.g. by a glob matching both a directory and its files
+        if known is not None:
+            conflicts.append((known, file_path, target))
+            return
+        try:
+            size = os.path.getsize(file_path)
+        except OSError:
+            return
+        sources_by_target[target] = file_path
+        tasks.append((file_path, target, size))
+
+    for source in sources:
+        if glob.has_magic(source):
+            base = _glob_base(source)
+            paths = [(path, os.path.relpath(path, base)) for path in glob.glob(source, recursive=True)]
+        else:
+            paths = [(source, os.path.basename(os.path.normpath(source)))]
+        for path, relative in paths:
+            path = os.path.normpath(path)
+            target = os.path.join(destination, relative)
+            if os.path.isdir(path):
+                for root, dirs, files in os.walk(path):
+                    target_root = os.path.join(target, os.path.relpath(root, path))
+                    for file in files:
+                        add(os.path.join(root, file), os.path.join(target_root, file))
+            elif os.path.isfile(path):
+                add(path, target)
+
+    for first, second, target in conflicts:
+        print(f"Both '{first}' and '{second}' would be copied to '{target}'.")
+    if conflicts:
+        print("Nothing was copied. Copy them separately or with a glob that keeps their directories.")
+        return None
+    return tasks
+
+def copy_files_parallel(tasks, workers=COPY_WORKERS, preserve=False):
+    """
+    Copies (source, destination, size) tasks on a thread pool.
+    Returns (files copied, bytes copied, list of (source, error) failures).
+    """
+    # Create every destination directory up front so workers never race on it
+    for destination_dir in {os.path.dirname(destination) for _, destination, _ in tasks}:
+        if destination_dir:
+            os.makedirs(destination_dir, exist_ok=True)
+
+    def copy_task(task):
+        source, destination, size = task
+        try:
+            copy_file_data(source, destination, size, preserve)
+            return size, None
+        except OSError as e:
+            return 0, e
+
+    files = 0
+    total_bytes = 0
+    errors = []
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        for task, (size, error) in zip(tasks, executor.map(copy_task, tasks)):
+            if error is None:
+                files += 1
+                total_bytes += size
+            else:
+                errors.append((task[0], error))
+    record(files=files, bytes_read=total_bytes, bytes_written=total_bytes)
+    return files, total_bytes, errors
+
+@instrumented("bulkcopy")
+def bulk_copy(sources, destination, workers=COPY_WORKERS, preserve=False):
+    """
+    Copies files, globs and whole directories into a destination directory in parallel
+    and reports the throughput.
+
+    Parameters:
+    - sources: List of file paths, directory paths or glob patterns.
+    - destination: Directory that receives the copies. It is created if needed.
+    - workers: Number of copy threads.
+    - preserve: Whether to keep modification times and permission bits.
+    """
+    tasks = collect_copy_tasks(sources, destination)
+    if tasks is None:
+        return  # Conflicting targets were reported
+    if not tasks:
+        print("No files matched the given sources.")
+        return
+
+    started = time.perf_counter()
+    try:
+        files, total_bytes, errors = copy_files_parallel(tasks, workers, preserve)
+    except OSError as e:
+        print(f"An error occurred: {e}")
+        return
+    elapsed = max(time.perf_counter() - started, 1e-9)
+
+    for source, error in errors:
+        print(f"Could not copy '{source}': {error}")
+    print(f"Copied {files} files ({total_bytes / 1024 ** 2:.1f} MB) to '{destination}' in {elapsed:.2f}s "
+          f"({total_bytes / 1024 ** 2 / elapsed:.1f} MB/s, {files / elapsed:.0f} files/s).")
+
+# Resumable copy settings
+RESUME_BLOCK_SIZE = 16 * 1024 * 1024  # Unit of checkpointing and resume verification
+PROGRESS_INTERVAL = 0.5  # Seconds between progress line updates
+
+def _format_bytes(size):
+    """Formats a byte count for progress and summary lines."""
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024:
+            return f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} TB"
+
+def _read_checkpoint(checkpoint_path, header):
+    """
+    Returns the block digests recorded in a checkpoint file, or an empty list if the file
+    does not exist or was written for a different source or block size.
+    """
+    try:
+        with open(checkpoint_path, "rb") as f:
+            saved_header = json.loads(f.readline())
+            data = f.read()
+    except (OSError, ValueError):
+        return []
+    if saved_header != header:
+        return []
+    # One 16-byte digest per block; a digest cut short by a crash is ignored
+    return [data[i:i + 16] for i in range(0, len(data) - 15, 16)]
+
+def copy_file_resumable(source_file, destination_file, block_size=RESUME_BLOCK_SIZE):
+    """
+    Copies a file through '<destination>.part' and atomically renames it into place.
+
+    After each block, its BLAKE2 digest is appended to '<destination>.part.ckpt'. If the
+    copy is interrupted, running it again re-checks the blocks already in the .part file
+    against those digests and continues after the last one that matches. A BLAKE2b hash of
+    the whole file is computed while copying, so no second read pass is needed.
+    Returns the hex digest of the file, or None if the copy did not finish.
+    """
+    part_path = destination_file + ".part"
+    checkpoint_path = destination_file + ".part.ckpt"
+    source_stat = os.stat(source_file)
+    size = source_stat.st_size
+    header = {"source": os.path.abspath(source_file), "size": size,
+              "mtime_ns": source_stat.st_mtime_ns, "block_size": block_size}
+
+    file_hash = hashlib.blake2b()
+    digests = _read_checkpoint(checkpoint_path, header) if os.path.exists(part_path) else []
+    verified = 0
+    verified_bytes = 0
+    if digests:
+        # Re-check the blocks that were already copied and feed them to the file hash
+        with open(part_path, "rb") as part:
+            for digest in digests:
+                block = part.read(block_size)
+                if hashlib.blake2b(block, digest_size=16).digest() != digest:
+                    break
+                file_hash.update(block)
+                verified += 1
+                verified_bytes += len(block)
+        print(f"Resuming copy after {_format_bytes(verified_bytes)} of verified data.")
+
+    with open(checkpoint_path, "wb") as checkpoint:
+        checkpoint.write(json.dumps(header).encode("utf-8") + b"\n")
+        checkpoint.write(b"".join(digests[:verified]))
+
+    offset = verified_bytes
+    started = last_update = time.perf_counter()
+    last_offset = offset
+    progress_shown = False
+    try:
+        with open(source_file, "rb") as src, \
+                open(part_path, "r+b" if verified else "wb") as part, \
+                open(checkpoint_path, "ab") as checkpoint:
+            src.seek(offset)
+            part.seek(offset)
+            part.truncate()
+            while True:
+                block = src.read(block_size)
+                if not block:
+                    break
+                part.write(block)
+                file_hash.update(block)
+                checkpoint.write(hashlib.blake2b(block, digest_size=16).digest())
+                offset += len(block)
+
+                now = time.perf_counter()
+                if now - last_update >= PROGRESS_INTERVAL:
+                    current = (offset - last_offset) / (now - last_update)
+                    average = (offset - verified_bytes) / (now - started)
+                    percent = offset / size * 100 if size else 100
+                    print(f"\r  {percent:5.1f}%  {_format_bytes(offset)} / {_format_bytes(size)}  "
+                          f"current {_format_bytes(current)}/s  average {_format_bytes(average)}/s   ",
+                          end="", flush=True)
+                    last_update, last_offset = now, offset
+                    progress_shown = True
+            part.flush()
+            os.fsync(part.fileno())
+        if progress_shown:
+            print()
+    except KeyboardInterrupt:
+        print(f"\nCopy interrupted at {_format_bytes(offset)}. Run the same copy again to resume.")
+        return None
+
+    shutil.copymode(source_file, part_path)
+    os.replace(part_path, destination_file)
+    os.remove(checkpoint_path)
+
+    record(files=1, bytes_read=offset, bytes_written=offset - verified_bytes)
+    elapsed = max(time.perf_counter() - started, 1e-9)
+    average = (offset - verified_bytes) / elapsed
+    print(f"File '{source_file}' successfully copied to '{destination_file}' "
+          f"({_format_bytes(offset)} in {elapsed:.2f}s, average {_format_bytes(average)}/s).")
+    print(f"BLAKE2b: {file_hash.hexdigest()}")
+    return file_hash.hexdigest()
+
+# Sync settings
+SYNC_BLOCK_SIZE = 1024 * 1024  # Unit of comparison for delta updates
+SYNC_DELTA_MIN_SIZE = 16 * 1024 * 1024  # Smaller changed files are simply copied again
+
+def _rewrite_changed_blocks(source_file, destination_file, size, block_size=SYNC_BLOCK_SIZE):
+    """
+    Compares the source and destination block by block, rewrites only the blocks that
+    differ and truncates the destination to the source size. Returns the bytes written.
+    The destination is updated in place.
+    """
+    written = 0
+    with open(source_file, "rb") as src, open(destination_file, "r+b") as dst:
+        offset = 0
+        while offset < size:
+            block = src.read(block_size)
+            if not block:
+                break
+            if dst.read(len(block)) != block:
+                dst.seek(offset)
+                dst.write(block)
+                written += len(block)
+            offset += len(block)
+        dst.truncate(offset)
+    return written
+
+def _same_contents(source_file, destination_file, block_size=SYNC_BLOCK_SIZE):
+    """Compares two files of the same size block by block."""
+    with open(source_file, "rb") as src, open(destination_file, "rb") as dst:
+        while True:
+            block = src.read(block_size)
+            if block != dst.read(block_size):
+                return False
+            if not block:
+                return True
+
+def _same_metadata(source_stat, destination_stat):
+    """Tells whether a destination has the size and modification time of its source."""
+    return (destination_stat is not None and destination_stat.st_size == source_stat.st_size
+            and destination_stat.st_mtime_ns == source_stat.st_mtime_ns)
+
+def sync_file(source_file, destination_file, checksum=False, source_stat=None, destination_stat=None):
+    """
+    Brings the destination up to date with the source.
+
+    Files with the same size and modification time are skipped unless checksum is True, in
+    which case their contents are compared block by block. Large changed files only get
+    their differing blocks rewritten. The source's timestamps are copied so the next sync
+    can skip the file. Returns (status, bytes written) where status is 'unchanged',
+    'copied' or 'updated'.
+    """
+    if source_stat is None:
+        source_stat = os.stat(source_file)
+    if destination_stat is None:
+        try:
+            destination_stat = os.stat(destination_file)
+        except FileNotFoundError:
+            destination_stat = None
+
+    size = source_stat.st_size
+    if not checksum and _same_metadata(source_stat, destination_stat):
+        return "unchanged", 0
+    if destination_stat is not None and destination_stat.st_size == size:
+        if checksum and _same_contents(source_file, destination_file):
+            shutil.copystat(source_file, destination_file)
+            return "unchanged", 0
+
+    if destination_stat is not None and size >= SYNC_DELTA_MIN_SIZE:
+        written = _rewrite_changed_blocks(source_file, destination_file, size)
+        shutil.copystat(source_file, destination_file)
+        return "updated", written
+
+    copy_file_data(source_file, destination_file, size, preserve=True)
+    return "copied", size
+
+def _iter_sync_pairs(source, destination):
+    """
+    Walks the source tree and yields (source path, destination path, source stat,
+    destination stat or None) using one scandir per directory on each side.
+    """
+    stack = [(source, destination)]
+    while stack:
+        source_dir, destination_dir = stack.pop()
+        existing = {}
+        try:
+            with os.scandir(destination_dir) as entries:
+                for entry in entries:
+                    existing[entry.name] = entry
+        except OSError:
+            pass
+
+        with os.scandir(source_dir) as entries:
+            for entry in entries:
+                destination_path = os.path.join(destination_dir, entry.name)
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append((entry.path, destination_path))
+                elif entry.is_file():
+                    target = existing.get(entry.name)
+                    try:
+                        target_stat = target.stat() if target is not None and target.is_file() else None
+                        yield entry.path, destination_path, entry.stat(), target_stat
+                    except OSError:
+                        continue
+
+@instrumented("sync")
+def sync_tree(source, destination, checksum=False, workers=COPY_WORKERS):
+    """
+    Synchronizes a directory tree into a destination directory and prints a summary.
+    Unchanged files cost only a stat; changed files are copied or delta-updated in parallel.
+    Files that exist only in the destination are left alone.
+    """
+    if not os.path.isdir(source):
+        print(f"Source directory '{source}' does not exist.")
+        return
+
+    started = time.perf_counter()
+    counts = {"unchanged": 0, "copied": 0, "updated": 0, "failed": 0}
+    written = 0
+
+    def sync_pair(pair):
+        source_file, destination_file, source_stat, destination_stat = pair
+        try:
+            os.makedirs(os.path.dirname(destination_file), exist_ok=True)
+            return sync_file(source_file, destination_file, checksum, source_stat, destination_stat)
+        except OSError as e:
+            print(f"Could not sync '{source_file}': {e}")
+            return "failed", 0
+
+    def finish(future):
+        nonlocal written
+        status, size = future.result()
+        counts[status] += 1
+        written += size
+
+    workers = max(1, workers)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        # Keep a bounded window of pending files, so memory follows the files being copied
+        # rather than the size of the tree
+        pending = deque()
+        for pair in _iter_sync_pairs(source, destination):
+            if not checksum and _same_metadata(pair[2], pair[3]):
+                counts["unchanged"] += 1  # The walk's stats settle it; no task needed
+                continue
+            pending.append(executor.submit(sync_pair, pair))
+            while pending and (pending[0].done() or len(pending) > workers * 4):
+                finish(pending.popleft())
+        while pending:
+            finish(pending.popleft())
+
+    record(files=sum(counts.values()), bytes_written=written)
+    elapsed = time.perf_counter() - started
+    print(f"Synced '{source}' to '{destination}' in {elapsed:.2f}s: {counts['unchanged']} unchanged, "
+          f"{counts['copied']} copied, {counts['updated']} updated, {counts['failed']} failed, "
+          f"{_format_bytes(written)} written.")
+
 def read_code(file):
     """
     Reads and highlights code files with syntax highlighting.
+    Highlighted chunks are cached, so reading an unchanged file again is instant.
     """
     try:
         if not os.path.isfile(file):
             return "File not found. Please check the filename."
 
-        with open(file, 'r') as f:
-            code = f.read()
-
-        lexer = guess_lexer_for_filename(file, code)
-        highlighted_code = highlight(code, lexer, TerminalFormatter())
-        return highlighted_code
+        mm = open_mapped(file)
+        if mm is None:
+            return ""
+        with mm:
+            return "\n".join(iter_highlighted_lines(file, mm, [])) + "\n"
     except Exception as e:
         return f"An error occurred while reading the code file: {e}"
 
-def read_docx(file):
+# Namespace of the WordprocessingML elements in word/document.xml
+WORD_NAMESPACE = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+
+def iter_docx_paragraphs(file, max_chars=None, max_pages=None):
+    """
+    Streams the text of a .docx file paragraph by paragraph, parsing word/document.xml
+    straight from the zip instead of building the whole document model.
+    Each table row is yielded as one line with its cells separated by tabs.
+    Stops after max_chars characters or max_pages pages (as last laid out by Word).
+    """
+    import xml.etree.ElementTree as ET
+    import zipfile
+    w = WORD_NAMESPACE
+    with zipfile.ZipFile(file) as package, package.open("word/document.xml") as xml:
+        paragraphs = []  # Text runs of each open paragraph (text boxes nest paragraphs)
+        cells = []  # Paragraphs of each open table cell
+        rows = []  # Cells of each open table row
+        body, depth, body_depth = None, 0, None
+        chars, pages = 0, 1
+
+        for event, element in ET.iterparse(xml, events=("start", "end")):
+            tag = element.tag
+            if event == "start":
+                depth += 1
+                if tag == w + "p":
+                    paragraphs.append([])
+                elif tag == w + "tc":
+                    cells.append([])
+                elif tag == w + "tr":
+                    rows.append([])
+                elif tag == w + "body":
+                    body, body_depth = element, depth
+                elif max_pages and (tag == w + "lastRenderedPageBreak" or
+                                    (tag == w + "br" and element.get(w + "type") == "page")):
+                    pages += 1
+                    if pages > max_pages:
+                        # Keep the part of the interrupted paragraph that was on the last page
+                        if paragraphs and not cells and any(paragraphs[-1]):
+                            yield "".join(paragraphs[-1])[:max_chars - chars if max_chars else None]
+                        return
+                continue
+
+            depth -= 1
+            line = None
+            if tag == w + "t" and paragraphs:
+                paragraphs[-1].append(element.text or "")
+            elif tag == w + "tab" and paragraphs:
+                paragraphs[-1].append("\t")
+            elif tag in (w + "br", w + "cr") and paragraphs and element.get(w + "type") != "page":
+                paragraphs[-1].append("\n")
+            elif tag == w + "p":
+                text = "".join(paragraphs.pop())
+                if cells:
+                    cells[-1].append(text)
+                else:
+                    line = text
+            elif tag == w + "tc":
+                cell = " ".join(text for text in cells.pop() if text)
+                if rows:
+                    rows[-1].append(cell)
+            elif tag == w + "tr":
+                row = "\t".join(rows.pop())
+                if cells:
+                    cells[-1].append(row)  # Row of a nested table
+                else:
+                    line = row
+
+            if depth == body_depth:
+                body.clear()  # Drop the finished top-level block so memory stays flat
+
+            if line is not None:
+                if max_chars is not None and chars + len(line) >= max_chars:
+                    yield line[:max_chars - chars]
+                    return
+                chars += len(line) + 1
+                yield line
+
+def docx_text(file, max_chars=None, max_pages=None):
+    """
+    Returns the text of a .docx file, including tables.
+    Falls back to python-docx for files the streaming extractor cannot parse.
+    """
+    import xml.etree.ElementTree as ET
+    import zipfile
+    try:
+        return "\n".join(iter_docx_paragraphs(file, max_chars, max_pages))
+    except (zipfile.BadZipFile, KeyError, ET.ParseError):
+        from docx import Document
+        document = Document(file)
+        content = "\n".join([paragraph.text for paragraph in document.paragraphs])
+        return content[:max_chars] if max_chars is not None else content
+
+def read_docx(file, max_chars=None, max_pages=None):
     """
     Reads the text content of a .docx file.
     """
@@ -71,8 +918,7 @@ def read_docx(file):
         if not os.path.isfile(file):
             return "File not found. Please check the filename."
 
-        document = Document(file)
-        content = "\n".join([paragraph.text for paragraph in document.paragraphs])
+        content = docx_text(file, max_chars, max_pages)
         return content if content.strip() else "The document is empty."
     except Exception as e:
         return f"An error occurred while reading the .docx file: {e}"
@@ -92,231 +938,3769 @@ def open_pdf(file):
     except Exception as e:
         return f"An error occurred while opening the PDF file: {e}"
 
-def handle_file(file):
+# File types 'read' knows how to show; 'search --type' selects files by the same sets
+CODE_EXTENSIONS = {".py", ".js", ".java", ".c", ".cpp", ".txt"}
+DOCUMENT_EXTENSIONS = {".docx", ".pdf"}
+
+@instrumented("read")
+def handle_file(file, max_chars=None, max_pages=None, interactive=True):
     """
     Determines the file type and processes it accordingly.
+    max_chars and max_pages limit how much of a document is shown. Without interactive,
+    large code files are printed whole instead of paged.
     """
     _, extension = os.path.splitext(file)
 
-    if extension.lower() in [".py", ".js", ".java", ".c", ".cpp", ".txt"]:
+    if extension.lower() in CODE_EXTENSIONS:
+        if os.path.isfile(file) and os.path.getsize(file) > PAGER_THRESHOLD:
+            # Too large to load and highlight at once
+            if not interactive:
+                print_file(file)
+                return
+            print("\n--- Code File Content (paged) ---")
+            page_file(file, highlight_code=True)
+            return
         print("\n--- Code File Content ---")
         print(read_code(file))
     elif extension.lower() == ".docx":
         print("\n--- Document Content ---")
-        print(read_docx(file))
+        print(read_docx(file, max_chars, max_pages))
     elif extension.lower() == ".pdf":
         print("\n--- Opening PDF ---")
         print(open_pdf(file))
     else:
         print(f"Unsupported file type: {extension}")
 
-def search_files(base_directory, sub_path, search_term, recursive=True):
-    """
-    Search for a term in files within a dynamically constructed directory.
+# Pager settings
+PAGER_THRESHOLD = 1024 * 1024  # 'type' and 'read' page files larger than this
+PAGER_INDEX_STEP = 1000  # Lines between entries of the sparse line-offset index
+PAGER_MAX_LINE_BYTES = 4096  # Longer lines are cut when displayed
+HEXDUMP_WIDTH = 16  # Bytes per row when showing binary files
+FOLLOW_INTERVAL = 0.5  # Seconds between checks for new data in follow mode
 
-    :param base_directory: Base directory to start from.
-    :param sub_path: Additional path to navigate dynamically.
-    :param search_term: The term or regex pattern to search for.
-    :param recursive: Whether to search in subdirectories.
+def open_mapped(file_path):
     """
-    # Construct the full path
-    directory = os.path.join(base_directory, sub_path)
+    Memory-maps a file for reading. Returns None for empty files, which cannot be mapped.
+    """
+    with open(file_path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return None
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
 
-    if not os.path.exists(directory):
-        print(f"The directory '{directory}' does not exist.")
-        return
+def is_binary(mm):
+    """Treats data with a NUL byte in its first 8 KB as binary."""
+    return mm.find(b"\0", 0, 8192) != -1
 
-    print(f"Searching in: {directory}")
-    pattern = re.compile(search_term)
-    matches = []
+def _skip_lines(mm, offset, count):
+    """Returns the offset of the line count lines after offset, or None if the file ends first."""
+    for _ in range(count):
+        position = mm.find(b"\n", offset)
+        if position == -1:
+            return None
+        offset = position + 1
+    return offset if offset < len(mm) else None
 
-    for root, dirs, files in os.walk(directory):
-        for file in files:
-            file_path = os.path.join(root, file)
-            try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    for line_no, line in enumerate(f, 1):
-                        if pattern.search(line):
-                            matches.append((file_path, line_no, line.strip()))
-            except (UnicodeDecodeError, PermissionError):
-                # Skip files that cannot be read
-                pass
+def line_offset(mm, index, line_no):
+    """
+    Returns the byte offset where a 1-based line starts, or None past the end of the file.
 
-        if not recursive:
+    index is a sparse list holding the offsets of lines 1, 1 + PAGER_INDEX_STEP, ... and is
+    extended only as far as needed, so jumping around costs memory per PAGER_INDEX_STEP lines.
+    """
+    if not index:
+        index.append(0)
+    checkpoint = (line_no - 1) // PAGER_INDEX_STEP
+    while len(index) <= checkpoint:
+        offset = _skip_lines(mm, index[-1], PAGER_INDEX_STEP)
+        if offset is None:
+            return None
+        index.append(offset)
+    return _skip_lines(mm, index[checkpoint], (line_no - 1) % PAGER_INDEX_STEP)
+
+def _back_lines(mm, offset, count):
+    """Returns the offset of the line count lines before the line starting at offset."""
+    for _ in range(count):
+        if offset == 0:
             break
+        offset = mm.rfind(b"\n", 0, offset - 1) + 1
+    return offset
 
-    # Print matches
-    if matches:
-        print(f"Found {len(matches)} matches:")
-        for match in matches:
-            print(f"File: {match[0]}, Line: {match[1]}, Content: {match[2]}")
-    else:
-        print("No matches found.")
+def _tail_offset(mm, count):
+    """Returns the offset of the first of the last count lines."""
+    position = len(mm) - 1 if mm[-1:] == b"\n" else len(mm)
+    for _ in range(count):
+        newline = mm.rfind(b"\n", 0, position)
+        if newline == -1:
+            return 0
+        position = newline
+    return position + 1
 
-# Define paths
-RECYCLE_BIN_PATH = Path.home() / ".recycle_bin"
-RECYCLE_BIN_PATH.mkdir(exist_ok=True)  # Create recycle bin if not exist
+def read_window(mm, offset, count, binary=False, max_line_bytes=PAGER_MAX_LINE_BYTES):
+    """
+    Decodes count display lines starting at offset and returns them with the offset that
+    follows. Binary data is shown as a hex dump, text is decoded as UTF-8 with invalid
+    bytes replaced. Lines longer than max_line_bytes are cut, unless it is None.
+    """
+    lines = []
+    while len(lines) < count and offset < len(mm):
+        if binary:
+            row = mm[offset:offset + HEXDUMP_WIDTH]
+            hex_part = " ".join(f"{byte:02x}" for byte in row)
+            text_part = "".join(chr(byte) if 32 <= byte < 127 else "." for byte in row)
+            lines.append(f"{offset:08x}  {hex_part:<{HEXDUMP_WIDTH * 3}} {text_part}")
+            offset += HEXDUMP_WIDTH
+            continue
+        end = mm.find(b"\n", offset)
+        end = len(mm) if end == -1 else end
+        cut = end if max_line_bytes is None else min(end, offset + max_line_bytes)
+        text = mm[offset:cut].rstrip(b"\r").decode("utf-8", "replace")
+        if cut < end:
+            text += " [...]"
+        lines.append(text)
+        offset = end + 1
+    return lines, offset
 
-def delete_file_safely(file_path):
-    """Move a file to a custom recycle bin."""
-    file_path = Path(file_path)
-    if not file_path.exists():
-        print("File not found!")
+def _clip_highlighted(line):
+    """
+    Cuts a highlighted line to PAGER_MAX_LINE_BYTES characters for the pager, without
+    splitting a colour escape sequence, and resets the colour after the cut.
+    """
+    if len(line) <= PAGER_MAX_LINE_BYTES:
+        return line
+    clipped = line[:PAGER_MAX_LINE_BYTES]
+    escape = clipped.rfind("\x1b")
+    if escape != -1 and "m" not in clipped[escape:]:
+        clipped = clipped[:escape]
+    return clipped + "\x1b[0m [...]"
+
+def _print_window(lines, first_line_no):
+    """Prints display lines, numbered when the number of the first one is known."""
+    for i, line in enumerate(lines):
+        prefix = f"{first_line_no + i:>8}  " if first_line_no is not None else ""
+        print(prefix + line)
+
+def print_lines(file_path, start_line=1, count=10):
+    """Prints count lines starting at a 1-based line number without loading the file."""
+    mm = open_mapped(file_path)
+    if mm is None:
+        return
+    with mm:
+        binary = is_binary(mm)
+        offset = (start_line - 1) * HEXDUMP_WIDTH if binary else line_offset(mm, [], start_line)
+        if offset is None or offset >= len(mm):
+            print(f"The file has fewer than {start_line} lines.")
+            return
+        lines, _ = read_window(mm, offset, count, binary)
+        _print_window(lines, start_line)
+
+def print_tail(file_path, count=10):
+    """Prints the last count lines of a file, reading only the end of it."""
+    mm = open_mapped(file_path)
+    if mm is None:
         return
+    with mm:
+        binary = is_binary(mm)
+        if binary:
+            offset = max(0, (len(mm) - 1) // HEXDUMP_WIDTH - count + 1) * HEXDUMP_WIDTH
+        else:
+            offset = _tail_offset(mm, count)
+        lines, _ = read_window(mm, offset, count, binary)
+        _print_window(lines, None)
+
+def print_file(file_path):
+    """Prints a whole file in chunks without a pager, for scripts. Undecodable bytes are replaced."""
+    with open(file_path, encoding="utf-8", errors="replace") as file:
+        for chunk in iter(lambda: file.read(COPY_BUFFER_SIZE), ""):
+            sys.stdout.write(chunk)
 
+def follow_file(file_path, count=10):
+    """
+    Prints the end of a file, then keeps printing data appended to it (like 'tail -f')
+    until Ctrl-C is pressed.
+    """
+    print_tail(file_path, count)
+    position = os.path.getsize(file_path)
+    print(f"--- Following '{file_path}' (Ctrl-C to stop) ---")
     try:
-        # Move file to recycle bin
-        destination = RECYCLE_BIN_PATH / file_path.name
-        shutil.move(str(file_path), str(destination))
-        print(f"File moved to recycle bin: {destination}")
-    except Exception as e:
-        print(f"Error moving file to recycle bin: {e}")
+        with open(file_path, "rb") as f:
+            while True:
+                size = os.fstat(f.fileno()).st_size
+                if size < position:
+                    print("--- File truncated ---")
+                    position = 0
+                if size > position:
+                    f.seek(position)
+                    while position < size:
+                        data = f.read(min(COPY_BUFFER_SIZE, size - position))
+                        if not data:
+                            break
+                        position += len(data)
+                        print(data.decode("utf-8", "replace"), end="", flush=True)
+                else:
+                    time.sleep(FOLLOW_INTERVAL)
+    except KeyboardInterrupt:
+        print()
 
-def recover_file(file_name):
-    """Recover a file from the recycle bin."""
-    file_in_bin = RECYCLE_BIN_PATH / file_name
-    if not file_in_bin.exists():
-        print("File not found in recycle bin!")
+def page_file(file_path, start_line=1, highlight_code=False):
+    """
+    Shows a file one screen at a time. Only the visible window is read from the memory
+    map, so files of any size open instantly and use constant memory.
+    Binary files are shown as a hex dump. With highlight_code, only the chunks around
+    the visible window are syntax highlighted.
+    """
+    mm = open_mapped(file_path)
+    if mm is None:
+        print("The file is empty.")
         return
 
-    try:
-        destination = Path.cwd() / file_name
-        shutil.move(str(file_in_bin), str(destination))
-        print(f"File recovered to: {destination}")
-    except Exception as e:
-        print(f"Error recovering file: {e}")
+    follow = False
+    with mm:
+        binary = is_binary(mm)
+        index = []
+        height = max(5, shutil.get_terminal_size().lines - 2)
+        top = (start_line - 1) * HEXDUMP_WIDTH if binary else line_offset(mm, index, start_line)
+        top_line = start_line  # None when the line number is unknown (e.g. after 'tail')
+        if top is None or top >= len(mm):
+            print(f"The file has fewer than {start_line} lines.")
+            return
 
+        while True:
+            lines, bottom = read_window(mm, top, height, binary)
+            if highlight_code and not binary and top_line is not None:
+                lines = [_clip_highlighted(line) for line in
+                         islice(iter_highlighted_lines(file_path, mm, index, top_line), len(lines))]
+            _print_window(lines, top_line)
+            position = "END" if bottom >= len(mm) else f"{bottom * 100 // len(mm)}%"
+            command = input(f"-- {os.path.basename(file_path)} ({position}) -- "
+                            "[Enter] next, b back, g N line, h head, t tail, f follow, q quit: ").strip().lower()
 
-def command_prompt():
+            if command == "q":
+                break
+            elif command == "":
+                if bottom < len(mm):
+                    top = bottom
+                    top_line = top_line + len(lines) if top_line is not None else None
+            elif command == "b":
+                if binary:
+                    top = max(0, top - height * HEXDUMP_WIDTH)
+                    top_line = top // HEXDUMP_WIDTH + 1
+                else:
+                    top = _back_lines(mm, top, height)
+                    top_line = max(1, top_line - height) if top_line is not None else None
+                    top_line = 1 if top == 0 else top_line
+            elif command == "h":
+                top, top_line = 0, 1
+            elif command == "t":
+                if binary:
+                    top = max(0, (len(mm) - 1) // HEXDUMP_WIDTH - height + 1) * HEXDUMP_WIDTH
+                    top_line = top // HEXDUMP_WIDTH + 1
+                else:
+                    top, top_line = _tail_offset(mm, height), None
+            elif command.startswith("g") and command[1:].strip().isdigit():
+                line_no = max(1, int(command[1:]))
+                offset = (line_no - 1) * HEXDUMP_WIDTH if binary else line_offset(mm, index, line_no)
+                if offset is None or offset >= len(mm):
+                    print(f"The file has fewer than {line_no} lines.")
+                else:
+                    top, top_line = offset, line_no
+            elif command == "f":
+                follow = True
+                break
+            else:
+                print("Unknown pager command.")
+
+    if follow:
+        follow_file(file_path, height)
+
+# Syntax highlighting settings
+HIGHLIGHT_CHUNK_LINES = 200  # Lines highlighted together; each chunk is one cache entry
+HIGHLIGHT_CACHE_MAX_CHARS = 32 * 1024 * 1024  # Highlighted text kept in memory before evicting
+
+_highlight_cache = OrderedDict()  # (path, mtime_ns, size, lexer, chunk) -> highlighted lines
+_highlight_cache_chars = 0
+_highlight_lock = threading.Lock()
+_lexers = {}
+
+def lexer_for_file(file):
     """
-    Mimics a Windows Command Prompt for file navigation with drive access and file copying.
+    Picks a lexer from the file name alone, without reading the contents.
+    Unknown file types fall back to plain text.
     """
-    current_directory = os.getcwd()  # Start in the current working directory
+    extension = os.path.splitext(file)[1].lower()
+    key = extension or os.path.basename(file)  # Names like 'Makefile' have no extension
+    if key not in _lexers:
+        from pygments.lexers import get_lexer_for_filename, TextLexer
+        from pygments.util import ClassNotFound
+        try:
+            # stripnl=False keeps leading blank lines, so chunks keep their line numbers
+            _lexers[key] = get_lexer_for_filename(file, stripnl=False)
+        except ClassNotFound:
+            _lexers[key] = TextLexer(stripnl=False)
+    return _lexers[key]
 
-    print("Welcome to the File Navigator (Windows CMD style).")
-    print("Type 'help' for a list of commands.\n")
+def _cache_get(key):
+    """Returns cached highlighted lines and marks them as recently used."""
+    with _highlight_lock:
+        lines = _highlight_cache.get(key)
+        if lines is not None:
+            _highlight_cache.move_to_end(key)
+        return lines
+
+def _cache_put(key, lines):
+    """Caches highlighted lines, evicting the least recently used chunks when over budget."""
+    global _highlight_cache_chars
+    with _highlight_lock:
+        if key in _highlight_cache:
+            return
+        _highlight_cache[key] = lines
+        _highlight_cache_chars += sum(len(line) for line in lines)
+        while _highlight_cache_chars > HIGHLIGHT_CACHE_MAX_CHARS and len(_highlight_cache) > 1:
+            _, evicted = _highlight_cache.popitem(last=False)
+            _highlight_cache_chars -= sum(len(line) for line in evicted)
+
+def clear_highlight_cache():
+    """Empties the highlighting cache."""
+    global _highlight_cache_chars
+    with _highlight_lock:
+        _highlight_cache.clear()
+        _highlight_cache_chars = 0
+
+def highlight_chunk(mm, index, lexer, cache_key, chunk_no):
+    """
+    Returns the highlighted lines of one HIGHLIGHT_CHUNK_LINES-line chunk of a mapped file,
+    from the cache when possible. Returns an empty list past the end of the file.
 
+    Each chunk is lexed on its own, so a construct spanning a chunk boundary (such as a long
+    docstring) may be coloured differently than it would be in a whole-file pass.
+    """
+    key = cache_key + (chunk_no,)
+    lines = _cache_get(key)
+    record("highlight cache", **{"cache_hits" if lines is not None else "cache_misses": 1})
+    if lines is not None:
+        return lines
+
+    offset = line_offset(mm, index, chunk_no * HIGHLIGHT_CHUNK_LINES + 1)
+    if offset is None:
+        return []
+    # Whole lines: read_code prints them in full, and the pager cuts them itself
+    raw_lines, _ = read_window(mm, offset, HIGHLIGHT_CHUNK_LINES, max_line_bytes=None)
+    from pygments import highlight
+    from pygments.formatters import TerminalFormatter
+    lines = highlight("\n".join(raw_lines) + "\n", lexer, TerminalFormatter()).split("\n")[:len(raw_lines)]
+    if len(lines) != len(raw_lines):
+        lines = raw_lines  # The lexer changed the line structure; show the text uncoloured
+    _cache_put(key, lines)
+    return lines
+
+def iter_highlighted_lines(file_path, mm, index, start_line=1, lexer=None):
+    """
+    Yields highlighted lines of a mapped file starting at a 1-based line number,
+    highlighting one chunk at a time as the caller consumes them.
+    """
+    lexer = lexer or lexer_for_file(file_path)
+    stat = os.stat(file_path)
+    cache_key = (os.path.abspath(file_path), stat.st_mtime_ns, stat.st_size, lexer.name)
+    chunk_no, skip = divmod(start_line - 1, HIGHLIGHT_CHUNK_LINES)
     while True:
-        # Display the current directory in a command-prompt style
-        prompt = f"{current_directory}> "
-        command = input(prompt).strip()
+        lines = highlight_chunk(mm, index, lexer, cache_key, chunk_no)
+        yield from lines[skip:]
+        if len(lines) < HIGHLIGHT_CHUNK_LINES:
+            return
+        chunk_no, skip = chunk_no + 1, 0
 
-        if not command:
-            continue
+# Search engine defaults
+SEARCH_CHUNK_SIZE = 1024 * 1024  # Bytes read from a file per chunk
+SEARCH_WORKERS = os.cpu_count() or 1
+SEARCH_MAX_BUFFERED_MATCHES = 1000  # Matches a worker hands back per file; the rest are streamed
+SEARCH_MAX_LINE_BYTES = 4 * 1024 * 1024  # Longer lines are searched piece by piece instead of kept whole
+SEARCH_LONG_LINE_CONTEXT = 256  # Bytes shown around a match in such a line, and kept between its pieces
+SEARCH_IGNORE_FILES = (".gitignore", ".ignore")  # Per-directory ignore rules in gitignore syntax; .ignore wins
+SEARCH_SKIP_DIRS = {".git", ".hg", ".svn", "node_modules", "__pycache__"}  # Pruned unless --no-ignore
+SEARCH_VENV_MARKER = "pyvenv.cfg"  # Directories holding this file are virtualenvs and are pruned too
+SEARCH_SNIFF_BYTES = 1024  # Header checked for NUL bytes to recognise binary files
+SEARCH_MAX_FILE_SIZE = None  # Default for --max-size; None searches files of any size
+SEARCH_FILE_TYPES = {"code": CODE_EXTENSIONS, "docs": DOCUMENT_EXTENSIONS}  # Names accepted by --type
 
-        # Split the command and arguments
-        parts = command.split()
-        cmd = parts[0].lower()
-        args = parts[1:] if len(parts) > 1 else []
+def parse_size(text):
+    """
+    Converts a size such as '512', '64K', '4M' or '1G' into a number of bytes.
+    """
+    text = text.strip().upper().rstrip("B")
+    units = {"K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}
+    if text and text[-1] in units:
+        return int(float(text[:-1]) * units[text[-1]])
+    return int(text)
 
-        # Handle commands
-        if cmd == "dir":
-            try:
-                print("\n Directory of", current_directory)
-                print()
-                with os.scandir(current_directory) as entries:
-                    for entry in entries:
-                        if entry.is_dir():
-                            print(f"<DIR>        {entry.name}")
-                        elif entry.is_file():
-                            print(f"             {entry.name}")
-            except PermissionError:
-                print("Access denied.")
-        elif cmd == "cd":
-            if len(args) == 0:
-                print(current_directory)
-            elif args[0] == "..":
-                current_directory = os.path.dirname(current_directory)
-            elif len(args) == 1 and args[0].endswith(":"):
-                new_drive = args[0].upper() + "\\"
-                if os.path.exists(new_drive):
-                    current_directory = new_drive
-                else:
-                    print(f"The system cannot find the drive specified: '{new_drive}'")
-            else:
-                new_path = os.path.join(current_directory, " ".join(args))
-                if os.path.isdir(new_path):
-                    current_directory = new_path
-                else:
-                    print(f"The system cannot find the path specified: '{new_path}'")
-        elif cmd == "type":
-            if len(args) == 0:
-                print("The syntax of the command is incorrect.")
-            else:
-                file_name = " ".join(args)
-                file_path = os.path.join(current_directory, file_name)
-                if os.path.isfile(file_path):
-                    try:
-                        with open(file_path, 'r', encoding='utf-8') as file:
-                            print("\n" + "-" * 40)
-                            print(file.read())
-                            print("-" * 40)
-                    except (UnicodeDecodeError, PermissionError):
-                        print(f"Could not read the file '{file_name}'.")
-                else:
-                    print(f"The system cannot find the file specified: '{file_name}'")
-        elif cmd == "drives":
-            drives = list_drives()
-            if drives:
-                print("Available drives:")
-                for drive in drives:
-                    print(f"  {drive}")
+def parse_options(args, flags=()):
+    """
+    Splits command arguments into '--name value' options and positional arguments.
+    Names listed in flags, and options not followed by a value, are stored as True.
+    """
+    options = {}
+    positional = []
+    i = 0
+    while i < len(args):
+        if args[i].startswith("--"):
+            name = args[i][2:].replace("-", "_")
+            if name not in flags and i + 1 < len(args) and not args[i + 1].startswith("--"):
+                options[name] = args[i + 1]
+                i += 2
             else:
-                print("No drives found.")
-        elif cmd == "exit":
-            print("Exiting File Navigator.")
-            break
-        elif cmd == "copy":
-            # Interactive file copy process
-            print("\n--- File Copy ---")
-            source_file = input("Enter the full path of the source file: ").strip()
-            destination_file = input("Enter the full path of the destination file (including the new name): ").strip()
-            copy_file_dynamic(source_file, destination_file)
-        elif cmd == "read":
-            if len(argv) > 1:
-                filename = argv[1]
-                filename = input("Enter the file name (with extension): ").strip()
-
-            # Handle the file
-            handle_file(filename)
-        elif cmd == "search":
-            print("\n--- File Search ---")
-            base_directory = input("Enter base directory path: ").strip()
-            sub_directory = input("Enter subdirectory path (relative to base directory): ").strip()
-            term_to_search = input("Enter search term or regex pattern: ").strip()
-            is_recursive = input("Search recursively? (yes/no): ").strip().lower() == 'yes'
-            search_files(base_directory, sub_directory, term_to_search, is_recursive)
-
-        elif cmd == "delete":
-            print("\nFile Management System")
-            print("1. Delete a file")
-            print("2. Recover a file")
-            choice = input("Enter your choice (1/2): ").strip()
-
-            if choice == "1":
-                file_to_delete = input("Enter the full path of the file to delete: ").strip()
-                delete_file_safely(file_to_delete)
-            elif choice == "2":
-                file_to_recover = input("Enter the name of the file to recover: ").strip()
-                recover_file(file_to_recover)
+                options[name] = True
+                i += 1
+        else:
+            positional.append(args[i])
+            i += 1
+    return options, positional
+
+def _required_literals(items):
+    """
+    Collects the literal runs that every match of a parsed regex must contain.
+    """
+    runs = []
+    current = []
+    for op, av in items:
+        if op is sre_parse.LITERAL:
+            current.append(chr(av))
+            continue
+        runs.append("".join(current))
+        current = []
+        if op is sre_parse.SUBPATTERN and not av[1] & re.IGNORECASE:
+            runs.extend(_required_literals(av[-1]))
+        elif op in (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT) and av[0] >= 1:
+            runs.extend(_required_literals(av[2]))
+    runs.append("".join(current))
+    return runs
+
+def required_literals(search_term):
+    """
+    Returns the literal strings that every match of the regex must contain.
+    The list is empty when the pattern has no usable literal (e.g. case-insensitive).
+    """
+    try:
+        parsed = sre_parse.parse(search_term)
+    except re.error:
+        return []
+    if parsed.state.flags & re.IGNORECASE:
+        return []
+    return [run for run in _required_literals(list(parsed)) if run]
+
+def longest_literal(search_term):
+    """
+    Returns the longest literal string that every match of the regex must contain,
+    or an empty string when the pattern has no usable literal.
+    """
+    return max(required_literals(search_term), key=len, default="")
+
+def _long_line_match(pattern, needle, data):
+    """
+    Checks part of a line too long to keep whole (see SEARCH_MAX_LINE_BYTES). With a literal,
+    only the SEARCH_LONG_LINE_CONTEXT bytes around each of its hits are matched against the
+    pattern. Returns the matching text with that much context, or None.
+    """
+    if needle:
+        pos = data.find(needle)
+        while pos != -1:
+            window = data[max(0, pos - SEARCH_LONG_LINE_CONTEXT):pos + len(needle) + SEARCH_LONG_LINE_CONTEXT]
+            text = window.decode("utf-8", "replace")
+            if pattern.search(text):
+                return text.strip()
+            pos = data.find(needle, pos + 1)
+        return None
+    text = data.decode("utf-8", "replace")
+    match = pattern.search(text)
+    if match is None:
+        return None
+    return text[max(0, match.start() - SEARCH_LONG_LINE_CONTEXT):match.end() + SEARCH_LONG_LINE_CONTEXT].strip()
+
+def iter_file_matches(file_path, search_term, literal="", chunk_size=SEARCH_CHUNK_SIZE, counters=None,
+                      max_size=None, skip_binary=False):
+    """
+    Searches a single file for the pattern and yields (file_path, line_no, line) matches.
+
+    The file is read as large binary chunks. When a literal is given, chunks that do not
+    contain it are skipped after counting their newlines, and only the lines around literal
+    hits are decoded and checked against the regex. Lines longer than SEARCH_MAX_LINE_BYTES
+    are searched piece by piece and reported once, with context around the match only.
+    Documents with a text extractor (.docx, .pdf) are searched through their extracted text.
+    When a counters dict is given, its 'bytes_read' entry is increased as chunks are read.
+    Files larger than max_size are skipped, and so are files with a NUL byte in their first
+    SEARCH_SNIFF_BYTES when skip_binary is set.
+    """
+    if max_size is not None:
+        try:
+            if os.path.getsize(file_path) > max_size:
+                return
+        except OSError:
+            return
+    if extractor_for(file_path) is not None:
+        yield from iter_document_matches(file_path, search_term, literal)
+        return
+
+    pattern = re.compile(search_term)
+    needle = literal.encode("utf-8")
+    line_no = 1  # Line number of the first line in the current block
+    carry = bytearray()  # Start of a line continued in the next chunk
+    in_long_line = long_line_matched = False  # Whether carry is the overlap of an overlong line
+
+    try:
+        with open(file_path, "rb") as f:
+            header = b""
+            if skip_binary:
+                # The header is searched as the first chunk
+                header = f.read(SEARCH_SNIFF_BYTES)
+                if counters is not None:
+                    counters["bytes_read"] += len(header)
+                if b"\0" in header:
+                    return
+            while True:
+                chunk, header = header or f.read(chunk_size), b""
+                if counters is not None:
+                    counters["bytes_read"] += len(chunk)
+                if chunk:
+                    # Only handle complete lines; the tail is carried into the next chunk
+                    cut = chunk.rfind(b"\n") + 1
+                    if cut == 0:
+                        carry += chunk  # In place, so a line without newlines is not copied again
+                        if len(carry) > SEARCH_MAX_LINE_BYTES:
+                            # Too long to keep: check what there is and keep only the overlap
+                            if not long_line_matched:
+                                text = _long_line_match(pattern, needle, carry)
+                                if text is not None:
+                                    long_line_matched = True
+                                    yield file_path, line_no, text
+                            del carry[:-SEARCH_LONG_LINE_CONTEXT]
+                            in_long_line = True
+                        continue
+                    block, carry = carry + chunk[:cut], bytearray(chunk[cut:])
+                else:
+                    block, carry = carry, bytearray()
+
+                if in_long_line:
+                    # The block starts with the rest of the long line
+                    end = block.find(b"\n")
+                    end = len(block) if end == -1 else end
+                    if not long_line_matched:
+                        text = _long_line_match(pattern, needle, block[:end])
+                        if text is not None:
+                            yield file_path, line_no, text
+                    if end < len(block):
+                        line_no += 1
+                    block = block[end + 1:]
+                    in_long_line = long_line_matched = False
+
+                counted = 0  # Position up to which newlines have been added to line_no
+                pos = block.find(needle) if needle else 0
+                while pos != -1 and pos < len(block):
+                    start = block.rfind(b"\n", 0, pos) + 1
+                    end = block.find(b"\n", pos)
+                    end = len(block) if end == -1 else end
+                    line_no += block.count(b"\n", counted, start)
+                    counted = start
+
+                    text = block[start:end].rstrip(b"\r").decode("utf-8")
+                    if pattern.search(text):
+                        yield file_path, line_no, text.strip()
+
+                    pos = block.find(needle, end + 1) if needle else end + 1
+                line_no += block.count(b"\n", counted)
+
+                if not chunk:
+                    break
+    except (UnicodeDecodeError, PermissionError):
+        # Skip the rest of files that cannot be read
+        pass
+
+def search_file(file_path, search_term, literal="", chunk_size=SEARCH_CHUNK_SIZE, max_count=None,
+                counters=None, max_size=None, skip_binary=False):
+    """
+    Returns the matches of the pattern in a single file as a list, stopping after max_count.
+    """
+    matches = iter_file_matches(file_path, search_term, literal, chunk_size, counters, max_size, skip_binary)
+    return list(islice(matches, max_count))
+
+def _search_file_task(task):
+    """
+    Unpacks a search task for the worker pool. Returns up to SEARCH_MAX_BUFFERED_MATCHES
+    matches, whether those are all of them, and the number of bytes read, which the caller
+    records since worker processes have statistics of their own.
+    """
+    *arguments, max_count, max_size, skip_binary = task
+    buffered = SEARCH_MAX_BUFFERED_MATCHES + 1  # One more tells whether the file has further matches
+    if max_count is not None:
+        buffered = min(buffered, max_count)
+    counters = {"bytes_read": 0}
+    matches = search_file(*arguments, buffered, counters=counters, max_size=max_size, skip_binary=skip_binary)
+    complete = len(matches) <= SEARCH_MAX_BUFFERED_MATCHES
+    return matches[:SEARCH_MAX_BUFFERED_MATCHES], complete, counters["bytes_read"]
+
+def ignore_rule_regex(pattern):
+    """
+    Translates a pattern in gitignore syntax, without its '!' and trailing '/', into a regex
+    matching '/'-separated paths relative to the directory the pattern belongs to.
+    Patterns without a '/' match a name at any depth.
+    """
+    anchored = "/" in pattern
+    pattern = pattern[1:] if pattern.startswith("/") else pattern
+    parts = []
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        at_start = i == 0 or pattern[i - 1] == "/"
+        if at_start and pattern.startswith("**/", i):
+            parts.append("(?:.*/)?")
+            i += 3
+            continue
+        if at_start and pattern[i:] == "**":
+            parts.append(".*")
+            break
+        i += 1
+        if char == "*":
+            parts.append("[^/]*")
+        elif char == "?":
+            parts.append("[^/]")
+        elif char == "[" and "]" in pattern[i + 1:]:
+            end = pattern.index("]", i + 1)
+            members = pattern[i:end].replace("\\", "\\\\").replace("[", "\\[")
+            i = end + 1
+            if members[:1] in ("!", "^"):
+                members = "^" + members[1:]
+            parts.append(f"[{members}]")
+        elif char == "\\" and i < len(pattern):
+            parts.append(re.escape(pattern[i]))
+            i += 1
+        else:
+            parts.append(re.escape(char))
+    return re.compile(("" if anchored else "(?:.*/)?") + "".join(parts) + r"\Z")
+
+def read_ignore_rules(directory):
+    """
+    Reads the SEARCH_IGNORE_FILES of a directory and returns their rules in precedence order
+    as (regex, negate, dir_only) tuples.
+    """
+    rules = []
+    for name in SEARCH_IGNORE_FILES:
+        try:
+            with open(os.path.join(directory, name), encoding="utf-8", errors="replace") as f:
+                lines = f.read().splitlines()
+        except OSError:
+            continue
+        for line in lines:
+            if not line.strip() or line.startswith("#"):
+                continue
+            stripped = line.rstrip(" ")
+            if stripped.endswith("\\") and len(stripped) < len(line):
+                stripped += " "  # An escaped trailing space is kept
+            negate = stripped.startswith("!")
+            pattern = stripped[1:] if negate else stripped
+            dir_only = pattern.endswith("/")
+            pattern = pattern.rstrip("/")
+            if pattern:
+                rules.append((ignore_rule_regex(pattern), negate, dir_only))
+    return rules
+
+def is_ignored(layers, relative, is_dir):
+    """
+    Tells whether ignore rules exclude a path given relative to the top of the walk.
+    layers holds (prefix, strip, rules) from the outermost directory in: the path seen by the
+    rules of a layer is prefix + relative[strip:]. As in git, the last matching rule of the
+    innermost layer that has one decides.
+    """
+    for prefix, strip, rules in reversed(layers):
+        path = prefix + relative[strip:]
+        for regex, negate, dir_only in reversed(rules):
+            if (is_dir or not dir_only) and regex.match(path):
+                return not negate
+    return False
+
+class SearchFilter:
+    """
+    Decides which files a search reads. While walking, directories matched by ignore rules,
+    SEARCH_SKIP_DIRS, virtualenvs or an exclude glob are pruned before they are listed, and
+    files are picked by ignore rules, include/exclude globs and extensions. Size and the
+    binary sniff are checked by the worker that opens the file (see iter_file_matches).
+    """
+
+    def __init__(self, ignore=True, include=(), exclude=(), extensions=None,
+                 max_size=SEARCH_MAX_FILE_SIZE, skip_binary=True):
+        """
+        :param ignore: Honour SEARCH_IGNORE_FILES, SEARCH_SKIP_DIRS and virtualenvs.
+        :param include: Globs (gitignore syntax, relative to the search directory); only
+                        files matching one of them are searched.
+        :param exclude: Globs of files and directories not to search.
+        :param extensions: Extensions such as '.py' to search, or None for all.
+        :param max_size: Skip files larger than this many bytes.
+        :param skip_binary: Skip files whose header contains a NUL byte.
+        """
+        self.ignore = ignore
+        self.include = [ignore_rule_regex(pattern.rstrip("/")) for pattern in include]
+        self.exclude = [ignore_rule_regex(pattern.rstrip("/")) for pattern in exclude]
+        self.extensions = {extension.lower() for extension in extensions} if extensions else None
+        self.max_size = max_size
+        self.skip_binary = skip_binary
+        self.pruned_dirs = 0
+        self.skipped_files = 0
+
+    def parent_layers(self, directory):
+        """
+        Returns the ignore layers of the directories between a directory and the root of the
+        git repository containing it, whose rules also cover the files being searched.
+        """
+        current = os.path.abspath(directory)
+        ancestors = []
+        while not os.path.exists(os.path.join(current, ".git")):
+            parent = os.path.dirname(current)
+            if parent == current:
+                return []  # Not inside a repository
+            ancestors.append((parent, os.path.basename(current)))
+            current = parent
+        layers = []
+        below = ""  # Path from the ancestor down to the search directory
+        for ancestor, child in ancestors:
+            below = f"{child}/{below}"
+            rules = read_ignore_rules(ancestor)
+            if rules:
+                layers.append((below, 0, rules))
+        return layers[::-1]
+
+    def walk(self, directory, recursive=True):
+        """Yields the paths of the files to search under a directory in walk order."""
+        pending = {directory: ("", self.parent_layers(directory) if self.ignore else [])}
+        for root, dirs, files in walk_tree(directory):
+            relative_root, layers = pending.pop(root)
+            prefix = relative_root + "/" if relative_root else ""
+            if self.ignore:
+                if relative_root and SEARCH_VENV_MARKER in files:
+                    self.pruned_dirs += 1
+                    dirs.clear()
+                    continue
+                rules = read_ignore_rules(root) if any(name in files for name in SEARCH_IGNORE_FILES) else None
+                if rules:
+                    layers = layers + [("", len(prefix), rules)]
+
+            kept = []
+            for name in dirs if recursive else ():
+                relative = prefix + name
+                if (self.ignore and (name in SEARCH_SKIP_DIRS or is_ignored(layers, relative, True))
+                        or any(regex.match(relative) for regex in self.exclude)):
+                    self.pruned_dirs += 1
+                    continue
+                kept.append(name)
+                pending[os.path.join(root, name)] = (relative, layers)
+            dirs[:] = kept  # Pruned directories are never listed
+
+            for name in files:
+                relative = prefix + name
+                if (self.extensions is not None and os.path.splitext(name)[1].lower() not in self.extensions
+                        or self.include and not any(regex.match(relative) for regex in self.include)
+                        or any(regex.match(relative) for regex in self.exclude)
+                        or self.ignore and is_ignored(layers, relative, False)):
+                    self.skipped_files += 1
+                    continue
+                yield os.path.join(root, name)
+
+def iter_files(directory, recursive=True, search_filter=None):
+    """
+    Yields the paths of the files under a directory in walk order, or only those a
+    SearchFilter picks.
+    """
+    if search_filter is not None:
+        yield from search_filter.walk(directory, recursive)
+        return
+    for root, dirs, files in walk_tree(directory):
+        for file in files:
+            yield os.path.join(root, file)
+
+        if not recursive:
+            break
+
+def iter_search_matches(directory, search_term, recursive=True, workers=SEARCH_WORKERS,
+                        chunk_size=SEARCH_CHUNK_SIZE, mode="auto", use_index=True,
+                        max_count=None, max_per_file=None, search_filter=None):
+    """
+    Searches the files under a directory on a worker pool and yields matches in walk order
+    as soon as the files before them are done.
+
+    :param mode: 'thread', 'process', or 'auto' (threads when a literal prefilter is
+                 available and the work is mostly I/O, processes for regex-heavy patterns).
+    :param use_index: Whether to narrow the candidate files with a trigram index, if one exists.
+    :param max_count: Stop after this many matches in total.
+    :param max_per_file: Stop reading a file after this many matches in it.
+    :param search_filter: SearchFilter choosing the files to read; the default one when None.
+    """
+    if max_count is not None and max_count <= 0:
+        return
+    search_filter = search_filter or SearchFilter()
+    literal = longest_literal(search_term)
+    may_match = index_filter(directory, search_term) if use_index else None
+    if mode == "auto":
+        mode = "thread" if literal else "process"
+    if mode == "process":
+        from concurrent.futures import ProcessPoolExecutor as executor_class
+    else:
+        executor_class = ThreadPoolExecutor
+    file_limit = min((limit for limit in (max_count, max_per_file) if limit is not None), default=None)
+    remaining = max_count
+    workers = max(1, workers)
+
+    executor = executor_class(max_workers=workers)
+    try:
+        # Keep a bounded window of pending files so results come back in a stable order
+        # and memory stays flat however many files and matches there are
+        pending = deque()
+        files = iter_files(directory, recursive, search_filter)
+        while True:
+            if len(pending) < workers * 4:
+                file_path = next(files, None)
+                if file_path is not None:
+                    if may_match is not None:
+                        # The index answers for files it rules out; the others still need reading
+                        candidate = may_match(file_path)
+                        record("search index", **{"cache_misses" if candidate else "cache_hits": 1})
+                    if may_match is None or candidate:
+                        task = (file_path, search_term, literal, chunk_size, file_limit,
+                                search_filter.max_size, search_filter.skip_binary)
+                        pending.append(executor.submit(_search_file_task, task))
+                    # Hand out finished results before walking further
+                    if not (pending and pending[0].done()):
+                        continue
+            if not pending:
+                break
+
+            matches, complete, bytes_read = pending.popleft().result()
+            record(files=1, bytes_read=bytes_read)
+            counters = {"bytes_read": 0}
+            if not complete:
+                # Too many matches to hand back at once: stream the rest of the file from here,
+                # so memory stays flat even for one huge file full of matches
+                rest = iter_file_matches(matches[0][0], search_term, literal, chunk_size, counters,
+                                         search_filter.max_size, search_filter.skip_binary)
+                matches = chain(matches, islice(rest, len(matches), file_limit))
+            try:
+                for match in matches:
+                    yield match
+                    if remaining is not None:
+                        remaining -= 1
+                        if remaining <= 0:
+                            return
+            finally:
+                if counters["bytes_read"]:
+                    record(bytes_read=counters["bytes_read"])
+    finally:
+        # Stops the walk early on max_count or when the consumer closes the generator.
+        # Worker processes are waited for (only files already being read are finished),
+        # otherwise the pool's exit handler fails when a one-shot command ends right away.
+        executor.shutdown(wait=mode == "process", cancel_futures=True)
+
+@instrumented("search")
+def search_files(base_directory, sub_path, search_term, recursive=True, workers=SEARCH_WORKERS,
+                 chunk_size=SEARCH_CHUNK_SIZE, mode="auto", use_index=True,
+                 max_count=None, max_per_file=None, json_output=False, search_filter=None, refresh=True):
+    """
+    Search for a term in files within a dynamically constructed directory.
+    Matches are printed as they are found.
+
+    :param base_directory: Base directory to start from.
+    :param sub_path: Additional path to navigate dynamically.
+    :param search_term: The term or regex pattern to search for.
+    :param recursive: Whether to search in subdirectories.
+    :param workers: Number of worker threads or processes.
+    :param chunk_size: Number of bytes read from a file at a time.
+    :param mode: 'thread', 'process' or 'auto'.
+    :param use_index: Whether to use and refresh a trigram index covering the directory.
+    :param max_count: Stop after this many matches in total.
+    :param max_per_file: Report at most this many matches per file.
+    :param json_output: Print each match as a JSON object on its own line, and errors as
+                        {"error": message}, with no banner or summary.
+    :param search_filter: SearchFilter choosing the files to read; by default ignore files
+                          are honoured and binary files skipped.
+    :param refresh: Whether to refresh the index before using it. Batch mode refreshes it
+                    once up front instead, so searches running side by side only read it.
+    """
+    # Construct the full path
+    directory = os.path.join(base_directory, sub_path)
+
+    if not os.path.exists(directory):
+        message = f"The directory '{directory}' does not exist."
+        print(json.dumps({"error": message}) if json_output else message)
+        return
+
+    try:
+        re.compile(search_term)
+    except re.error as e:
+        message = f"Invalid search pattern: {e}"
+        print(json.dumps({"error": message}) if json_output else message)
+        return
+
+    # Pick up files added or removed since the index was last updated
+    if use_index and refresh and find_index(directory) is not None:
+        refresh_index(directory, check_files=False, verbose=not json_output)
+
+    if not json_output:
+        print(f"Searching in: {directory}")
+    count = 0
+    search_filter = search_filter or SearchFilter()
+    matches = iter_search_matches(directory, search_term, recursive, workers, chunk_size, mode,
+                                  use_index, max_count, max_per_file, search_filter)
+    try:
+        for file_path, line_no, content in matches:
+            if json_output:
+                print(json.dumps({"file": file_path, "line": line_no, "content": content}))
+            else:
+                print(f"File: {file_path}, Line: {line_no}, Content: {content}")
+            count += 1
+    except KeyboardInterrupt:
+        print("Search interrupted.")
+    finally:
+        matches.close()
+
+    # Print summary
+    if json_output:
+        return
+    if count:
+        limited = " (limit reached)" if max_count is not None and count >= max_count else ""
+        print(f"Found {count} matches{limited}.")
+    else:
+        print("No matches found.")
+    if search_filter.pruned_dirs or search_filter.skipped_files:
+        print(f"Skipped {search_filter.pruned_dirs} ignored directories and "
+              f"{search_filter.skipped_files} filtered files.")
+
+# Trigram index
+CACHE_PATH = Path.home() / ".fmt_cache"
+INDEX_CACHE_PATH = CACHE_PATH / "index"
+INDEX_MAX_FILE_SIZE = 64 * 1024 * 1024  # Larger files are always scanned
+INDEX_LOCK_TIMEOUT = 30  # Seconds to wait for another session writing the same index
+
+def _index_path(directory):
+    """Returns the location of the index database for a directory."""
+    key = hashlib.sha1(os.path.abspath(directory).encode("utf-8")).hexdigest()
+    return INDEX_CACHE_PATH / f"{key}.sqlite"
+
+def find_index(directory):
+    """
+    Returns (root, index_path) for the index covering the directory or one of its parents,
+    or None if no such index exists.
+    """
+    root = os.path.abspath(directory)
+    while True:
+        index_path = _index_path(root)
+        if index_path.exists():
+            return root, index_path
+        parent = os.path.dirname(root)
+        if parent == root:
+            return None
+        root = parent
+
+def data_trigrams(data):
+    """Returns the set of 3-byte sequences in the data as (byte, byte, byte) tuples."""
+    return set(zip(data, data[1:], data[2:]))
+
+def _trigram_key(trigram):
+    """Packs a trigram tuple into the integer key used by the index database."""
+    return (trigram[0] << 16) | (trigram[1] << 8) | trigram[2]
+
+def file_trigrams(file_path):
+    """Returns the set of trigrams found in a file, or in the extracted text of a document."""
+    if extractor_for(file_path) is not None:
+        return data_trigrams((extracted_text(file_path) or "").encode("utf-8"))
+    with open(file_path, "rb") as f:
+        return data_trigrams(f.read())
+
+def pattern_trigrams(search_term):
+    """Returns the trigrams that every file matching the pattern must contain."""
+    trigrams = set()
+    for literal in required_literals(search_term):
+        trigrams |= data_trigrams(literal.encode("utf-8"))
+    return trigrams
+
+def _create_index_schema(conn):
+    """Creates the tables of an empty index database."""
+    conn.executescript("""
+        CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT);
+        CREATE TABLE files (id INTEGER PRIMARY KEY, path TEXT UNIQUE, inode INTEGER,
+                            size INTEGER, mtime_ns INTEGER, indexed INTEGER);
+        CREATE TABLE dirs (path TEXT PRIMARY KEY, mtime_ns INTEGER);
+        CREATE TABLE postings (trigram INTEGER PRIMARY KEY, file_ids BLOB);
+    """)
+
+def _index_is_current(conn):
+    """
+    Tells whether an index database has the stat manifest refresh_index compares against.
+    Indexes written by older versions lack the dirs table and the inode column.
+    """
+    tables = {name for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(files)")}
+    return "dirs" in tables and {"inode", "mtime_ns"} <= columns
+
+def scan_changes(root, conn, check_files=True):
+    """
+    Compares the tree under root with the file and directory manifest stored in an index.
+
+    Returns (changed, removed_ids, dirs): the (relative path, stat) of every added or
+    modified file, the ids of deleted or modified files, and the new directory manifest.
+
+    Directories whose mtime has not moved are not listed again. Editing a file in place does
+    not touch its directory's mtime, so the files of such directories are still stat'ed
+    unless check_files is False.
+    """
+    known_files = {}
+    files_by_dir = defaultdict(list)
+    for file_id, path, inode, size, mtime_ns in conn.execute(
+            "SELECT id, path, inode, size, mtime_ns FROM files"):
+        known_files[path] = (file_id, inode, size, mtime_ns)
+        files_by_dir[os.path.dirname(path)].append(path)
+    known_dirs = dict(conn.execute("SELECT path, mtime_ns FROM dirs"))
+    subdirs_by_dir = defaultdict(list)
+    for path in known_dirs:
+        if path:
+            subdirs_by_dir[os.path.dirname(path)].append(path)
+
+    changed = []
+    seen = set()
+    dirs = {}
+    stack = [""]
+    while stack:
+        rel_dir = stack.pop()
+        try:
+            dir_mtime = os.stat(os.path.join(root, rel_dir)).st_mtime_ns
+        except OSError:
+            continue
+        dirs[rel_dir] = dir_mtime
+
+        if known_dirs.get(rel_dir) == dir_mtime:
+            # Same entries as last time: reuse the manifest instead of listing the directory
+            stack.extend(subdirs_by_dir[rel_dir])
+            for path in files_by_dir[rel_dir]:
+                if not check_files:
+                    seen.add(path)
+                    continue
+                try:
+                    stat = os.stat(os.path.join(root, path))
+                except OSError:
+                    continue
+                seen.add(path)
+                if (stat.st_ino, stat.st_size, stat.st_mtime_ns) != known_files[path][1:]:
+                    changed.append((path, stat))
+            continue
+
+        try:
+            with os.scandir(os.path.join(root, rel_dir)) as entries:
+                for entry in entries:
+                    path = os.path.join(rel_dir, entry.name)
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(path)
+                            continue
+                        if not entry.is_file():
+                            continue
+                        stat = entry.stat()
+                    except OSError:
+                        continue
+                    seen.add(path)
+                    known = known_files.get(path)
+                    if known is None or (stat.st_ino, stat.st_size, stat.st_mtime_ns) != known[1:]:
+                        changed.append((path, stat))
+        except OSError:
+            continue
+
+    changed_paths = {path for path, _ in changed}
+    removed_ids = [known[0] for path, known in known_files.items()
+                   if path not in seen or path in changed_paths]
+    return changed, removed_ids, dirs
+
+def _apply_index_changes(conn, root, changed, removed_ids, dirs):
+    """
+    Tokenizes the changed files and updates the files, dirs and postings tables.
+    Ids of removed files are left in the posting lists and skipped at query time.
+    """
+    conn.executemany("DELETE FROM files WHERE id = ?", ((file_id,) for file_id in removed_ids))
+
+    # New posting entries are collected in memory and written once per trigram
+    postings = defaultdict(list)
+    for path, stat in changed:
+        indexed = stat.st_size <= INDEX_MAX_FILE_SIZE
+        try:
+            trigrams = file_trigrams(os.path.join(root, path)) if indexed else ()
+        except OSError:
+            continue
+        cursor = conn.execute(
+            "INSERT INTO files (path, inode, size, mtime_ns, indexed) VALUES (?, ?, ?, ?, ?)",
+            (path, stat.st_ino, stat.st_size, stat.st_mtime_ns, int(indexed)))
+        file_id = cursor.lastrowid
+        for trigram in trigrams:
+            postings[trigram].append(file_id)
+
+    for trigram, file_ids in postings.items():
+        key = _trigram_key(trigram)
+        row = conn.execute("SELECT file_ids FROM postings WHERE trigram = ?", (key,)).fetchone()
+        data = (row[0] if row else b"") + array("I", file_ids).tobytes()
+        conn.execute("INSERT OR REPLACE INTO postings VALUES (?, ?)", (key, data))
+
+    conn.execute("DELETE FROM dirs")
+    conn.executemany("INSERT INTO dirs VALUES (?, ?)", dirs.items())
+
+    row = conn.execute("SELECT value FROM meta WHERE key = 'dead_files'").fetchone()
+    dead_files = (int(row[0]) if row else 0) + len(removed_ids)
+    live_files = conn.execute("SELECT COUNT(*) FROM files").fetchone()[0]
+    if dead_files > max(1000, live_files // 4):
+        _compact_postings(conn)
+        dead_files = 0
+    conn.executemany("INSERT OR REPLACE INTO meta VALUES (?, ?)",
+                     [("dead_files", str(dead_files)), ("updated_at", str(time.time()))])
+
+def _compact_postings(conn):
+    """Removes the ids of deleted files from every posting list."""
+    live_ids = {row[0] for row in conn.execute("SELECT id FROM files")}
+    for key, data in conn.execute("SELECT trigram, file_ids FROM postings").fetchall():
+        file_ids = array("I")
+        file_ids.frombytes(data)
+        live = array("I", [file_id for file_id in file_ids if file_id in live_ids])
+        if not live:
+            conn.execute("DELETE FROM postings WHERE trigram = ?", (key,))
+        elif len(live) != len(file_ids):
+            conn.execute("UPDATE postings SET file_ids = ? WHERE trigram = ?", (live.tobytes(), key))
+
+@instrumented("index build")
+def build_index(directory):
+    """
+    Builds the trigram index for every file under a directory and stores it in the cache.
+    """
+    root = os.path.abspath(directory)
+    if not os.path.isdir(root):
+        print(f"The directory '{root}' does not exist.")
+        return
+
+    INDEX_CACHE_PATH.mkdir(parents=True, exist_ok=True)
+    index_path = _index_path(root)
+    temp_path = index_path.with_suffix(".tmp")
+    if temp_path.exists():
+        temp_path.unlink()
+
+    started = time.perf_counter()
+    conn = sqlite3.connect(temp_path)
+    try:
+        _create_index_schema(conn)
+        changed, removed_ids, dirs = scan_changes(root, conn)
+        _apply_index_changes(conn, root, changed, removed_ids, dirs)
+        conn.executemany("INSERT INTO meta VALUES (?, ?)",
+                         [("root", root), ("built_at", str(time.time()))])
+        conn.commit()
+    finally:
+        conn.close()
+    os.replace(temp_path, index_path)
+
+    elapsed = time.perf_counter() - started
+    print(f"Indexed {len(changed)} files under '{root}' in {elapsed:.2f}s.")
+
+@instrumented("index refresh")
+def refresh_index(directory, check_files=True, verbose=True):
+    """
+    Brings the index covering a directory up to date, re-reading only the files that were
+    added, changed or deleted since the last build or refresh.
+
+    :param check_files: Whether to stat every file. When False, directories whose mtime has
+                        not moved are trusted completely, which misses in-place edits.
+    :param verbose: Whether to print a summary of the refresh.
+    """
+    found = find_index(directory)
+    if found is None:
+        print(f"No index found for '{os.path.abspath(directory)}'.")
+        return
+
+    root, index_path = found
+    started = time.perf_counter()
+    # Another session refreshing the same index holds the write lock; wait for it rather
+    # than mistaking the lock for a damaged index
+    conn = sqlite3.connect(index_path, timeout=INDEX_LOCK_TIMEOUT)
+    try:
+        current = _index_is_current(conn)
+        if current:
+            changed, removed_ids, dirs = scan_changes(root, conn, check_files)
+            _apply_index_changes(conn, root, changed, removed_ids, dirs)
+            conn.commit()
+    except sqlite3.OperationalError as e:
+        print(f"Could not refresh the index: {e}")
+        return
+    finally:
+        conn.close()
+
+    if not current:
+        print("The index format is out of date. Rebuilding it.")
+        build_index(root)
+        return
+
+    if not verbose:
+        return
+    elapsed = time.perf_counter() - started
+    print(f"Index refreshed in {elapsed:.2f}s: {len(changed)} files re-read, "
+          f"{len(removed_ids)} stale entries dropped.")
+
+def index_status(directory):
+    """
+    Prints information about the index covering a directory.
+    """
+    found = find_index(directory)
+    if found is None:
+        print(f"No index found for '{os.path.abspath(directory)}'.")
+        return
+
+    root, index_path = found
+    conn = sqlite3.connect(index_path, timeout=INDEX_LOCK_TIMEOUT)
+    try:
+        files, unindexed = conn.execute(
+            "SELECT COUNT(*), COUNT(*) - COALESCE(SUM(indexed), 0) FROM files").fetchone()
+        trigrams = conn.execute("SELECT COUNT(*) FROM postings").fetchone()[0]
+        meta = dict(conn.execute("SELECT key, value FROM meta"))
+        dirs = conn.execute("SELECT COUNT(*) FROM dirs").fetchone()[0]
+    finally:
+        conn.close()
+
+    print(f"Index root:   {root}")
+    print(f"Index file:   {index_path} ({index_path.stat().st_size / 1024 ** 2:.1f} MB)")
+    print(f"Built at:     {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(float(meta['built_at'])))}")
+    print(f"Updated at:   {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(float(meta.get('updated_at', meta['built_at']))))}")
+    print(f"Directories:  {dirs}")
+    print(f"Files:        {files} ({unindexed} too large to index, {meta.get('dead_files', 0)} stale ids)")
+    print(f"Trigrams:     {trigrams}")
+
+def drop_index(directory):
+    """
+    Deletes the index built for a directory.
+    """
+    index_path = _index_path(directory)
+    if not index_path.exists():
+        print(f"No index found for '{os.path.abspath(directory)}'.")
+        return
+    index_path.unlink()
+    print(f"Index for '{os.path.abspath(directory)}' dropped.")
+
+def index_filter(directory, search_term):
+    """
+    Returns a predicate telling whether a file may contain a match according to the index
+    covering the directory, or None when a full scan is needed.
+
+    Files that are new or changed since the index was built are always treated as candidates.
+    """
+    trigrams = pattern_trigrams(search_term)
+    found = find_index(directory) if trigrams else None
+    if found is None:
+        return None
+
+    root, index_path = found
+    conn = sqlite3.connect(index_path, timeout=INDEX_LOCK_TIMEOUT)
+    try:
+        files = {path: (file_id, size, mtime_ns, indexed) for file_id, path, size, mtime_ns, indexed
+                 in conn.execute("SELECT id, path, size, mtime_ns, indexed FROM files")}
+        candidates = None
+        for trigram in trigrams:
+            row = conn.execute("SELECT file_ids FROM postings WHERE trigram = ?",
+                               (_trigram_key(trigram),)).fetchone()
+            file_ids = array("I")
+            if row is not None:
+                file_ids.frombytes(row[0])
+            candidates = set(file_ids) if candidates is None else candidates.intersection(file_ids)
+            if not candidates:
+                break
+    finally:
+        conn.close()
+
+    def may_match(file_path):
+        entry = files.get(os.path.relpath(file_path, root))
+        if entry is None or not entry[3] or entry[0] in candidates:
+            return True
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            return False
+        # Only trust the index for files that have not changed since it was built
+        return (stat.st_size, stat.st_mtime_ns) != (entry[1], entry[2])
+
+    return may_match
+
+# Document text extraction settings
+TEXT_CACHE_PATH = CACHE_PATH / "text.sqlite"
+EXTRACT_MAX_FILE_SIZE = 256 * 1024 * 1024  # Larger documents are not extracted for search
+
+_PDF_ESCAPES = {ord("n"): b"\n", ord("r"): b"\r", ord("t"): b"\t", ord("b"): b"\b", ord("f"): b"\f",
+                ord("\n"): b"", ord("\r"): b""}  # A backslash before a line break continues the string
+_PDF_REGULAR = re.compile(rb"[^\s\0()<>\[\]{}/%]+")
+_PDF_SKIPPED_STREAMS = (b"/Image", b"/XRef", b"/ObjStm", b"/Metadata", b"/Length1", b"/Length2", b"/Length3")
+
+def _pdf_literal_string(content, pos):
+    """Reads a '(...)' string whose opening parenthesis is just before pos; returns (bytes, end)."""
+    out = bytearray()
+    depth = 1
+    while pos < len(content):
+        byte = content[pos]
+        pos += 1
+        if byte == 0x5C:  # Backslash escape
+            if pos >= len(content):
+                break
+            octal = re.match(rb"[0-7]{1,3}", content[pos:pos + 3])
+            if octal:
+                out.append(int(octal.group(), 8) & 0xFF)
+                pos += len(octal.group())
+                continue
+            out += _PDF_ESCAPES.get(content[pos], content[pos:pos + 1])
+            pos += 1
+            continue
+        if byte == 0x28:
+            depth += 1
+        elif byte == 0x29:
+            depth -= 1
+            if depth == 0:
+                break
+        out.append(byte)
+    return bytes(out), pos
+
+def _pdf_tokens(content):
+    """
+    Splits a PDF content stream into (kind, value) tokens, where kind is 'string', 'number',
+    'name' or 'op'. Array brackets are returned as the operators '[' and ']'.
+    """
+    pos = 0
+    while pos < len(content):
+        char = content[pos:pos + 1]
+        if char.isspace() or char == b"\0":
+            pos += 1
+        elif char == b"%":
+            end = content.find(b"\n", pos)
+            pos = len(content) if end == -1 else end + 1
+        elif char == b"(":
+            value, pos = _pdf_literal_string(content, pos + 1)
+            yield "string", value
+        elif char == b"<" and content[pos + 1:pos + 2] != b"<":
+            end = content.find(b">", pos)
+            end = len(content) if end == -1 else end
+            digits = re.sub(rb"[^0-9A-Fa-f]", b"", content[pos + 1:end])
+            yield "string", bytes.fromhex((digits + b"0" * (len(digits) % 2)).decode())
+            pos = end + 1
+        elif char in (b"<", b">"):
+            pos += 2  # Dictionary delimiters carry no text
+        elif char in (b"[", b"]"):
+            yield "op", char
+            pos += 1
+        elif char == b"/":
+            match = _PDF_REGULAR.match(content, pos + 1)
+            pos = match.end() if match else pos + 1
+            yield "name", match.group() if match else b""
+        else:
+            match = _PDF_REGULAR.match(content, pos)
+            if match is None:
+                pos += 1
+                continue
+            token = match.group()
+            pos = match.end()
+            try:
+                yield "number", float(token)
+            except ValueError:
+                if token == b"ID":
+                    # Inline image data is binary; skip to the end marker
+                    end = content.find(b"EI", pos)
+                    pos = len(content) if end == -1 else end + 2
+                yield "op", token
+
+def _pdf_decode(value):
+    """Decodes a PDF string, treating it as UTF-16 when it has a byte order mark."""
+    if value.startswith(b"\xfe\xff"):
+        return value[2:].decode("utf-16-be", "replace")
+    return value.decode("latin-1")
+
+def _pdf_content_text(content):
+    """Collects the text shown by the text operators of one content stream."""
+    text = []
+    operands = []
+    items = None  # Operands of an open [...] array
+    for kind, value in _pdf_tokens(content):
+        if kind != "op":
+            (items if items is not None else operands).append((kind, value))
+            continue
+        if value == b"[":
+            items = []
+            continue
+        if value == b"]":
+            operands.append(("array", items or []))
+            items = None
+            continue
+
+        if value in (b"'", b'"'):
+            text.append("\n")
+        if value in (b"Tj", b"'", b'"') and operands and operands[-1][0] == "string":
+            text.append(_pdf_decode(operands[-1][1]))
+        elif value == b"TJ" and operands and operands[-1][0] == "array":
+            for kind, item in operands[-1][1]:
+                if kind == "string":
+                    text.append(_pdf_decode(item))
+                elif kind == "number" and item < -200:
+                    text.append(" ")  # A large negative adjustment separates words
+        elif value in (b"Td", b"TD") and len(operands) >= 2:
+            text.append("\n" if operands[-1][1] else " ")
+        elif value in (b"T*", b"Tm", b"ET"):
+            text.append("\n")
+        operands = []
+    return "".join(text)
+
+def pdf_text(file):
+    """
+    Extracts the text of a PDF without external libraries by decompressing its content
+    streams and reading their text operators. Works for PDFs whose fonts use standard
+    encodings; text drawn with embedded CID fonts comes out garbled and scanned pages
+    have no text at all.
+    """
+    with open(file, "rb") as f:
+        data = f.read()
+
+    parts = []
+    for match in re.finditer(rb"(?<!end)stream(?:\r\n|\n|\r)", data):
+        header = data[data.rfind(b"obj", 0, match.start()):match.start()]
+        end = data.find(b"endstream", match.end())
+        if end == -1 or any(marker in header for marker in _PDF_SKIPPED_STREAMS):
+            continue
+        raw = data[match.end():end]
+        if b"/Filter" in header:
+            if b"/FlateDecode" not in header or re.search(rb"/Filter\s*\[[^\]]*/\w+[^\]]*/\w+", header):
+                continue  # Only single Flate-compressed streams are supported
+            try:
+                raw = zlib.decompressobj().decompress(raw)
+            except zlib.error:
+                continue
+        if b"BT" in raw:
+            parts.append(_pdf_content_text(raw))
+    return "\n".join(part.strip("\n") for part in parts if part.strip())
+
+# Extractors that turn documents into searchable text, by file extension.
+# Each one takes a file path and returns its text, raising an exception on failure.
+TEXT_EXTRACTORS = {
+    ".docx": docx_text,
+    ".pdf": pdf_text,
+}
+
+def extractor_for(file_path):
+    """Returns the text extractor for a file, or None for files searched as plain text."""
+    return TEXT_EXTRACTORS.get(os.path.splitext(file_path)[1].lower())
+
+def _open_text_cache():
+    """Opens the extracted text cache, creating it if needed."""
+    TEXT_CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(TEXT_CACHE_PATH, timeout=30)
+    conn.executescript("""
+        PRAGMA journal_mode = WAL;
+        CREATE TABLE IF NOT EXISTS files (path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER,
+                                          digest TEXT);
+        CREATE TABLE IF NOT EXISTS texts (digest TEXT PRIMARY KEY, text BLOB);
+    """)
+    return conn
+
+def extracted_text(file_path):
+    """
+    Returns the searchable text of a document, or None if it cannot be extracted.
+
+    Results are cached in TEXT_CACHE_PATH. A file whose size and mtime are unchanged is
+    served from the cache directly; otherwise its BLAKE2 hash is looked up, so touched,
+    copied or renamed documents are not extracted again.
+    """
+    extractor = extractor_for(file_path)
+    try:
+        stat = os.stat(file_path)
+    except OSError:
+        return None
+    if extractor is None or stat.st_size > EXTRACT_MAX_FILE_SIZE:
+        return None
+
+    path = os.path.abspath(file_path)
+    conn = _open_text_cache()
+    try:
+        row = conn.execute("SELECT t.text FROM files f JOIN texts t ON t.digest = f.digest "
+                           "WHERE f.path = ? AND f.size = ? AND f.mtime_ns = ?",
+                           (path, stat.st_size, stat.st_mtime_ns)).fetchone()
+        if row is not None:
+            record("text cache", cache_hits=1)
+            return zlib.decompress(row[0]).decode("utf-8")
+
+        digest = hash_file(file_path)
+        row = conn.execute("SELECT text FROM texts WHERE digest = ?", (digest,)).fetchone()
+        if row is not None:
+            record("text cache", cache_hits=1, bytes_read=stat.st_size)
+            text = zlib.decompress(row[0]).decode("utf-8")
+        else:
+            record("text cache", cache_misses=1, bytes_read=stat.st_size)
+            try:
+                text = extractor(file_path)
+            except Exception:
+                text = ""  # Remember unreadable documents too, so they are not retried
+            conn.execute("INSERT OR REPLACE INTO texts VALUES (?, ?)",
+                         (digest, zlib.compress(text.encode("utf-8"))))
+        conn.execute("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?)",
+                     (path, stat.st_size, stat.st_mtime_ns, digest))
+        conn.commit()
+        return text
+    except (OSError, sqlite3.Error):
+        return None
+    finally:
+        conn.close()
+
+def purge_text_cache():
+    """
+    Removes cached texts that no file refers to any more, and returns how many were removed.
+    Runs with the recycle bin purge rather than on every extraction, as it scans both tables.
+    """
+    if not TEXT_CACHE_PATH.exists():
+        return 0
+    conn = _open_text_cache()
+    try:
+        removed = conn.execute("DELETE FROM texts WHERE digest NOT IN (SELECT digest FROM files)").rowcount
+        conn.commit()
+        return removed
+    finally:
+        conn.close()
+
+def iter_document_matches(file_path, search_term, literal=""):
+    """
+    Searches the extracted text of a document and yields (file_path, line_no, line) matches.
+    Line numbers refer to lines of the extracted text.
+    """
+    text = extracted_text(file_path)
+    if not text or literal not in text:
+        return
+    pattern = re.compile(search_term)
+    for line_no, line in enumerate(text.splitlines(), 1):
+        if pattern.search(line):
+            yield file_path, line_no, line.strip()
+
+# Metadata daemon client settings
+METADATA_SOCKET_PATH = CACHE_PATH / "metadata.sock"  # Must match FMT_7_Metadata_Daemon.py
+METADATA_DAEMON_SCRIPT = Path(__file__).with_name("FMT_7_Metadata_Daemon.py")
+METADATA_TIMEOUT = 2  # Seconds to wait for an answer before falling back to the file system
+METADATA_RETRY_INTERVAL = 5  # Seconds before trying again to reach a daemon that was not running
+
+_metadata_lock = threading.Lock()
+_metadata_connection = None  # (socket, reader) of the open daemon connection
+_metadata_retry_at = 0.0
+
+def metadata_request(request):
+    """
+    Sends a request to the metadata cache daemon and returns its decoded answer, or None
+    when no daemon is reachable, in which case callers use the file system directly.
+    """
+    global _metadata_connection, _metadata_retry_at
+    if not hasattr(socket, "AF_UNIX"):
+        return None
+    with _metadata_lock:
+        if _metadata_connection is None:
+            if time.monotonic() < _metadata_retry_at:
+                return None
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(METADATA_TIMEOUT)
+            try:
+                sock.connect(str(METADATA_SOCKET_PATH))
+            except OSError:
+                sock.close()
+                _metadata_retry_at = time.monotonic() + METADATA_RETRY_INTERVAL
+                return None
+            _metadata_connection = (sock, sock.makefile("rb"))
+
+        sock, reader = _metadata_connection
+        try:
+            sock.sendall(json.dumps(request).encode("utf-8") + b"\n")
+            line = reader.readline()
+            if not line:
+                raise ConnectionError("the metadata daemon closed the connection")
+            return json.loads(line)
+        except (OSError, ValueError):
+            reader.close()
+            sock.close()
+            _metadata_connection = None
+            _metadata_retry_at = time.monotonic() + METADATA_RETRY_INTERVAL
+            return None
+
+def cached_listing(directory):
+    """
+    Returns the [name, is_dir, size, mtime, is_link] entries of a directory from the daemon,
+    or None when no daemon runs or the directory is too large for it to cache.
+    """
+    response = metadata_request({"op": "list", "path": os.path.abspath(directory)})
+    hit = bool(response and response.get("ok"))
+    record("metadata cache", **{"cache_hits" if hit else "cache_misses": 1})
+    return response["entries"] if hit else None
+
+def _cached_stat(path):
+    """Returns the daemon's stat summary of a path, or None without a daemon."""
+    response = metadata_request({"op": "stat", "path": os.path.abspath(path)})
+    hit = bool(response and response.get("ok"))
+    record("metadata cache", **{"cache_hits" if hit else "cache_misses": 1})
+    return response if hit else None
+
+def path_exists(path):
+    """os.path.exists, answered by the metadata daemon when it runs."""
+    stat = _cached_stat(path)
+    return stat["exists"] if stat is not None else os.path.exists(path)
+
+def path_is_dir(path):
+    """os.path.isdir, answered by the metadata daemon when it runs."""
+    stat = _cached_stat(path)
+    return stat["exists"] and stat["is_dir"] if stat is not None else os.path.isdir(path)
+
+def walk_tree(top):
+    """
+    Walks a tree top-down like os.walk, without following symlinks, using the daemon's
+    cached listings when it runs. Removing names from the yielded dirs list prunes them.
+    """
+    listing = cached_listing(top)
+    if listing is None:
+        yield from os.walk(top)
+        return
+    dirs = [name for name, is_dir, _, _, _ in listing if is_dir]
+    files = [name for name, is_dir, _, _, _ in listing if not is_dir]
+    links = {name for name, _, _, _, is_link in listing if is_link}
+    yield top, dirs, files
+    for name in dirs:
+        if name not in links:
+            yield from walk_tree(os.path.join(top, name))
+
+def start_metadata_daemon():
+    """Starts FMT_7_Metadata_Daemon.py in the background unless a daemon already runs."""
+    global _metadata_retry_at
+    _metadata_retry_at = 0.0
+    if metadata_request({"op": "ping"}) is not None:
+        print("The metadata daemon is already running.")
+        return
+    if not hasattr(socket, "AF_UNIX"):
+        print("The metadata daemon needs Unix domain sockets, which this platform does not have.")
+        return
+    import subprocess
+    subprocess.Popen([sys.executable, str(METADATA_DAEMON_SCRIPT), str(METADATA_SOCKET_PATH)],
+                     stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                     start_new_session=True)
+    deadline = time.monotonic() + 5
+    while time.monotonic() < deadline:
+        time.sleep(0.1)
+        _metadata_retry_at = 0.0
+        if metadata_request({"op": "ping"}) is not None:
+            print(f"Metadata daemon started on {METADATA_SOCKET_PATH}.")
+            return
+    print("The metadata daemon did not start.")
+
+def stop_metadata_daemon():
+    """Asks a running metadata daemon to exit."""
+    global _metadata_retry_at
+    _metadata_retry_at = 0.0
+    if metadata_request({"op": "shutdown"}) is None:
+        print("The metadata daemon is not running.")
+        return
+    metadata_request({"op": "ping"})  # Drops the connection the daemon has closed
+    print("Metadata daemon stopped.")
+
+def metadata_daemon_status():
+    """Prints the cache statistics of the metadata daemon."""
+    global _metadata_retry_at
+    _metadata_retry_at = 0.0
+    stats = metadata_request({"op": "stats"})
+    if stats is None:
+        print("The metadata daemon is not running; the file system is used directly.")
+        return
+    lookups = stats["hits"] + stats["misses"]
+    print(f"Metadata daemon on {METADATA_SOCKET_PATH}")
+    print(f"  Cached listings:  {stats['listings']}")
+    print(f"  Cached stats:     {stats['stats']}")
+    print(f"  Watched dirs:     {stats['watches']} ({'inotify' if stats['inotify'] else 'expiry only'})")
+    print(f"  Hit rate:         {stats['hits'] / lookups if lookups else 0:.1%} of {lookups} lookups")
+    print(f"  Invalidations:    {stats['invalidations']}")
+
+# Define paths
+RECYCLE_BIN_PATH = Path.home() / ".recycle_bin"  # Created on first use, not at startup
+RECYCLE_BIN_FILES = RECYCLE_BIN_PATH / "files"  # Deleted files, stored under their entry id
+RECYCLE_BIN_INDEX = RECYCLE_BIN_PATH / "index.sqlite"  # Metadata journal of the entries
+
+def hash_file(file_path, block_size=1024 * 1024):
+    """Returns the BLAKE2b hex digest of a file's contents."""
+    file_hash = hashlib.blake2b(digest_size=32)
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            file_hash.update(block)
+    return file_hash.hexdigest()
+
+RECYCLE_BIN_NAME = ".recycle_bin"  # Name of the per-filesystem bins created at mount roots
+RECYCLE_BIN_MAX_AGE_DAYS = 30  # Purge policy: entries older than this are removed
+RECYCLE_BIN_MAX_SIZE = 10 * 1024 ** 3  # Purge policy: size quota per bin, oldest entries go first
+RECYCLE_BIN_PURGE_INTERVAL = 3600  # Seconds between automatic background purges
+RECYCLE_BIN_DEDUP = True  # Background purges pack deleted files once per hash into '<bin>/objects'
+RECYCLE_BIN_COMPRESSION = "none"  # 'none', 'zlib' or 'zstd' (needs the zstandard package)
+RECYCLE_BIN_COMPRESSION_LEVEL = 3
+RECYCLE_BIN_SCHEMA_VERSION = 1  # PRAGMA user_version of an index with every column below
+_last_purge = 0.0
+_purge_thread = None
+
+def _import_legacy_entries(conn):
+    """
+    Moves files left directly in the recycle bin by older versions under an entry id.
+    Their original location is unknown, so they recover into the current directory as before.
+    """
+    for entry in os.scandir(RECYCLE_BIN_PATH):
+        if entry.name in (RECYCLE_BIN_FILES.name, "objects") or \
+                entry.name.startswith(RECYCLE_BIN_INDEX.name):
+            continue
+        entry_id = uuid.uuid4().hex
+        is_dir = entry.is_dir(follow_symlinks=False)
+        stat = entry.stat(follow_symlinks=False)
+        conn.execute("INSERT INTO entries (id, original_path, name, size, deleted_at, is_dir) "
+                     "VALUES (?, ?, ?, ?, ?, ?)",
+                     (entry_id, str(Path.cwd() / entry.name), entry.name,
+                      0 if is_dir else stat.st_size, stat.st_mtime, int(is_dir)))
+        os.rename(entry.path, RECYCLE_BIN_PATH / RECYCLE_BIN_FILES.name / entry_id)
+
+def open_recycle_bin(bin_path=None):
+    """
+    Opens the index of a recycle bin (the home bin by default), creating the bin on first use.
+    Directories and non-deduplicated files live in '<bin>/files' under their entry id, file
+    contents in '<bin>/objects' under their hash, and the index in '<bin>/index.sqlite'.
+    """
+    bin_path = Path(bin_path or RECYCLE_BIN_PATH)
+    (bin_path / RECYCLE_BIN_FILES.name).mkdir(parents=True, exist_ok=True)
+    index_path = bin_path / RECYCLE_BIN_INDEX.name
+    created = not index_path.exists()
+    conn = sqlite3.connect(index_path, timeout=30)
+    conn.executescript("""
+        CREATE TABLE IF NOT EXISTS entries (id TEXT PRIMARY KEY, original_path TEXT,
+                                            name TEXT, size INTEGER, deleted_at REAL,
+                                            hash TEXT, is_dir INTEGER, object TEXT,
+                                            mtime REAL, mode INTEGER);
+        CREATE INDEX IF NOT EXISTS entries_original_path ON entries (original_path);
+        CREATE INDEX IF NOT EXISTS entries_name ON entries (name);
+        CREATE INDEX IF NOT EXISTS entries_deleted_at ON entries (deleted_at);
+        CREATE TABLE IF NOT EXISTS bins (path TEXT PRIMARY KEY);
+        CREATE TABLE IF NOT EXISTS objects (hash TEXT PRIMARY KEY, size INTEGER,
+                                            stored_size INTEGER, compression TEXT,
+                                            refs INTEGER);
+    """)
+    if conn.execute("PRAGMA user_version").fetchone()[0] < RECYCLE_BIN_SCHEMA_VERSION:
+        _migrate_recycle_bin(conn, created and bin_path == RECYCLE_BIN_PATH)
+    return conn
+
+def _migrate_recycle_bin(conn, import_legacy):
+    """
+    Adds the columns that older indexes lack and, for a new home bin, imports the files
+    older versions left in it. The purge thread may open the same index at the same time,
+    so this runs under the write lock and re-checks the version once it holds it.
+    """
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        if conn.execute("PRAGMA user_version").fetchone()[0] < RECYCLE_BIN_SCHEMA_VERSION:
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(entries)")}
+            for column, kind in (("object", "TEXT"), ("mtime", "REAL"), ("mode", "INTEGER")):
+                if column in columns:
+                    continue
+                try:
+                    conn.execute(f"ALTER TABLE entries ADD COLUMN {column} {kind}")
+                except sqlite3.OperationalError as e:
+                    # The column is already there, so this part of the index is migrated
+                    if "duplicate column" not in str(e):
+                        raise
+            if import_legacy:
+                _import_legacy_entries(conn)
+            conn.execute(f"PRAGMA user_version = {RECYCLE_BIN_SCHEMA_VERSION}")
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+
+def find_mount_root(path):
+    """Returns the root directory of the filesystem that holds a path."""
+    path = os.path.abspath(path)
+    device = os.lstat(path).st_dev
+    while True:
+        parent = os.path.dirname(path)
+        if parent == path or os.stat(parent).st_dev != device:
+            return path
+        path = parent
+
+def recycle_bin_for(file_path, bins=None):
+    """
+    Returns the recycle bin to use for a file: the home bin if the file is on the same
+    filesystem, otherwise a '.recycle_bin' at the root of the file's filesystem, so that
+    deleting is a rename and never a copy. Falls back to the home bin when the mount root
+    is not writable.
+
+    :param bins: Dict of device -> bin path kept across the calls of one bulk operation,
+                 so each filesystem's bin is set up and registered only once.
+    """
+    device = os.lstat(file_path).st_dev
+    if bins is not None and device in bins:
+        return bins[device]
+    bin_path = _recycle_bin_for_device(file_path, device)
+    if bins is not None:
+        bins[device] = bin_path
+    return bin_path
+
+def _recycle_bin_for_device(file_path, device):
+    """Sets up and registers the bin for the filesystem of a file; see recycle_bin_for."""
+    RECYCLE_BIN_PATH.mkdir(exist_ok=True)
+    if device == os.stat(RECYCLE_BIN_PATH).st_dev:
+        return RECYCLE_BIN_PATH
+
+    bin_path = Path(find_mount_root(file_path)) / RECYCLE_BIN_NAME
+    try:
+        open_recycle_bin(bin_path).close()
+    except (OSError, sqlite3.Error):
+        return RECYCLE_BIN_PATH
+
+    # Register the bin so listing and recovery can find it
+    conn = open_recycle_bin()
+    try:
+        with conn:
+            conn.execute("INSERT OR IGNORE INTO bins VALUES (?)", (str(bin_path),))
+    finally:
+        conn.close()
+    return bin_path
+
+def known_recycle_bins():
+    """Returns the home recycle bin followed by every per-filesystem bin still present."""
+    conn = open_recycle_bin()
+    try:
+        bins = [Path(row[0]) for row in conn.execute("SELECT path FROM bins")]
+    finally:
+        conn.close()
+    return [RECYCLE_BIN_PATH] + [bin_path for bin_path in bins if bin_path.exists()]
+
+def _glob_range(pattern):
+    """
+    Returns (low, high) bounds of the strings a GLOB pattern can match, from its literal
+    prefix, so SQLite can answer it with an index range instead of scanning every row.
+    """
+    prefix = re.split(r"[*?\[]", pattern, maxsplit=1)[0]
+    return prefix, prefix + "\U0010ffff"
+
+def find_recycled(conn, pattern=None, limit=None):
+    """
+    Returns (id, original_path, name, size, deleted_at, hash, is_dir) rows, newest first.
+
+    :param pattern: Entry id, original path, file name, or a glob matched against the
+                    original path or the name. None matches every entry.
+    :param limit: Maximum number of rows to return.
+    """
+    query = "SELECT id, original_path, name, size, deleted_at, hash, is_dir FROM entries"
+    params = []
+    if pattern:
+        if glob.has_magic(pattern) and _glob_range(pattern)[0]:
+            # The ranges narrow each side to an index range; GLOB then checks the candidates
+            query += (" WHERE original_path >= ? AND original_path < ? AND original_path GLOB ?"
+                      " OR name >= ? AND name < ? AND name GLOB ?")
+            params = [*_glob_range(pattern), pattern] * 2
+        elif glob.has_magic(pattern):
+            # Without a literal prefix no index helps, and one scan beats two full index walks
+            query += " WHERE original_path GLOB ? OR name GLOB ?"
+            params = [pattern, pattern]
+        else:
+            query += " WHERE id = ? OR original_path = ? OR name = ?"
+            params = [pattern, os.path.abspath(pattern), pattern]
+    query += " ORDER BY deleted_at DESC LIMIT ?"
+    params.append(-1 if limit is None else limit)
+    return conn.execute(query, params).fetchall()
+
+def _object_path(bin_path, file_hash):
+    """Returns where the contents with a given hash are stored in a bin."""
+    return os.path.join(bin_path, "objects", file_hash[:2], file_hash)
+
+def _resolve_compression(compression):
+    """Falls back to zlib when zstd is requested but the zstandard package is missing."""
+    if compression == "zstd" and importlib.util.find_spec("zstandard") is None:
+        print("zstd compression needs the 'zstandard' package. Using zlib instead.")
+        return "zlib"
+    return compression
+
+def _write_object(source_path, destination, compression, level):
+    """Streams a file into a new object file, compressing it. Returns the stored size."""
+    with open(source_path, "rb") as src, open(destination, "wb") as dst:
+        if compression == "zstd":
+            import zstandard
+            zstandard.ZstdCompressor(level=level).copy_stream(src, dst)
+        else:
+            compressor = zlib.compressobj(level)
+            for block in iter(lambda: src.read(COPY_BUFFER_SIZE), b""):
+                dst.write(compressor.compress(block))
+            dst.write(compressor.flush())
+    return os.path.getsize(destination)
+
+def _read_object(object_path, destination, compression):
+    """Streams an object back into a regular file, decompressing it on the fly."""
+    with open(object_path, "rb") as src, open(destination, "wb") as dst:
+        if compression == "zstd":
+            import zstandard
+            zstandard.ZstdDecompressor().copy_stream(src, dst)
+        elif compression == "zlib":
+            decompressor = zlib.decompressobj()
+            for block in iter(lambda: src.read(COPY_BUFFER_SIZE), b""):
+                dst.write(decompressor.decompress(block))
+            dst.write(decompressor.flush())
+        else:
+            shutil.copyfileobj(src, dst, COPY_BUFFER_SIZE)
+
+def _pack_entry(conn, bin_path, entry_id, compression, level):
+    """
+    Moves a regular file from '<bin>/files' into the content-addressed object store, where
+    identical contents are stored once. Hashing and compressing happen before the index is
+    locked, so deletes and recoveries are not held up. Returns True if the file was packed.
+    """
+    path = os.path.join(bin_path, RECYCLE_BIN_FILES.name, entry_id)
+    if os.path.islink(path) or not os.path.isfile(path):
+        return False  # Symlinks and special files stay as they are
+    size = os.path.getsize(path)
+    file_hash = hash_file(path)
+    object_path = _object_path(bin_path, file_hash)
+    os.makedirs(os.path.dirname(object_path), exist_ok=True)
+    temp_path = None
+    if compression != "none" and \
+            conn.execute("SELECT 1 FROM objects WHERE hash = ?", (file_hash,)).fetchone() is None:
+        temp_path = f"{object_path}.{entry_id}.tmp"
+        stored_size = _write_object(path, temp_path, compression, level)
+    try:
+        with conn:
+            # The entry may have been recovered or purged while it was being hashed
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("SELECT object FROM entries WHERE id = ?", (entry_id,)).fetchone()
+            if row is None or row[0] is not None:
+                return False
+            conn.execute("UPDATE entries SET hash = ?, object = ? WHERE id = ?", (file_hash, file_hash, entry_id))
+            if conn.execute("SELECT 1 FROM objects WHERE hash = ?", (file_hash,)).fetchone() is not None:
+                conn.execute("UPDATE objects SET refs = refs + 1 WHERE hash = ?", (file_hash,))
+            elif temp_path is not None:
+                conn.execute("INSERT INTO objects VALUES (?, ?, ?, ?, 1)",
+                             (file_hash, size, stored_size, compression))
+                os.replace(temp_path, object_path)
+                temp_path = None
+            else:
+                conn.execute("INSERT INTO objects VALUES (?, ?, ?, 'none', 1)", (file_hash, size, size))
+                os.rename(path, object_path)
+                return True
+            os.remove(path)
+        return True
+    finally:
+        if temp_path is not None and os.path.exists(temp_path):
+            os.remove(temp_path)
+
+def pack_recycle_bin(conn, bin_path, compression=None, level=None, entry_ids=None):
+    """
+    Packs the deleted files of a bin that are not in its object store yet, deduplicating
+    and compressing them. Returns the number of files packed.
+
+    :param compression: 'none', 'zlib' or 'zstd'; defaults to RECYCLE_BIN_COMPRESSION.
+    :param level: Compression level; defaults to RECYCLE_BIN_COMPRESSION_LEVEL.
+    :param entry_ids: Only pack these entries; by default every unpacked file is.
+    """
+    compression = _resolve_compression(compression or RECYCLE_BIN_COMPRESSION)
+    level = RECYCLE_BIN_COMPRESSION_LEVEL if level is None else level
+    if entry_ids is None:
+        entry_ids = [row[0] for row in conn.execute("SELECT id FROM entries WHERE object IS NULL AND is_dir = 0")]
+    packed = 0
+    for entry_id in entry_ids:
+        try:
+            packed += _pack_entry(conn, bin_path, entry_id, compression, level)
+        except OSError:
+            continue  # Recovered while it was being read; the index tells the rest
+    return packed
+
+def _release_object(conn, bin_path, file_hash):
+    """Drops one reference to an object and deletes it once unused. Returns the bytes freed."""
+    row = conn.execute("SELECT refs, stored_size FROM objects WHERE hash = ?", (file_hash,)).fetchone()
+    if row is None:
+        return 0  # Already released
+    refs, stored_size = row
+    if refs > 1:
+        conn.execute("UPDATE objects SET refs = refs - 1 WHERE hash = ?", (file_hash,))
+        return 0
+    conn.execute("DELETE FROM objects WHERE hash = ?", (file_hash,))
+    try:
+        os.remove(_object_path(bin_path, file_hash))
+    except FileNotFoundError:
+        pass
+    return stored_size
+
+def _move_to_recycle_bin(conn, bin_path, file_path):
+    """
+    Records a file in a bin's index and renames it into '<bin>/files' in one transaction.
+    Nothing is read: with RECYCLE_BIN_DEDUP the background purge packs regular files into
+    the object store later (see pack_recycle_bin). Returns the new entry id.
+    """
+    original_path = os.path.abspath(file_path)
+    # lstat, so a symlink is recorded and moved as the link, never as the file it points to
+    stat = os.lstat(file_path)
+    is_dir = not os.path.islink(file_path) and os.path.isdir(file_path)
+    if is_dir:
+        size = sum(os.path.getsize(os.path.join(root, file))
+                   for root, dirs, files in os.walk(file_path) for file in files)
+    else:
+        size = stat.st_size
+
+    record(files=1)
+    entry_id = uuid.uuid4().hex
+    with conn:
+        conn.execute("INSERT INTO entries (id, original_path, name, size, deleted_at, is_dir, mtime, mode) "
+                     "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                     (entry_id, original_path, os.path.basename(original_path), size, time.time(),
+                      int(is_dir), stat.st_mtime, stat.st_mode))
+        destination = os.path.join(bin_path, RECYCLE_BIN_FILES.name, entry_id)
+        try:
+            os.rename(file_path, destination)
+        except OSError as e:
+            if e.errno != errno.EXDEV:
+                raise
+            shutil.move(file_path, destination)  # Only when no bin on this filesystem was usable
+    return entry_id
+
+def _restore_entry(conn, bin_path, entry_id, destination):
+    """
+    Moves or decompresses an entry back to a destination and removes it from the index.
+    Returns False if the entry is gone, e.g. purged in the background since it was listed.
+    """
+    with conn:
+        # Look the entry up under the write lock, so a purge cannot remove it halfway
+        conn.execute("BEGIN IMMEDIATE")
+        row = conn.execute("SELECT object, mtime, mode FROM entries WHERE id = ?", (entry_id,)).fetchone()
+        if row is None:
+            return False
+        object_hash, mtime, mode = row
+        if object_hash is None:
+            conn.execute("DELETE FROM entries WHERE id = ?", (entry_id,))
+            shutil.move(os.path.join(bin_path, RECYCLE_BIN_FILES.name, entry_id), destination)
+            return True
+
+        row = conn.execute("SELECT refs, compression FROM objects WHERE hash = ?", (object_hash,)).fetchone()
+        if row is None:
+            return False
+        refs, compression = row
+        conn.execute("DELETE FROM entries WHERE id = ?", (entry_id,))
+        object_path = _object_path(bin_path, object_hash)
+        if refs == 1 and compression == "none":
+            # Last reference to a plain object: hand the file itself back
+            conn.execute("DELETE FROM objects WHERE hash = ?", (object_hash,))
+            shutil.move(object_path, destination)
+        else:
+            _read_object(object_path, destination, compression)
+            _release_object(conn, bin_path, object_hash)
+    if os.path.islink(destination):
+        return True  # chmod and utime would change the file the link points to
+    if mode is not None:
+        os.chmod(destination, mode & 0o7777)
+    if mtime is not None:
+        os.utime(destination, (mtime, mtime))
+    return True
+
+def _purge_entry(conn, bin_path, entry_id):
+    """
+    Permanently removes an entry and any data only it uses. Returns the bytes freed, or
+    None if the entry is already gone (recovered or purged since it was listed).
+    """
+    # Drop the index entry first so the file is never listed without its data
+    with conn:
+        conn.execute("BEGIN IMMEDIATE")
+        row = conn.execute("SELECT size, is_dir, object FROM entries WHERE id = ?", (entry_id,)).fetchone()
+        if row is None:
+            return None
+        size, is_dir, object_hash = row
+        conn.execute("DELETE FROM entries WHERE id = ?", (entry_id,))
+        if object_hash is not None:
+            return _release_object(conn, bin_path, object_hash)
+    path = os.path.join(bin_path, RECYCLE_BIN_FILES.name, entry_id)
+    try:
+        if is_dir:
+            shutil.rmtree(path)
+        else:
+            os.remove(path)
+    except FileNotFoundError:
+        pass
+    return size
+
+def _stored_size(conn):
+    """Returns the bytes a bin uses on disk according to its index."""
+    objects = conn.execute("SELECT COALESCE(SUM(stored_size), 0) FROM objects").fetchone()[0]
+    others = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries WHERE object IS NULL").fetchone()[0]
+    return objects + others
+
+@instrumented("delete")
+def delete_file_safely(file_path):
+    """Move a file to a custom recycle bin."""
+    file_path = Path(file_path)
+    if not os.path.lexists(file_path):
+        print("File not found!")
+        return
+
+    try:
+        bin_path = recycle_bin_for(file_path)
+        conn = open_recycle_bin(bin_path)
+        try:
+            entry_id = _move_to_recycle_bin(conn, bin_path, str(file_path))
+        finally:
+            conn.close()
+        print(f"File moved to recycle bin: {os.path.abspath(file_path)} (id {entry_id})")
+    except Exception as e:
+        print(f"Error moving file to recycle bin: {e}")
+    start_background_purge()
+
+@instrumented("del")
+def bulk_delete(patterns, compression=None, level=None):
+    """
+    Moves every file or directory matching the given paths or globs to the recycle bin of
+    its filesystem, each with a single rename and without reading it. The background purge
+    deduplicates and compresses the files later.
+
+    :param compression: 'none', 'zlib' or 'zstd' to pack the deleted files into the object
+                        store right away, deduplicated and compressed, instead of later.
+    :param level: Compression level; defaults to RECYCLE_BIN_COMPRESSION_LEVEL.
+    """
+    paths = []
+    for pattern in patterns:
+        paths.extend(glob.glob(pattern, recursive=True) if glob.has_magic(pattern) else [pattern])
+
+    started = time.perf_counter()
+    connections = {}
+    bins = {}  # device -> bin path
+    deleted = defaultdict(list)  # bin path -> ids of the entries moved into it
+    try:
+        for path in paths:
+            if not os.path.lexists(path):
+                print(f"File not found: {path}")
+                continue
+            try:
+                bin_path = recycle_bin_for(path, bins)
+                if bin_path not in connections:
+                    connections[bin_path] = open_recycle_bin(bin_path)
+                deleted[bin_path].append(_move_to_recycle_bin(connections[bin_path], bin_path, path))
+            except Exception as e:
+                print(f"Error moving '{path}' to recycle bin: {e}")
+        print(f"Moved {sum(map(len, deleted.values()))} items to the recycle bin "
+              f"in {time.perf_counter() - started:.2f}s.")
+        if compression is not None:
+            for bin_path, entry_ids in deleted.items():
+                pack_recycle_bin(connections[bin_path], bin_path, compression, level, entry_ids)
+    finally:
+        for conn in connections.values():
+            conn.close()
+    start_background_purge()
+
+@instrumented("recover")
+def recover_file(file_name, destination_dir=None):
+    """
+    Recover files from the recycle bins to their original locations.
+
+    :param file_name: Entry id, original path, file name or glob of the files to recover.
+                      When a path was deleted several times, its latest version is recovered.
+    :param destination_dir: Recover into this directory instead of the original locations.
+    :return: Number of files recovered.
+    """
+    recovered = set()
+    found = False
+    try:
+        for bin_path in known_recycle_bins():
+            conn = open_recycle_bin(bin_path)
+            try:
+                entries = find_recycled(conn, file_name)
+                found = found or bool(entries)
+                for entry_id, original_path, name, *_ in entries:
+                    if original_path in recovered:
+                        continue  # An older deletion of a path that was just recovered
+                    if destination_dir:
+                        destination = os.path.join(os.path.abspath(destination_dir), name)
+                    else:
+                        destination = original_path
+                    if os.path.lexists(destination):
+                        print(f"Cannot recover to '{destination}': the file already exists.")
+                        continue
+                    os.makedirs(os.path.dirname(destination), exist_ok=True)
+                    if not _restore_entry(conn, bin_path, entry_id, destination):
+                        print(f"Cannot recover '{original_path}': it was purged from the recycle bin.")
+                        continue
+                    record(files=1)
+                    recovered.add(original_path)
+                    print(f"File recovered to: {destination}")
+            finally:
+                conn.close()
+    except Exception as e:
+        print(f"Error recovering file: {e}")
+    if not found:
+        print("File not found in recycle bin!")
+    return len(recovered)
+
+def bulk_recover(patterns, destination_dir=None):
+    """
+    Recovers every recycle bin entry matching any of the given ids, paths, names or globs.
+    """
+    started = time.perf_counter()
+    recovered = sum(recover_file(pattern, destination_dir) for pattern in patterns)
+    print(f"Recovered {recovered} items in {time.perf_counter() - started:.2f}s.")
+
+def list_recycle_bin(pattern=None, limit=50):
+    """
+    Prints the newest recycle bin entries, optionally filtered by an id, path, name or glob.
+    """
+    entries = []
+    total = 0
+    try:
+        for bin_path in known_recycle_bins():
+            conn = open_recycle_bin(bin_path)
+            try:
+                entries.extend(find_recycled(conn, pattern, limit))
+                total += conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+            finally:
+                conn.close()
+    except Exception as e:
+        print(f"Error reading recycle bin: {e}")
+        return
+
+    entries = sorted(entries, key=lambda entry: entry[4], reverse=True)[:limit]
+    if not entries:
+        print("The recycle bin has no matching entries.")
+        return
+    print(f"{'Deleted at':19}  {'Size':>10}  {'Id':32}  Original path")
+    for entry_id, original_path, name, size, deleted_at, file_hash, is_dir in entries:
+        deleted = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(deleted_at))
+        print(f"{deleted}  {'<DIR>' if is_dir else size:>10}  {entry_id}  {original_path}")
+    print(f"Showing {len(entries)} of {total} entries.")
+
+@instrumented("purge")
+def purge_recycle_bin(max_age_days=RECYCLE_BIN_MAX_AGE_DAYS, max_size=RECYCLE_BIN_MAX_SIZE):
+    """
+    Permanently removes entries older than max_age_days, packs the remaining files into the
+    object store (with RECYCLE_BIN_DEDUP), then removes the oldest entries of any bin whose
+    stored size is still above max_size. Returns (entries removed, bytes freed).
+    """
+    removed = 0
+    freed = 0
+    cutoff = time.time() - max_age_days * 86400
+    for bin_path in known_recycle_bins():
+        conn = open_recycle_bin(bin_path)
+        try:
+            for (entry_id,) in conn.execute("SELECT id FROM entries WHERE deleted_at < ?",
+                                            (cutoff,)).fetchall():
+                entry_freed = _purge_entry(conn, bin_path, entry_id)
+                if entry_freed is not None:
+                    freed += entry_freed
+                    removed += 1
+            if RECYCLE_BIN_DEDUP:
+                pack_recycle_bin(conn, bin_path)
+
+            # Deduplicated objects are only freed with their last entry, so re-check as we go
+            total = _stored_size(conn)
+            if total > max_size:
+                for (entry_id,) in conn.execute("SELECT id FROM entries ORDER BY deleted_at").fetchall():
+                    if total <= max_size:
+                        break
+                    entry_freed = _purge_entry(conn, bin_path, entry_id)
+                    if entry_freed is None:
+                        continue
+                    total -= entry_freed
+                    freed += entry_freed
+                    removed += 1
+        finally:
+            conn.close()
+    return removed, freed
+
+def recycle_bin_stats():
+    """
+    Prints how much data the recycle bins hold and how much deduplication and compression save.
+    """
+    logical = unique = stored = entries = other = 0
+    try:
+        for bin_path in known_recycle_bins():
+            conn = open_recycle_bin(bin_path)
+            try:
+                entries += conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+                logical += conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries "
+                                        "WHERE object IS NOT NULL").fetchone()[0]
+                other += conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries "
+                                      "WHERE object IS NULL").fetchone()[0]
+                bin_unique, bin_stored = conn.execute(
+                    "SELECT COALESCE(SUM(size), 0), COALESCE(SUM(stored_size), 0) FROM objects").fetchone()
+                unique += bin_unique
+                stored += bin_stored
+            finally:
+                conn.close()
+    except Exception as e:
+        print(f"Error reading recycle bin: {e}")
+        return
+
+    print(f"Entries:            {entries}")
+    print(f"Deleted file data:  {_format_bytes(logical)}")
+    print(f"Unique content:     {_format_bytes(unique)} (dedup ratio {logical / unique if unique else 1:.2f}x)")
+    print(f"Stored content:     {_format_bytes(stored)} (compression ratio {unique / stored if stored else 1:.2f}x)")
+    print(f"Stored as-is:       {_format_bytes(other)} (directories, special and unpacked files)")
+    print(f"Total on disk:      {_format_bytes(stored + other)}")
+
+def start_background_purge(max_age_days=RECYCLE_BIN_MAX_AGE_DAYS, max_size=RECYCLE_BIN_MAX_SIZE,
+                           force=False):
+    """
+    Runs purge_recycle_bin on a background thread so the prompt is never blocked.
+    Unless force is True, it runs at most once per RECYCLE_BIN_PURGE_INTERVAL.
+    Returns False if no purge was started.
+    """
+    global _last_purge, _purge_thread
+    if _purge_thread is not None and _purge_thread.is_alive():
+        return False
+    if not force and time.time() - _last_purge < RECYCLE_BIN_PURGE_INTERVAL:
+        return False
+    _last_purge = time.time()
+
+    def purge():
+        try:
+            removed, freed = purge_recycle_bin(max_age_days, max_size)
+            if removed or force:
+                print(f"\n[purge] Removed {removed} entries from the recycle bin, "
+                      f"freed {freed / 1024 ** 2:.1f} MB.")
+            purge_text_cache()
+        except Exception as e:
+            print(f"\n[purge] Error purging recycle bin: {e}")
+
+    _purge_thread = threading.Thread(target=purge, name="recycle-bin-purge", daemon=True)
+    _purge_thread.start()
+    return True
+
+
+# Duplicate finder settings
+DUPES_EDGE_SIZE = 4096  # Bytes hashed from each end of a file before hashing it fully
+DUPES_WORKERS = min(32, (os.cpu_count() or 1) * 4)
+
+def _scan_files_by_size(paths, min_size=1):
+    """
+    Walks the given files and directories without following symlinks or entering recycle
+    bins, and groups regular files by size, then by inode, so hard links to one file are
+    seen as a single file.
+    Returns {size: {(dev, inode): [paths]}}.
+    """
+    by_size = defaultdict(dict)
+
+    def add(path, stat):
+        if stat.st_size >= min_size:
+            links = by_size[stat.st_size].setdefault((stat.st_dev, stat.st_ino), [])
+            if path not in links:  # Overlapping arguments reach the same path twice
+                links.append(path)
+
+    pending = []
+    for path in paths:
+        if os.path.islink(path):
+            continue
+        if os.path.isdir(path):
+            pending.append(path)
+        elif os.path.isfile(path):
+            try:
+                add(path, os.stat(path))
+            except OSError:
+                continue
+
+    while pending:
+        try:
+            with os.scandir(pending.pop()) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            if entry.name != RECYCLE_BIN_NAME:  # Leave the recycle bin's own copies alone
+                                pending.append(entry.path)
+                        elif entry.is_file(follow_symlinks=False):
+                            add(entry.path, entry.stat(follow_symlinks=False))
+                    except OSError:
+                        continue
+        except OSError:
+            continue
+    return by_size
+
+def _edge_hash(path, size):
+    """Hashes the first and last DUPES_EDGE_SIZE bytes of a file (all of it when small)."""
+    edge_hash = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        edge_hash.update(f.read(DUPES_EDGE_SIZE))
+        if size > DUPES_EDGE_SIZE:
+            f.seek(max(DUPES_EDGE_SIZE, size - DUPES_EDGE_SIZE))
+            edge_hash.update(f.read(DUPES_EDGE_SIZE))
+    return edge_hash.digest()
+
+def _refine_groups(groups, hash_function, workers):
+    """
+    Splits each group of (size, links) candidates by a hash computed on a thread pool,
+    keeping only the subgroups that still hold more than one file.
+    """
+    tasks = [(size, links) for size, candidates in groups for links in candidates]
+
+    def task_hash(task):
+        size, links = task
+        try:
+            return hash_function(links[0], size)
+        except OSError:
+            return None  # Unreadable or vanished files drop out
+
+    refined = defaultdict(list)
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        for (size, links), digest in zip(tasks, executor.map(task_hash, tasks)):
+            if digest is not None:
+                refined[(size, digest)].append(links)
+    return [(size, candidates) for (size, _), candidates in refined.items() if len(candidates) > 1]
+
+@instrumented("dupes")
+def find_duplicates(paths, min_size=1, workers=DUPES_WORKERS):
+    """
+    Finds files with identical contents under the given paths in three stages: files are
+    grouped by size, then by a hash of their first and last DUPES_EDGE_SIZE bytes, and only
+    the candidates left after that are hashed in full. Hard links are detected by inode
+    and never reported as duplicates of each other.
+
+    Returns (groups, bytes_read), where each group is a (size, files) pair and each file is
+    the list of hard-linked paths sharing one inode.
+    """
+    by_size = _scan_files_by_size(paths, min_size)
+    groups = [(size, list(inodes.values())) for size, inodes in by_size.items() if len(inodes) > 1]
+    bytes_read = sum(min(size, 2 * DUPES_EDGE_SIZE) * len(files) for size, files in groups)
+    groups = _refine_groups(groups, _edge_hash, workers)
+
+    # The edge hash already covered files no larger than both edges
+    small = [group for group in groups if group[0] <= 2 * DUPES_EDGE_SIZE]
+    large = [group for group in groups if group[0] > 2 * DUPES_EDGE_SIZE]
+    bytes_read += sum(size * len(files) for size, files in large)
+    large = _refine_groups(large, lambda path, size: hash_file(path), workers)
+
+    groups = sorted(small + large, key=lambda group: group[0] * (len(group[1]) - 1), reverse=True)
+    for _, files in groups:
+        files.sort(key=lambda links: links[0])
+    record(bytes_read=bytes_read)
+    return groups, bytes_read
+
+def _keep_index(files, keep):
+    """Returns which file of a duplicate group to keep: 'first' by path, 'newest' or 'oldest'."""
+    if keep == "first":
+        return 0
+    mtimes = []
+    for links in files:
+        try:
+            mtimes.append(os.stat(links[0]).st_mtime)
+        except OSError:
+            mtimes.append(float("-inf") if keep == "newest" else float("inf"))
+    chooser = max if keep == "newest" else min
+    return mtimes.index(chooser(mtimes))
+
+def report_duplicates(paths, min_size=1, workers=DUPES_WORKERS, delete=False, keep="first", confirm=True):
+    """
+    Prints the duplicate groups found under the given paths. With delete, every copy except
+    the one chosen by keep is moved to the recycle bin (with all of its hard links), after
+    asking first unless confirm is False.
+    """
+    started = time.perf_counter()
+    groups, bytes_read = find_duplicates(paths, min_size, workers)
+    if not groups:
+        print("No duplicate files found.")
+        return
+
+    to_delete = []
+    reclaimable = 0
+    for number, (size, files) in enumerate(groups, 1):
+        kept = _keep_index(files, keep)
+        print(f"\nGroup {number}: {len(files)} copies of {_format_bytes(size)}")
+        for i, links in enumerate(files):
+            extra = f" (+{len(links) - 1} hard link{'s' if len(links) > 2 else ''})" if len(links) > 1 else ""
+            marker = "keep" if i == kept else "    "
+            print(f"  {marker}  {links[0]}{extra}")
+            for link in links[1:]:
+                print(f"          {link}")
+            if i != kept:
+                to_delete.extend(links)
+        reclaimable += size * (len(files) - 1)
+
+    print(f"\nFound {len(groups)} duplicate groups; {_format_bytes(reclaimable)} can be freed. "
+          f"Read {_format_bytes(bytes_read)} in {time.perf_counter() - started:.2f}s.")
+    if delete:
+        if confirm:
+            answer = input(f"Move {len(to_delete)} duplicate files to the recycle bin? (y/n): ").strip().lower()
+            if answer != "y":
+                return
+        bulk_delete([glob.escape(path) for path in to_delete])
+
+# Path index settings
+PATH_INDEX_CACHE_PATH = CACHE_PATH / "paths"
+PATH_INDEX_VERSION = 1
+PATH_INDEX_REFRESH_INTERVAL = 300  # Seconds before 'find' checks the directories for changes again
+PATH_INDEX_COMPACT_RATIO = 0.25  # Share of deleted entries at which the arrays are rebuilt
+FIND_LIMIT = 50  # Results shown by 'find' unless --limit is given
+FIND_FUZZY_CANDIDATES = 20000  # Names ranked by a fuzzy query before the best are shown
+
+_GONE = -2  # Parent id of deleted entries until the next compaction
+_path_indexes = {}  # root -> PathIndex loaded in this session
+
+class PathIndex:
+    """
+    Compact index of every path under a root directory, for queries on names.
+
+    Entry i is a (parent entry, interned name) pair kept in arrays, so a path costs a few
+    bytes plus its name once per distinct name, instead of a full path string. Entry 0 is the
+    root, named by its absolute path. Names are kept in a single newline-separated string,
+    so a glob, substring or fuzzy query is a single regex scan in C; hits are mapped
+    back to names through an offsets array, and to entries through per-name chains.
+    Directories keep the mtime they were listed at, so a refresh re-lists only changed ones.
+    """
+
+    def __init__(self, root):
+        self.root = os.path.abspath(root)
+        self.parents = array("i", [-1])
+        self.name_ids = array("i", [0])
+        self.kinds = bytearray(b"\1")  # 1 for directories
+        self.mtimes = array("q", [0])  # st_mtime_ns of directories when listed; 0 forces a listing
+        self.name_blob = self.root + "\n"
+        self.offsets = array("q", [0, len(self.name_blob)])  # Start of each name, then the end
+        self.first = array("i", [0])  # First entry with each name
+        self.next_same = array("i", [-1])  # Next entry with the same name, or -1
+        self.deleted = 0
+        self.refreshed_at = 0.0
+        self._folded = None  # Lowercased name_blob, built on the first case-insensitive query
+
+    def __len__(self):
+        return len(self.parents) - self.deleted
+
+    def name(self, name_id):
+        """Returns an interned name."""
+        return self.name_blob[self.offsets[name_id]:self.offsets[name_id + 1] - 1]
+
+    def path(self, entry, cache):
+        """
+        Returns the full path of an entry. cache maps directory entries to their paths; the
+        directories passed on the way up are added to it, so their other entries are cheap.
+        """
+        unwound = []
+        while entry not in cache:
+            parent = self.parents[entry]
+            if parent < 0:
+                cache[entry] = self.root
+                break
+            unwound.append(entry)
+            entry = parent
+        path = cache[entry]
+        for entry in reversed(unwound):
+            path = os.path.join(path, self.name(self.name_ids[entry]))
+            if self.kinds[entry]:
+                cache[entry] = path
+        return path
+
+    def entries_named(self, name_id):
+        """Yields the live entries with a name."""
+        entry = self.first[name_id]
+        while entry != -1:
+            if self.parents[entry] != _GONE:
+                yield entry
+            entry = self.next_same[entry]
+
+    def folded_blob(self):
+        """
+        Returns name_blob lowercased for case-insensitive queries, or None for the rare names
+        whose lowercase form has another length, which would move the offsets.
+        """
+        if self._folded is None:
+            folded = self.name_blob.lower()
+            self._folded = folded if len(folded) == len(self.name_blob) else ""
+        return self._folded or None
+
+    def matching_names(self, pattern, literal="", folded=False):
+        """
+        Yields (name id, match) for each name a compiled regex finds in name_blob, or in its
+        lowercased copy when folded. When every match must contain a literal, the blob is
+        scanned with str.find and the regex only runs on the names that contain it.
+        """
+        blob = self.folded_blob() if folded else self.name_blob
+        offsets = self.offsets
+        if literal:
+            position = blob.find(literal, offsets[1])  # Name 0 is the root path
+            while position != -1:
+                name_id = bisect.bisect_right(offsets, position) - 1
+                end = offsets[name_id + 1] - 1
+                match = pattern.search(blob, offsets[name_id], end)
+                if match:
+                    yield name_id, match
+                position = blob.find(literal, end + 1)
+            return
+        last = -1
+        # Stop before the final newline: a pattern that matches the empty string would
+        # otherwise match once more after it, past the last name
+        for match in pattern.finditer(blob, offsets[1], len(blob) - 1):
+            name_id = bisect.bisect_right(offsets, match.start()) - 1
+            if name_id != last:
+                last = name_id
+                yield name_id, match
+
+    def refresh(self):
+        """
+        Brings the index up to date. Every directory is stat'ed, but only those whose mtime
+        changed are listed again, so an unchanged tree costs one stat per directory.
+        Returns (directories listed, entries added, entries removed).
+        """
+        def listing(path):
+            with os.scandir(path) as entries:
+                return {entry.name: entry.is_dir(follow_symlinks=False) for entry in entries}
+
+        subdirs = defaultdict(list)  # entry -> child directory entries
+        entry = self.kinds.find(1, 1)
+        while entry != -1:
+            if self.parents[entry] != _GONE:
+                subdirs[self.parents[entry]].append(entry)
+            entry = self.kinds.find(1, entry + 1)
+
+        # Find the directories that changed or disappeared
+        changed = {}  # entry -> (path, mtime, {name: is_dir})
+        vanished = []
+        stack = [(0, self.root)]
+        while stack:
+            directory, path = stack.pop()
+            try:
+                mtime = os.stat(path).st_mtime_ns
+            except OSError:
+                if directory == 0:
+                    raise
+                vanished.append(directory)
+                continue
+            if mtime != self.mtimes[directory]:
+                try:
+                    changed[directory] = (path, mtime, listing(path))
+                except OSError:
+                    pass  # Unreadable for now; keep what was indexed before
+            for child in subdirs.get(directory, ()):
+                stack.append((child, os.path.join(path, self.name(self.name_ids[child]))))
+
+        old = defaultdict(dict)  # changed directory -> {name: entry} as indexed
+        if changed:
+            for entry, parent in enumerate(self.parents):
+                if parent in changed:
+                    old[parent][self.name(self.name_ids[entry])] = entry
+
+        new_names = {}  # Names added in this refresh; compaction merges them with older copies
+        removed_dirs = set()
+        listed = len(changed)
+        added = removed = 0
+
+        def add(parent, name, is_dir):
+            name_id = new_names.get(name)
+            if name_id is None:
+                name_id = new_names[name] = len(self.first)
+                self.offsets.append(self.offsets[-1] + len(name) + 1)
+                self.first.append(-1)
+            entry = len(self.parents)
+            self.parents.append(parent)
+            self.name_ids.append(name_id)
+            self.kinds.append(is_dir)
+            self.mtimes.append(0)
+            self.next_same.append(self.first[name_id])
+            self.first[name_id] = entry
+            return entry
+
+        def remove(entry):
+            nonlocal removed
+            if self.parents[entry] == _GONE:
+                return
+            self.parents[entry] = _GONE
+            removed += 1
+            if self.kinds[entry]:
+                removed_dirs.add(entry)
+
+        for entry in vanished:
+            remove(entry)
+        new_dirs = []
+        for directory, (path, mtime, current) in changed.items():
+            indexed = old[directory]
+            for name, child in indexed.items():
+                if current.get(name) != bool(self.kinds[child]):
+                    remove(child)  # Deleted, or replaced by an entry of another kind
+            for name, is_dir in current.items():
+                child = indexed.get(name)
+                if child is None or self.parents[child] == _GONE:
+                    entry = add(directory, name, is_dir)
+                    added += 1
+                    if is_dir:
+                        new_dirs.append((entry, os.path.join(path, name)))
+            self.mtimes[directory] = mtime
+
+        # New directories are listed in full
+        while new_dirs:
+            directory, path = new_dirs.pop()
+            try:
+                mtime = os.stat(path).st_mtime_ns
+                current = listing(path)
+            except OSError:
+                continue
+            listed += 1
+            self.mtimes[directory] = mtime
+            for name, is_dir in current.items():
+                entry = add(directory, name, is_dir)
+                added += 1
+                if is_dir:
+                    new_dirs.append((entry, os.path.join(path, name)))
+
+        # Entries always come after their parents, so one pass drops everything below removed directories
+        if removed_dirs:
+            for entry in range(min(removed_dirs) + 1, len(self.parents)):
+                if self.parents[entry] in removed_dirs:
+                    remove(entry)
+
+        if new_names:
+            self.name_blob += "".join(name + "\n" for name in new_names)
+            self._folded = None
+        self.deleted += removed
+        if self.deleted > len(self.parents) * PATH_INDEX_COMPACT_RATIO:
+            self.compact()
+        self.refreshed_at = time.time()
+        return listed, added, removed
+
+    def compact(self):
+        """Rebuilds the arrays without deleted entries, merging names that were added twice."""
+        keep = [entry for entry, parent in enumerate(self.parents) if parent != _GONE]
+        new_ids = array("i", [-1]) * len(self.parents)
+        for new_id, entry in enumerate(keep):
+            new_ids[entry] = new_id
+        names = {}  # name -> new id
+        name_ids = array("i")
+        for entry in keep:
+            name_ids.append(names.setdefault(self.name(self.name_ids[entry]), len(names)))
+
+        self.parents = array("i", (new_ids[self.parents[entry]] if entry else -1 for entry in keep))
+        self.name_ids = name_ids
+        self.kinds = bytearray(self.kinds[entry] for entry in keep)
+        self.mtimes = array("q", (self.mtimes[entry] for entry in keep))
+        self.name_blob = "".join(name + "\n" for name in names)
+        self.offsets = array("q", [0])
+        for name in names:
+            self.offsets.append(self.offsets[-1] + len(name) + 1)
+        self.first = array("i", [-1]) * len(names)
+        self.next_same = array("i", [-1]) * len(keep)
+        for entry in reversed(range(len(keep))):
+            self.next_same[entry] = self.first[name_ids[entry]]
+            self.first[name_ids[entry]] = entry
+        self.deleted = 0
+        self._folded = None
+
+    def save(self, index_path):
+        """Writes the index to a file: a JSON header line followed by the raw arrays."""
+        blob = self.name_blob.encode("utf-8", "surrogateescape")
+        header = {"version": PATH_INDEX_VERSION, "byteorder": sys.byteorder, "root": self.root,
+                  "entries": len(self.parents), "names": len(self.first), "blob_bytes": len(blob),
+                  "deleted": self.deleted, "refreshed_at": self.refreshed_at}
+        index_path.parent.mkdir(parents=True, exist_ok=True)
+        temporary_path = index_path.with_suffix(".tmp")
+        with open(temporary_path, "wb") as f:
+            f.write(json.dumps(header).encode("utf-8") + b"\n")
+            for values in (self.parents, self.name_ids, self.mtimes, self.next_same, self.offsets, self.first):
+                values.tofile(f)
+            f.write(self.kinds)
+            f.write(blob)
+        os.replace(temporary_path, index_path)
+
+    @classmethod
+    def load(cls, index_path):
+        """
+        Reads an index written by save, or returns None if it is missing or unusable, e.g.
+        cut short by a crash: every array must have the length the header gives.
+        """
+        try:
+            with open(index_path, "rb") as f:
+                header = json.loads(f.readline())
+                if header.get("version") != PATH_INDEX_VERSION or header.get("byteorder") != sys.byteorder:
+                    return None
+                entries, names = header["entries"], header["names"]
+                if entries < 1 or names < 1:
+                    return None
+                index = cls(header["root"])
+                for name, count in (("parents", entries), ("name_ids", entries), ("mtimes", entries),
+                                    ("next_same", entries), ("offsets", names + 1), ("first", names)):
+                    values = array(getattr(index, name).typecode)
+                    values.frombytes(f.read(count * values.itemsize))
+                    if len(values) != count:
+                        return None
+                    setattr(index, name, values)
+                index.kinds = bytearray(f.read(entries))
+                blob = f.read(header["blob_bytes"])
+                if len(index.kinds) != entries or len(blob) != header["blob_bytes"] or f.read(1):
+                    return None
+                index.name_blob = blob.decode("utf-8", "surrogateescape")
+                if index.offsets[0] != 0 or index.offsets[-1] != len(index.name_blob):
+                    return None
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+        index.deleted = header["deleted"]
+        index.refreshed_at = header["refreshed_at"]
+        return index
+
+def _path_index_path(directory):
+    """Returns the location of the path index file for a directory."""
+    key = hashlib.sha1(os.path.abspath(directory).encode("utf-8", "surrogateescape")).hexdigest()
+    return PATH_INDEX_CACHE_PATH / f"{key}.paths"
+
+def open_path_index(directory, refresh=False):
+    """
+    Returns the path index covering a directory or one of its parents, loading it from disk
+    on first use in a session. A new index is built for the directory when none exists, and
+    an existing one is refreshed when forced or older than PATH_INDEX_REFRESH_INTERVAL.
+    """
+    root = os.path.abspath(directory)
+    while True:
+        index = _path_indexes.get(root)
+        if index is None and _path_index_path(root).exists():
+            index = PathIndex.load(_path_index_path(root))
+            if index is None:
+                print(f"The path index of '{root}' is unusable. Rebuilding it.")
+                index = PathIndex(root)
+                refresh = True
+        if index is not None:
+            break
+        parent = os.path.dirname(root)
+        if parent == root:
+            root = os.path.abspath(directory)
+            print(f"Indexing the paths under '{root}'...")
+            index = PathIndex(root)
+            refresh = True
+            break
+        root = parent
+
+    _path_indexes[root] = index
+    if refresh or time.time() - index.refreshed_at > PATH_INDEX_REFRESH_INTERVAL:
+        started = time.perf_counter()
+        listed, added, removed = index.refresh()
+        record("path index", files=added, cache_hits=len(index) - added, cache_misses=listed)
+        index.save(_path_index_path(root))
+        if added or removed:
+            print(f"Path index refreshed in {time.perf_counter() - started:.2f}s: {listed} directories "
+                  f"listed, {added} entries added, {removed} removed.")
+    return index
+
+def glob_regex(pattern):
+    """
+    Translates a glob on names ('*', '?', '[...]', '[!...]') into a regex matching whole lines
+    of a newline-separated string of names.
+    """
+    parts = []
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        i += 1
+        if char == "*":
+            parts.append("[^\n]*")
+        elif char == "?":
+            parts.append("[^\n]")
+        elif char == "[" and "]" in pattern[i + 1:]:
+            end = pattern.index("]", i + 1)
+            members = pattern[i:end]
+            i = end + 1
+            negate = members.startswith("!")
+            members = members[1:] if negate else members
+            members = members.replace("\\", "\\\\").replace("^", "\\^")
+            parts.append(f"[^\n{members}]" if negate else f"[{members}]")
+        else:
+            parts.append(re.escape(char))
+    return "^" + "".join(parts) + "$"
+
+def glob_literal(pattern):
+    """Returns the longest run of plain characters in a glob, which every match must contain."""
+    return max(re.split(r"[*?]|\[.[^\]]*\]", pattern), key=len)
+
+def find_paths(index, query, mode="auto", kind=None, case=False, within=None, limit=FIND_LIMIT):
+    """
+    Queries a path index by name and returns (paths, more), where more tells whether results
+    beyond the limit exist.
+
+    :param mode: 'glob', 'substring', 'fuzzy' (the letters of the query in order, ranked by
+                 how close together they are), or 'auto' (glob if the query has * ? or [).
+    :param kind: 'files' or 'dirs' to return only one kind of entry.
+    :param within: Only return paths under this directory.
+    """
+    if mode == "auto":
+        mode = "glob" if any(char in query for char in "*?[") else "substring"
+    # Case-insensitive queries run on the lowercased names, so the literal prefilter still applies
+    folded = not case and index.folded_blob() is not None
+    if folded:
+        query = query.lower()
+    if mode == "glob":
+        expression, literal = glob_regex(query), glob_literal(query)
+    elif mode == "fuzzy":
+        # Each letter is followed by the shortest run up to the next, without backtracking
+        expression = query[:1] and re.escape(query[0]) + "".join(
+            f"[^\n{re.escape(char)}]*{re.escape(char)}" for char in query[1:])
+        literal = ""
+    else:
+        expression, literal = re.escape(query), query
+    pattern = re.compile(expression, re.MULTILINE | (0 if case or folded else re.IGNORECASE))
+    if not case and not folded:
+        literal = ""
+
+    matches = index.matching_names(pattern, literal, folded)
+    if mode == "fuzzy":
+        # Tighter and shorter matches first
+        matches = sorted(islice(matches, FIND_FUZZY_CANDIDATES),
+                         key=lambda item: (item[1].end() - item[1].start(),
+                                           index.offsets[item[0] + 1] - index.offsets[item[0]]))
+
+    prefix = os.path.join(os.path.abspath(within), "") if within else None
+    cache = {}
+    paths = []
+    for name_id, _ in matches:
+        for entry in index.entries_named(name_id):
+            if kind is not None and bool(index.kinds[entry]) != (kind == "dirs"):
+                continue
+            path = index.path(entry, cache)
+            if prefix is not None and not path.startswith(prefix):
+                continue
+            if len(paths) == limit:
+                return paths, True
+            paths.append(path)
+    return paths, False
+
+@instrumented("find")
+def find_command(directory, query, mode="auto", kind=None, case=False, limit=FIND_LIMIT, refresh=False):
+    """Prints the paths under a directory whose names match a query, using the path index."""
+    try:
+        index = open_path_index(directory, refresh)
+    except OSError as e:
+        print(f"Could not index '{directory}': {e}")
+        return
+    started = time.perf_counter()
+    paths, more = find_paths(index, query, mode, kind, case, directory, limit)
+    elapsed = time.perf_counter() - started
+    for path in paths:
+        print(path)
+    record(files=len(paths))
+    count_text = f"First {len(paths)} matches (use --limit for more)" if more else f"{len(paths)} matches"
+    print(f"{count_text} among {len(index):,} indexed paths in {elapsed * 1000:.1f}ms.")
+
+# Batch mode settings
+BATCH_WORKERS = min(32, (os.cpu_count() or 1) * 4)  # Read-only batch lines run at the same time
+BATCH_READ_ONLY_COMMANDS = {"dir", "type", "drives", "search", "help"}
+
+class ThreadOutput:
+    """
+    Stands in for sys.stdout during a batch run. Output of a thread that has a buffer goes to
+    that buffer, so lines running at the same time do not interleave; everything else goes to
+    the real stream.
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.local = threading.local()
+
+    def write(self, text):
+        return getattr(self.local, "buffer", self.stream).write(text)
+
+    def flush(self):
+        self.stream.flush()
+
+    def __getattr__(self, name):
+        return getattr(self.stream, name)
+
+def is_read_only(parts):
+    """
+    Tells whether a batch command only reads, so it may run at the same time as the lines
+    around it. Any other command waits for the lines before it and holds back the lines after it.
+    """
+    cmd = parts[0].lower()
+    args = [arg.lower() for arg in parts[1:]]
+    if cmd in BATCH_READ_ONLY_COMMANDS:
+        return True
+    if cmd in ("index", "daemon"):
+        return args[:1] == ["status"]
+    if cmd == "delete":
+        return args[:1] in (["list"], ["stats"])
+    if cmd == "dupes":
+        return "--delete" not in args
+    return False
+
+def _prepare_search(parts, current_directory, refreshed):
+    """
+    Refreshes the index a batch search line will use, once per index while no other line
+    changes files, and returns the line with --no-refresh added. The search then only reads
+    the index, so it can run next to other lines.
+
+    :param refreshed: Set of index roots already refreshed; cleared when a line changes files.
+    """
+    options, positional = parse_options(parts[1:], flags=("json", "no_recursive", "no_ignore", "binary",
+                                                          "no_index", "no_refresh"))
+    if options.get("no_index") or options.get("no_refresh") or not positional:
+        return parts
+    directory = os.path.join(current_directory, " ".join(positional[1:]))
+    found = find_index(directory) if os.path.exists(directory) else None
+    if found is not None and found[0] not in refreshed:
+        refreshed.add(found[0])
+        refresh_index(directory, check_files=False, verbose=False)
+    return parts + ["--no-refresh"]
+
+def _run_captured(output, line_no, parts, current_directory, command=None):
+    """
+    Runs one batch line with its output captured. command, if given, is run in place of
+    parts. Returns (line_no, parts, text, error, directory).
+    """
+    output.local.buffer = io.StringIO()
+    error = None
+    try:
+        current_directory = run_command(command or parts, current_directory, interactive=False)
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    finally:
+        text = output.local.buffer.getvalue()
+        del output.local.buffer
+    return line_no, parts, text, error, current_directory
+
+def run_batch(lines, current_directory, workers=BATCH_WORKERS, json_output=False):
+    """
+    Runs a script of commands in this process, one command per line. Blank lines and lines
+    starting with '#' are skipped, and 'exit' ends the script.
+
+    Consecutive read-only lines (see is_read_only) run at the same time on a thread pool;
+    'cd' and commands that change files run alone, in order. Searches refresh their index
+    before they are queued rather than while they run. Output is captured per line and
+    printed in script order either way. Nothing prompts: commands that need an answer print
+    their usage instead.
+
+    :param json_output: Print one JSON object per line with its output and error, if any.
+    :return: The number of lines that failed with an exception.
+    """
+    stream = sys.stdout
+    output = ThreadOutput(stream)
+    failed = 0
+
+    def emit(result):
+        nonlocal failed
+        line_no, parts, text, error, _ = result
+        if error is not None:
+            failed += 1
+        if json_output:
+            stream.write(json.dumps({"line": line_no, "command": " ".join(parts), "output": text,
+                                     "error": error}) + "\n")
+        else:
+            stream.write(text)
+            if error is not None:
+                stream.write(f"Line {line_no}: {error}\n")
+        stream.flush()
+
+    sys.stdout = output
+    executor = ThreadPoolExecutor(max_workers=max(1, workers))
+    pending = deque()
+    refreshed = set()  # Index roots refreshed since the last line that changed files
+    try:
+        for line_no, line in enumerate(lines, 1):
+            parts = line.split()
+            if not parts or parts[0].startswith("#"):
+                continue
+            if is_read_only(parts):
+                command = parts
+                if parts[0].lower() == "search":
+                    command = _prepare_search(parts, current_directory, refreshed)
+                pending.append(executor.submit(_run_captured, output, line_no, parts, current_directory,
+                                               command))
+                # Keep a bounded window so long scripts stream with flat memory
+                while pending and (pending[0].done() or len(pending) > workers * 4):
+                    emit(pending.popleft().result())
+                continue
+
+            while pending:
+                emit(pending.popleft().result())
+            refreshed.clear()
+            result = _run_captured(output, line_no, parts, current_directory)
+            emit(result)
+            current_directory = result[-1]
+            if current_directory is None:
+                break
+        while pending:
+            emit(pending.popleft().result())
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+        sys.stdout = stream
+    return failed
+
+# Background job settings
+IO_CONCURRENCY = 4  # Jobs doing file I/O at the same time; the rest wait, so spinning disks don't thrash
+JOB_POLL_INTERVAL = 0.2  # Seconds between checks for new output in 'fg'
+
+_jobs = OrderedDict()  # job id -> Job, oldest first
+_jobs_lock = threading.Lock()
+_next_job_id = 1
+_io_loop = None  # asyncio event loop of the I/O core, running in its own thread
+_io_limit = None  # Semaphore enforcing IO_CONCURRENCY
+_job_output = None  # ThreadOutput installed as sys.stdout while jobs run
+_job_threads = 0  # Jobs running on I/O threads; sys.stdout is restored when it drops to 0
+
+class Job:
+    """A command running in the background on the I/O core. Collects the command's output."""
+
+    def __init__(self, job_id, parts, directory):
+        self.id = job_id
+        self.parts = parts
+        self.directory = directory
+        self.state = "queued"  # queued, running, done, cancelled or failed
+        self.chunks = []  # Output written so far
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.future = None  # concurrent.futures.Future of the job's coroutine
+        self.thread_id = None  # Thread running the command, while it runs
+        self.cancel_requested = False
+        self.reported = False  # Whether the prompt has announced that the job finished
+        self.lock = threading.Lock()
+
+    def write(self, text):
+        self.chunks.append(text)
+        return len(text)
+
+    def elapsed(self):
+        start = self.started or self.created
+        return (self.finished or time.time()) - start
+
+def _io_core():
+    """
+    Returns the event loop of the I/O core, starting it in a daemon thread on first use.
+    asyncio is only imported once a job is started.
+    """
+    global _io_loop, _io_limit
+    import asyncio
+    with _jobs_lock:
+        if _io_loop is None:
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name="fmt-io-core", daemon=True).start()
+            _io_limit = asyncio.Semaphore(IO_CONCURRENCY)
+            _io_loop = loop
+    return _io_loop
+
+def _attach_job_output(job):
+    """
+    Sends the calling thread's output to a job. The first job to run installs a ThreadOutput
+    as sys.stdout; other threads keep writing to the real stream through it.
+    """
+    global _job_output, _job_threads
+    with _jobs_lock:
+        if _job_threads == 0:
+            _job_output = ThreadOutput(sys.stdout)
+            sys.stdout = _job_output
+        _job_threads += 1
+    _job_output.local.buffer = job
+
+def _detach_job_output():
+    """Stops capturing the calling thread's output, restoring sys.stdout after the last job."""
+    global _job_threads
+    del _job_output.local.buffer
+    with _jobs_lock:
+        _job_threads -= 1
+        # Leave a stream someone installed on top of ours to whoever installed it
+        if _job_threads == 0 and sys.stdout is _job_output:
+            sys.stdout = _job_output.stream
+
+def _run_job_thread(job):
+    """Runs a job's command on an I/O thread, with its output going to the job."""
+    _attach_job_output(job)
+    try:
+        with job.lock:
+            job.thread_id = threading.get_ident()
+        try:
+            run_command(job.parts, job.directory, interactive=False)
+        finally:
+            with job.lock:
+                job.thread_id = None
+        job.state = "cancelled" if job.cancel_requested else "done"
+    except KeyboardInterrupt:
+        job.state = "cancelled"
+    except Exception as e:
+        job.write(f"{type(e).__name__}: {e}\n")
+        job.state = "failed"
+    finally:
+        _detach_job_output()
+        job.finished = time.time()
+
+async def _run_job(job):
+    """Waits for an I/O slot, then offloads the job's blocking work to a thread."""
+    import asyncio
+    async with _io_limit:
+        with job.lock:
+            if job.state != "queued":
+                return
+            job.state = "running"
+            job.started = time.time()
+        await asyncio.to_thread(_run_job_thread, job)
+
+def start_job(parts, directory):
+    """Queues a command as a background job and returns the job."""
+    global _next_job_id
+    import asyncio
+    loop = _io_core()
+    with _jobs_lock:
+        job = Job(_next_job_id, parts, directory)
+        _next_job_id += 1
+        job.future = asyncio.run_coroutine_threadsafe(_run_job(job), loop)
+        _jobs[job.id] = job
+    return job
+
+def active_jobs():
+    """Returns the jobs that are queued or running."""
+    with _jobs_lock:
+        return [job for job in _jobs.values() if not job.future.done()]
+
+def list_jobs():
+    """Prints the background jobs with their state and run time."""
+    with _jobs_lock:
+        jobs = list(_jobs.values())
+    if not jobs:
+        print("No background jobs.")
+        return
+    for job in jobs:
+        print(f"  [{job.id}] {job.state:9} {job.elapsed():8.1f}s  {' '.join(job.parts)}")
+
+def report_finished_jobs():
+    """Announces jobs that finished since the last prompt, like a shell does."""
+    with _jobs_lock:
+        jobs = [job for job in _jobs.values() if job.future.done() and not job.reported]
+    for job in jobs:
+        job.reported = True
+        print(f"[{job.id}] {job.state} after {job.elapsed():.1f}s: {' '.join(job.parts)} (fg {job.id} shows it)")
+
+def foreground_job(job_id=None):
+    """
+    Shows a job's output, following it until the job finishes. Ctrl-C leaves the job running
+    in the background. A finished job is removed from the job list once shown.
+    """
+    with _jobs_lock:
+        if job_id is None and _jobs:
+            job_id = next(reversed(_jobs))
+        job = _jobs.get(job_id)
+    if job is None:
+        print("No such job.")
+        return
+
+    shown = 0
+    try:
+        while True:
+            done = job.future.done()
+            chunks = job.chunks[shown:]
+            shown += len(chunks)
+            sys.stdout.write("".join(chunks))
+            sys.stdout.flush()
+            if done:
+                break
+            time.sleep(JOB_POLL_INTERVAL)
+    except KeyboardInterrupt:
+        print(f"\n[{job.id}] continues in the background.")
+        return
+
+    job.reported = True
+    print(f"[{job.id}] {job.state} after {job.elapsed():.1f}s.")
+    with _jobs_lock:
+        _jobs.pop(job.id, None)
+
+def cancel_job(job):
+    """
+    Cancels a job. A queued job never starts; a running one gets a KeyboardInterrupt in its
+    thread, so it stops the way Ctrl-C stops a foreground command. Blocking system calls and
+    work already handed to a worker pool finish first.
+    """
+    import ctypes
+    with job.lock:
+        if job.state == "queued":
+            job.state = "cancelled"
+            job.finished = time.time()
+            job.future.cancel()
+        elif job.thread_id is not None and not job.cancel_requested:
+            job.cancel_requested = True
+            ctypes.pythonapi.PyThreadState_SetAsyncExc(ctypes.c_ulong(job.thread_id),
+                                                       ctypes.py_object(KeyboardInterrupt))
+
+def main(argv):
+    """
+    Command-line entry point; returns the exit status.
+
+    Without arguments the interactive prompt starts. 'main.py.py --batch FILE' (or '-' for
+    stdin) runs a script of commands in one process, and any other arguments are run as a
+    single command, e.g. 'main.py.py search PATTERN DIR --json'.
+    """
+    if not argv:
+        command_prompt()
+        return 0
+
+    if argv[0] == "--batch":
+        options, positional = parse_options(argv, flags=("json",))
+        try:
+            workers = int(options.get("workers", BATCH_WORKERS))
+        except ValueError:
+            workers = None
+        source = options.get("batch")
+        if not isinstance(source, str) or positional or not workers:
+            print("Usage: main.py.py --batch FILE|- [--workers N] [--json]")
+            return 2
+        if source == "-":
+            failed = run_batch(sys.stdin, os.getcwd(), workers, bool(options.get("json")))
+        else:
+            with open(source, encoding="utf-8") as script:
+                failed = run_batch(script, os.getcwd(), workers, bool(options.get("json")))
+        return 1 if failed else 0
+
+    run_command(argv, os.getcwd(), interactive=False)
+    return 0
+
+def command_prompt():
+    """
+    Mimics a Windows Command Prompt for file navigation with drive access and file copying.
+    """
+    current_directory = os.getcwd()  # Start in the current working directory
+
+    print("Welcome to the File Navigator (Windows CMD style).")
+    print("Type 'help' for a list of commands.\n")
+
+    while current_directory is not None:
+        # Display the current directory in a command-prompt style
+        prompt = f"{current_directory}> "
+        command = input(prompt).strip()
+
+        if not command:
+            report_finished_jobs()
+            continue
+
+        current_directory = run_command(command.split(), current_directory)
+        report_finished_jobs()
+
+def run_command(parts, current_directory, interactive=True):
+    """
+    Runs one command given as a list of words and returns the new current directory,
+    or None after 'exit'.
+
+    :param interactive: Whether the command may prompt for missing arguments, pages and
+                        confirmations. Batch and command-line runs pass False.
+    """
+    cmd = parts[0].lower()
+    args = parts[1:]
+
+    if cmd == "dir":
+        options, positional = parse_options(args, flags=("reverse", "files", "dirs", "du", "bare", "page",
+                                                         "json"))
+        directory = os.path.join(current_directory, " ".join(positional))
+        try:
+            sort = options.get("sort")
+            if sort is not None and sort not in DIR_SORT_KEYS:
+                raise ValueError
+            page_size = None
+            if interactive and (options.get("page") or "page_size" in options):
+                page_size = int(options.get("page_size", max(5, shutil.get_terminal_size().lines - 2)))
+            kind = "files" if options.get("files") else "dirs" if options.get("dirs") else None
+            min_size = parse_size(options["min_size"]) if "min_size" in options else None
+            max_size = parse_size(options["max_size"]) if "max_size" in options else None
+            limit = int(options["limit"]) if "limit" in options else None
+        except (ValueError, TypeError, AttributeError):
+            print("Usage: dir [--sort name|size|time] [--reverse] [--files|--dirs] [--match GLOB]")
+            print("           [--min-size SIZE] [--max-size SIZE] [--du] [--bare] [--page]")
+            print("           [--page-size N] [--limit N] [--json] [path]")
+            return current_directory
+        if not os.path.isdir(directory):
+            print(f"The system cannot find the path specified: '{directory}'")
+            return current_directory
+        try:
+            list_directory(directory, sort, bool(options.get("reverse")), kind, options.get("match"),
+                           min_size, max_size, bool(options.get("du")), bool(options.get("bare")),
+                           page_size, limit, bool(options.get("json")))
+        except PermissionError:
+            print("Access denied.")
+    elif cmd == "cd":
+        if len(args) == 0:
+            print(current_directory)
+        elif args[0] == "..":
+            current_directory = os.path.dirname(current_directory)
+        elif len(args) == 1 and args[0].endswith(":"):
+            new_drive = args[0].upper() + "\\"
+            if path_exists(new_drive):
+                current_directory = new_drive
+            else:
+                print(f"The system cannot find the drive specified: '{new_drive}'")
+        else:
+            new_path = os.path.join(current_directory, " ".join(args))
+            if path_is_dir(new_path):
+                current_directory = new_path
+            else:
+                print(f"The system cannot find the path specified: '{new_path}'")
+    elif cmd == "type":
+        if len(args) == 0:
+            print("The syntax of the command is incorrect.")
+        else:
+            options, positional = parse_options(args, flags=("page", "follow"))
+            file_name = " ".join(positional)
+            file_path = os.path.join(current_directory, file_name)
+            if os.path.isfile(file_path):
+                try:
+                    if "head" in options:
+                        print_lines(file_path, 1, int(options["head"]))
+                    elif "tail" in options:
+                        print_tail(file_path, int(options["tail"]))
+                    elif not interactive:
+                        if "line" in options or options.get("page") or options.get("follow"):
+                            print("--line, --page and --follow need an interactive session.")
+                        else:
+                            print_file(file_path)
+                    elif "line" in options:
+                        page_file(file_path, max(1, int(options["line"])))
+                    elif options.get("follow"):
+                        follow_file(file_path)
+                    elif options.get("page") or os.path.getsize(file_path) > PAGER_THRESHOLD:
+                        page_file(file_path)
+                    else:
+                        with open(file_path, 'r', encoding='utf-8') as file:
+                            print("\n" + "-" * 40)
+                            print(file.read())
+                            print("-" * 40)
+                except UnicodeDecodeError:
+                    # Binary or non-UTF-8 content: show it through the pager instead
+                    page_file(file_path)
+                except ValueError:
+                    print("The line count must be a number.")
+                except PermissionError:
+                    print(f"Could not read the file '{file_name}'.")
+            else:
+                print(f"The system cannot find the file specified: '{file_name}'")
+    elif cmd == "drives":
+        drives = list_drives()
+        if drives:
+            print("Available drives:")
+            for drive in drives:
+                print(f"  {drive}")
+        else:
+            print("No drives found.")
+    elif cmd == "exit":
+        running = active_jobs()
+        if running and args[:1] != ["--force"]:
+            print(f"{len(running)} background jobs are still running. "
+                  "Wait for them, 'cancel all', or 'exit --force'.")
+            return current_directory
+        for job in running:
+            cancel_job(job)
+        print("Exiting File Navigator.")
+        return None
+    elif cmd == "copy":
+        options, positional = parse_options(args, flags=("resumable",))
+        if len(positional) == 2:
+            source_file, destination_file = (os.path.join(current_directory, path) for path in positional)
+        elif interactive:
+            # Interactive file copy process
+            print("\n--- File Copy ---")
+            source_file = input("Enter the full path of the source file: ").strip()
+            destination_file = input("Enter the full path of the destination file (including the new name): ").strip()
+        else:
+            print("Usage: copy [--resumable] SOURCE DESTINATION")
+            return current_directory
+        copy_file_dynamic(source_file, destination_file, bool(options.get("resumable")))
+    elif cmd == "bulkcopy":
+        options, positional = parse_options(args, flags=("preserve",))
+        if len(positional) < 2:
+            print("Usage: bulkcopy [--workers N] [--preserve] SOURCE... DESTINATION")
+            return current_directory
+        try:
+            workers = int(options.get("workers", COPY_WORKERS))
+        except ValueError:
+            print("The number of workers must be a number.")
+            return current_directory
+        paths = [os.path.join(current_directory, path) for path in positional]
+        bulk_copy(paths[:-1], paths[-1], workers, bool(options.get("preserve")))
+    elif cmd == "sync":
+        options, positional = parse_options(args, flags=("checksum",))
+        if len(positional) != 2:
+            print("Usage: sync [--checksum] [--workers N] SOURCE DESTINATION")
+            return current_directory
+        try:
+            workers = int(options.get("workers", COPY_WORKERS))
+        except ValueError:
+            print("The number of workers must be a number.")
+            return current_directory
+        source, destination = (os.path.join(current_directory, path) for path in positional)
+        if os.path.isfile(source):
+            copy_file_dynamic(source, destination, sync=True, checksum=bool(options.get("checksum")))
+        else:
+            sync_tree(source, destination, bool(options.get("checksum")), workers)
+    elif cmd == "read":
+        options, positional = parse_options(args)
+        if positional:
+            filename = " ".join(positional)
+        elif interactive:
+            filename = input("Enter the file name (with extension): ").strip()
+        else:
+            print("Usage: read [--max-chars N] [--pages N] FILE")
+            return current_directory
+
+        try:
+            max_chars = int(options["max_chars"]) if "max_chars" in options else None
+            max_pages = int(options["pages"]) if "pages" in options else None
+        except ValueError:
+            print("--max-chars and --pages must be numbers.")
+            return current_directory
+
+        # Handle the file
+        handle_file(os.path.join(current_directory, filename), max_chars, max_pages, interactive)
+    elif cmd == "search":
+        options, positional = parse_options(args, flags=("json", "no_recursive", "no_ignore", "binary",
+                                                         "no_index", "no_refresh"))
+        try:
+            workers = int(options.get("workers", SEARCH_WORKERS))
+            chunk_size = parse_size(str(options.get("chunk_size", SEARCH_CHUNK_SIZE)))
+            max_count = int(options["max_count"]) if "max_count" in options else None
+            max_per_file = int(options["max_per_file"]) if "max_per_file" in options else None
+            max_size = parse_size(str(options["max_size"])) if "max_size" in options else SEARCH_MAX_FILE_SIZE
+            extensions = set()
+            for name in str(options.get("type", "")).split(","):
+                if name:
+                    extensions |= SEARCH_FILE_TYPES[name]
+            extensions |= {"." + extension.lstrip(".") for extension in str(options.get("ext", "")).split(",")
+                           if extension}
+        except (ValueError, KeyError):
+            print("Usage: search [--workers N] [--chunk-size SIZE] [--mode thread|process|auto]"
+                  " [--max-count N] [--max-per-file N]")
+            print("              [--include GLOB,...] [--exclude GLOB,...] [--type code|docs] [--ext EXT,...]")
+            print("              [--max-size SIZE] [--no-ignore] [--binary] [--no-index] [--no-refresh]")
+            print("              [--no-recursive] [--json] [PATTERN [DIRECTORY]]")
+            return current_directory
+        search_filter = SearchFilter(ignore=not options.get("no_ignore"),
+                                     include=[glob for glob in str(options.get("include", "")).split(",") if glob],
+                                     exclude=[glob for glob in str(options.get("exclude", "")).split(",") if glob],
+                                     extensions=extensions or None, max_size=max_size,
+                                     skip_binary=not options.get("binary"))
+        if positional:
+            base_directory = current_directory
+            sub_directory = " ".join(positional[1:])
+            term_to_search = positional[0]
+            is_recursive = not options.get("no_recursive")
+        elif interactive:
+            print("\n--- File Search ---")
+            base_directory = input("Enter base directory path: ").strip()
+            sub_directory = input("Enter subdirectory path (relative to base directory): ").strip()
+            term_to_search = input("Enter search term or regex pattern: ").strip()
+            is_recursive = input("Search recursively? (yes/no): ").strip().lower() == 'yes'
+        else:
+            print("Usage: search [options] PATTERN [DIRECTORY]")
+            return current_directory
+        search_files(base_directory, sub_directory, term_to_search, is_recursive,
+                     workers, chunk_size, options.get("mode", "auto"),
+                     max_count=max_count, max_per_file=max_per_file,
+                     json_output=bool(options.get("json")), search_filter=search_filter,
+                     use_index=not options.get("no_index"), refresh=not options.get("no_refresh"))
+
+    elif cmd == "delete" and args:
+        # Scriptable forms of the menu choices below
+        action, rest = args[0].lower(), " ".join(args[1:])
+        if action == "file" and rest:
+            delete_file_safely(os.path.join(current_directory, rest))
+        elif action == "recover" and rest:
+            recover_file(rest)
+        elif action == "list":
+            list_recycle_bin(rest or None)
+        elif action == "stats":
+            recycle_bin_stats()
+        else:
+            print("Usage: delete [file PATH|recover PATTERN|list [PATTERN]|stats]")
+    elif cmd == "delete" and not interactive:
+        print("Usage: delete file PATH|recover PATTERN|list [PATTERN]|stats")
+    elif cmd == "delete":
+        print("\nFile Management System")
+        print("1. Delete a file")
+        print("2. Recover a file")
+        print("3. List the recycle bin")
+        print("4. Show recycle bin statistics")
+        choice = input("Enter your choice (1/2/3/4): ").strip()
+
+        if choice == "1":
+            file_to_delete = input("Enter the full path of the file to delete: ").strip()
+            delete_file_safely(file_to_delete)
+        elif choice == "2":
+            file_to_recover = input("Enter the original path, name, id or glob of the file to recover: ").strip()
+            recover_file(file_to_recover)
+        elif choice == "3":
+            pattern = input("Enter a path, name or glob to filter by (leave empty for all): ").strip()
+            list_recycle_bin(pattern or None)
+        elif choice == "4":
+            recycle_bin_stats()
+        else:
+            print("Invalid choice. Please enter 1, 2, 3 or 4.")
+
+    elif cmd == "index":
+        action = args[0].lower() if args else ""
+        options, positional = parse_options(args[1:], flags=("quick",))
+        target = os.path.join(current_directory, " ".join(positional)) if positional else current_directory
+        if action == "build":
+            build_index(target)
+        elif action == "refresh":
+            refresh_index(target, check_files=not options.get("quick"))
+        elif action == "status":
+            index_status(target)
+        elif action == "drop":
+            drop_index(target)
+        else:
+            print("Usage: index build|refresh [--quick]|status|drop [directory]")
+
+    elif cmd == "del":
+        options, positional = parse_options(args)
+        if not positional or options.get("compress", "none") not in ("none", "zlib", "zstd"):
+            print("Usage: del [--compress none|zlib|zstd] [--level N] PATH|GLOB...")
+            return current_directory
+        try:
+            level = int(options["level"]) if "level" in options else None
+        except ValueError:
+            print("The compression level must be a number.")
+            return current_directory
+        bulk_delete([os.path.join(current_directory, pattern) for pattern in positional],
+                    options.get("compress"), level)
+
+    elif cmd == "recover":
+        options, positional = parse_options(args)
+        if not positional:
+            print("Usage: recover [--to DIRECTORY] ID|PATH|NAME|GLOB...")
+            return current_directory
+        destination_dir = os.path.join(current_directory, options["to"]) if "to" in options else None
+        bulk_recover(positional, destination_dir)
+
+    elif cmd == "dupes":
+        options, positional = parse_options(args, flags=("delete", "yes"))
+        try:
+            min_size = parse_size(str(options.get("min_size", 1)))
+            workers = int(options.get("workers", DUPES_WORKERS))
+            keep = options.get("keep", "first")
+            if keep not in ("first", "newest", "oldest"):
+                raise ValueError
+        except ValueError:
+            print("Usage: dupes [--min-size SIZE] [--workers N] [--delete [--yes]] [--keep first|newest|oldest]"
+                  " [PATH...]")
+            return current_directory
+        if options.get("delete") and not (interactive or options.get("yes")):
+            print("dupes --delete needs --yes outside an interactive session.")
+            return current_directory
+        paths = [os.path.join(current_directory, path) for path in positional] or [current_directory]
+        report_duplicates(paths, max(1, min_size), workers, bool(options.get("delete")), keep,
+                          confirm=not options.get("yes"))
+    elif cmd == "daemon":
+        action = args[0].lower() if args else "status"
+        if action == "start":
+            start_metadata_daemon()
+        elif action == "stop":
+            stop_metadata_daemon()
+        elif action == "status":
+            metadata_daemon_status()
+        else:
+            print("Usage: daemon start|stop|status")
+    elif cmd == "find":
+        options, positional = parse_options(args, flags=("glob", "substring", "fuzzy", "files", "dirs", "case",
+                                                         "refresh"))
+        limit = options.get("limit", str(FIND_LIMIT))
+        if not positional or not str(limit).isdigit() or isinstance(options.get("in"), bool):
+            print("Usage: find [--glob|--substring|--fuzzy] [--files|--dirs] [--case] [--limit N]")
+            print("            [--refresh] [--in DIR] QUERY")
+            return current_directory
+        mode = next((mode for mode in ("glob", "substring", "fuzzy") if options.get(mode)), "auto")
+        kind = "files" if options.get("files") else "dirs" if options.get("dirs") else None
+        directory = os.path.join(current_directory, options.get("in", ""))
+        if not os.path.isdir(directory):
+            print(f"The system cannot find the path specified: '{directory}'")
+            return current_directory
+        find_command(directory, " ".join(positional), mode, kind, bool(options.get("case")), int(limit),
+                     bool(options.get("refresh")))
+    elif cmd == "stats":
+        options, positional = parse_options(args, flags=("json", "reset"))
+        if positional or options.get("dump") is True:
+            print("Usage: stats [--json] [--dump FILE] [--reset]")
+            return current_directory
+        if "dump" in options:
+            dump_path = os.path.join(current_directory, options["dump"])
+            try:
+                with open(dump_path, "w", encoding="utf-8") as dump:
+                    json.dump(stats_snapshot(), dump, indent=2)
+                print(f"Statistics written to '{dump_path}'.")
+            except OSError as e:
+                print(f"Could not write '{dump_path}': {e}")
+        elif options.get("json"):
+            print(json.dumps(stats_snapshot()))
+        else:
+            print_stats()
+        if options.get("reset"):
+            reset_stats()
+    elif cmd == "start":
+        if not args or args[0].lower() in ("cd", "exit", "start", "jobs", "fg", "cancel"):
+            print("Usage: start COMMAND [ARGS]  (runs copy, search, sync, del, purge... in the background)")
+        elif not interactive:
+            print("start needs an interactive session; batch mode already runs lines concurrently.")
+        else:
+            job = start_job(args, current_directory)
+            print(f"[{job.id}] {' '.join(args)}")
+    elif cmd == "jobs":
+        list_jobs()
+    elif cmd == "fg":
+        if args and not args[0].isdigit():
+            print("Usage: fg [JOB]")
+            return current_directory
+        foreground_job(int(args[0]) if args else None)
+    elif cmd == "cancel":
+        if args[:1] == ["all"]:
+            jobs = active_jobs()
+        elif all(arg.isdigit() for arg in args):
+            # Without a job number, the most recently started job that is still active
+            if args:
+                with _jobs_lock:
+                    jobs = [_jobs[int(arg)] for arg in args if int(arg) in _jobs]
             else:
-                print("Invalid choice. Please enter 1, 2.")
-
-        elif cmd == "help":
-            print("\nAvailable Commands:")
-            print("  dir             List directory contents")
-            print("  cd [path]       Change the current directory or switch drives (e.g., 'cd D:')")
-            print("  type [file]     Display the contents of a file")
-            print("  drives          List all available drives")
-            print("  copy            Copy a file (source -> destination)")
-            print("  read            Read or open a file based on type")
-            print("  search          Search for a term in files within a directory")
-            print("  exit            Exit the program")
-            print("  help            Show this help message\n")
-            print("  delete          For deletion and recovery of file")
+                jobs = active_jobs()[-1:]
+        else:
+            print("Usage: cancel [JOB...|all]")
+            return current_directory
+        if not jobs:
+            print("No such job.")
+        for job in jobs:
+            cancel_job(job)
+            print(f"[{job.id}] cancelling.")
+    elif cmd == "purge":
+        options, _ = parse_options(args)
+        try:
+            max_age_days = float(options.get("max_age", RECYCLE_BIN_MAX_AGE_DAYS))
+            max_size = parse_size(str(options.get("max_size", RECYCLE_BIN_MAX_SIZE)))
+        except ValueError:
+            print("Usage: purge [--max-age DAYS] [--max-size SIZE]")
+            return current_directory
+        if start_background_purge(max_age_days, max_size, force=True):
+            print("Purging the recycle bin in the background.")
         else:
-            print(f"'{cmd}' is not recognized as an internal or external command.")
+            print("A purge is already running.")
+
+    elif cmd == "help":
+        print("\nAvailable Commands:")
+        print("  dir             List directory contents with sizes and times")
+        print("                  [--sort name|size|time] [--reverse] [--files|--dirs] [--match GLOB]")
+        print("                  [--min-size SIZE] [--max-size SIZE] [--du] [--bare] [--page] [--limit N] [--json]")
+        print("  cd [path]       Change the current directory or switch drives (e.g., 'cd D:')")
+        print("  type [file]     Display the contents of a file (large files open in a pager)")
+        print("                  [--page] [--head N] [--tail N] [--line N] [--follow]")
+        print("  drives          List all available drives")
+        print("  copy            Copy a file (copy [SOURCE DESTINATION]; prompts when omitted)")
+        print("                  [--resumable] checkpointed copy with BLAKE2 verification")
+        print("  bulkcopy        Copy files, globs or directories in parallel")
+        print("                  (bulkcopy [--workers N] [--preserve] SOURCE... DESTINATION)")
+        print("  sync            Copy only new or changed files (sync [--checksum] [--workers N] SRC DEST)")
+        print("  read            Read or open a file based on type")
+        print("                  [--max-chars N] [--pages N] limit how much of a document is shown")
+        print("  search          Search for a term in files (and .docx/.pdf text) within a directory")
+        print("                  [--workers N] [--chunk-size SIZE] [--mode thread|process|auto]")
+        print("                  [--max-count N] [--max-per-file N] [--no-recursive] [--json]")
+        print("                  [--include GLOB,...] [--exclude GLOB,...] [--type code|docs] [--ext EXT,...]")
+        print("                  [--max-size SIZE]; .gitignore/.ignore, VCS and dependency directories")
+        print("                  and binary files are skipped unless [--no-ignore] [--binary]")
+        print("                  [--no-index] skips the trigram index, [--no-refresh] uses it as it is")
+        print("                  [PATTERN [DIR]] searches DIR (default: here) without prompting")
+        print("  index           Build, refresh, inspect or drop a search index")
+        print("                  (index build|refresh [--quick]|status|drop [dir])")
+        print("  daemon          Share a metadata cache between sessions (daemon start|stop|status)")
+        print("  find            Find files and directories by name from a persistent path index")
+        print("                  (find [--glob|--substring|--fuzzy] [--files|--dirs] [--case] [--limit N]")
+        print("                  [--refresh] [--in DIR] QUERY)")
+        print("  stats           Show latency histograms, bytes, files and cache hits per operation")
+        print("                  (stats [--json] [--dump FILE] [--reset])")
+        print("  start           Run a command as a background job (e.g. 'start search TODO src')")
+        print("  jobs            List background jobs")
+        print("  fg [JOB]        Show a job's output and wait for it (Ctrl-C leaves it running)")
+        print("  cancel          Stop background jobs (cancel [JOB...|all])")
+        print("  exit            Exit the program (exit --force cancels running jobs)")
+        print("  help            Show this help message\n")
+        print("  delete          For deletion and recovery of file")
+        print("                  (delete [file PATH|recover PATTERN|list [PATTERN]|stats])")
+        print("  del             Move files, directories or globs to the recycle bin")
+        print("                  (del [--compress none|zlib|zstd] [--level N] PATH|GLOB...)")
+        print("  recover         Restore recycle bin entries (recover [--to DIR] ID|PATH|NAME|GLOB...)")
+        print("  dupes           Find duplicate files; --delete moves extra copies to the recycle bin")
+        print("                  (dupes [--min-size SIZE] [--workers N] [--delete [--yes]] [--keep first|newest|oldest]")
+        print("                  [PATH...])")
+        print("  purge           Free recycle bin and text cache space in the background")
+        print("                  (purge [--max-age DAYS] [--max-size SIZE])")
+        print("\n  Scripts: 'main.py.py COMMAND [ARGS]' runs one command, and")
+        print("  'main.py.py --batch FILE|- [--workers N] [--json]' runs one command per line.")
+    else:
+        print(f"'{cmd}' is not recognized as an internal or external command.")
+    return current_directory
 
-# Run the command prompt
+# Run the command prompt, a batch script or a single command
 if __name__ == "__main__":
-    command_prompt()
+    sys.exit(main(sys.argv[1:]))